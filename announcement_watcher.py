@@ -0,0 +1,308 @@
+import argparse
+import asyncio
+import json
+import os
+import time
+from datetime import date, datetime, timedelta
+from typing import Callable, List, Optional, Sequence
+import numpy as np
+import requests
+import instrumentation
+from announcements_ingest import DATETIME_FORMATS
+from candle_store import Candle
+from instrumentation import span
+from nse_disclosures import IST, NSE_BASE_URL, REQUEST_TIMEOUT_SECONDS, create_session
+import upstox
+
+# Latest corporate announcements across all equities, newest first
+FEED_PATH = '/api/corporate-announcements?index=equities'
+WATCH_SUBJECTS = ('Outcome of Board Meeting', 'Bagging/Receiving of orders/contracts')
+# Snapshot times, in minutes after the dissemination time
+SNAPSHOT_OFFSETS_MINUTES = (0, 1, 5, 15, 40)
+POLL_SECONDS = 2.0
+SNAPSHOTS_PATH = 'stockanalysis/live_snapshots.jsonl'
+
+
+def announcement_id(item: dict) -> str:
+    """NSE's seq_id, or symbol|subject|time for feeds without one."""
+    if item.get('seq_id'):
+        return str(item['seq_id'])
+    return f"{item.get('symbol')}|{item.get('desc')}|{item.get('exchdisstime') or item.get('an_dt')}"
+
+
+def dissemination_time(item: dict) -> Optional[datetime]:
+    """Naive IST dissemination time, e.g. from exchdisstime '12-May-2025 14:10:51'."""
+    for field in ('exchdisstime', 'an_dt', 'sort_date'):
+        value = (item.get(field) or '').strip()
+        for fmt in DATETIME_FORMATS:
+            try:
+                return datetime.strptime(value, fmt)
+            except ValueError:
+                continue
+    return None
+
+
+def _ist_now() -> datetime:
+    return datetime.now(IST).replace(tzinfo=None)
+
+
+def closes_at(due: datetime) -> datetime:
+    """When the 1-minute candle containing `due` is complete."""
+    return due.replace(second=0, microsecond=0) + timedelta(minutes=1)
+
+
+def _fetch_candles(instrument_key: str, day: date, today: date) -> Optional[np.ndarray]:
+    # Today's candles so far in one intraday request; earlier days are final and read
+    # through the candle store
+    if day == today:
+        return upstox.fetch_intraday_candles(instrument_key)
+    return upstox.fetch_day_candles(instrument_key, day)
+
+
+class FeedPoller:
+    """
+    Conditional GETs of the announcements feed. The ETag and Last-Modified of the last
+    200 response are sent back as If-None-Match/If-Modified-Since, so an unchanged feed
+    costs a 304 with no body to download or parse.
+    """
+
+    def __init__(self, base_url: str = NSE_BASE_URL, session: Optional[requests.Session] = None):
+        self.base_url = base_url
+        self.url = f"{base_url}{FEED_PATH}"
+        self.session = session
+        self.etag = None
+        self.last_modified = None
+        self.not_modified = 0
+
+    def poll(self) -> Optional[List[dict]]:
+        """The feed's announcements, or None if unchanged since the last poll or the request failed."""
+        if self.session is None:
+            self.session = create_session(self.base_url, pool_size=1)
+        headers = {}
+        if self.etag:
+            headers['If-None-Match'] = self.etag
+        if self.last_modified:
+            headers['If-Modified-Since'] = self.last_modified
+        try:
+            response = self.session.get(self.url, headers=headers, timeout=REQUEST_TIMEOUT_SECONDS)
+            if response.status_code in (401, 403):
+                # Cookies expired: refresh them from the home page and retry once
+                self.session.get(f"{self.base_url}/", timeout=REQUEST_TIMEOUT_SECONDS)
+                response = self.session.get(self.url, headers=headers, timeout=REQUEST_TIMEOUT_SECONDS)
+            if response.status_code == 304:
+                self.not_modified += 1
+                return None
+            if response.status_code != 200:
+                print(f"Error polling announcements: {response.status_code}")
+                return None
+            items = response.json()
+        except (requests.RequestException, ValueError) as e:
+            print(f"Error polling announcements: {e}")
+            return None
+        self.etag = response.headers.get('ETag')
+        self.last_modified = response.headers.get('Last-Modified')
+        # The feed is either a bare list or wrapped as {"data": [...]}
+        return items.get('data', []) if isinstance(items, dict) else items
+
+
+class AnnouncementWatcher:
+    """
+    Polls the NSE announcements feed and, for every new announcement with a watched
+    subject, captures price snapshots at fixed offsets from its dissemination time.
+
+    A snapshot is the 1-minute candle containing dissemination time + offset, captured
+    as soon as that candle has closed. Offsets already closed when an announcement is
+    detected are captured at once, from one candle fetch; later ones sleep on the event
+    loop until their candle closes. Today's candles come from one intraday request per
+    capture rather than a full-day download per offset. Polls and fetches run in worker
+    threads, so a slow feed never delays a snapshot.
+
+    Each snapshot is written as one JSON line with its latency: seconds from detection
+    (or the candle's close, if later) to capture. A failed capture is written with no
+    candle and an error instead of being dropped.
+
+    Announcements already in the feed on the first poll are only marked as seen, unless
+    catch_up is set.
+    """
+
+    def __init__(self, poller: Optional[FeedPoller] = None, subjects: Sequence[str] = WATCH_SUBJECTS,
+                 offsets_minutes: Sequence[float] = SNAPSHOT_OFFSETS_MINUTES, poll_seconds: float = POLL_SECONDS,
+                 snapshots_path: Optional[str] = SNAPSHOTS_PATH, catch_up: bool = False,
+                 key_lookup: Optional[Callable[[str], Optional[str]]] = None,
+                 fetch_candles: Callable[[str, date, date], Optional[np.ndarray]] = _fetch_candles,
+                 clock: Callable[[], datetime] = _ist_now):
+        self.poller = poller or FeedPoller()
+        self.subjects = {subject.strip().lower() for subject in subjects}
+        self.offsets = [timedelta(minutes=offset) for offset in offsets_minutes]
+        self.poll_seconds = poll_seconds
+        self.snapshots_path = snapshots_path
+        self.catch_up = catch_up
+        self.key_lookup = key_lookup or upstox.get_instrument_key
+        self.fetch_candles = fetch_candles
+        self.clock = clock
+        self.seen = set()
+        self.primed = False
+        self.snapshots: List[dict] = []
+        self.tasks = set()
+
+    def new_announcements(self, items: Optional[List[dict]]) -> List[dict]:
+        """Items not seen before with a watched subject; every item is marked as seen."""
+        fresh = []
+        for item in items or []:
+            item_id = announcement_id(item)
+            if item_id in self.seen:
+                continue
+            self.seen.add(item_id)
+            if (item.get('desc') or '').strip().lower() in self.subjects:
+                fresh.append(item)
+        return fresh
+
+    async def poll_once(self) -> List[dict]:
+        """One feed poll; schedules the snapshots of new matching announcements and returns them."""
+        with span('feed_poll'):
+            items = await asyncio.to_thread(self.poller.poll)
+        fresh = self.new_announcements(items)
+        if not self.primed:
+            self.primed = items is not None
+            if not self.catch_up:
+                return []
+        detected = time.perf_counter()
+        for item in fresh:
+            self.schedule(item, detected)
+        return fresh
+
+    def schedule(self, item: dict, detected: float) -> None:
+        disseminated = dissemination_time(item)
+        symbol = item.get('symbol')
+        if disseminated is None:
+            print(f"Skipping {symbol}: no dissemination time in {item}")
+            return
+        instrument_key = self.key_lookup(symbol)
+        if not instrument_key:
+            print(f"Instrument key for {symbol} not found.")
+            return
+        print(f"New announcement: {symbol} '{item.get('desc')}' at {disseminated}")
+        task = asyncio.create_task(self.capture_announcement(item, instrument_key, disseminated, detected))
+        self.tasks.add(task)
+        task.add_done_callback(self._task_done)
+
+    def _task_done(self, task: asyncio.Task) -> None:
+        self.tasks.discard(task)
+        # Retrieve the exception here, or asyncio only logs it when the task is collected
+        if not task.cancelled() and task.exception() is not None:
+            print(f"Snapshot task failed: {task.exception()!r}")
+
+    async def capture_announcement(self, item: dict, instrument_key: str, disseminated: datetime,
+                                   detected: float) -> None:
+        """
+        Captures every offset of one announcement. Offsets whose candles have closed by
+        the time the task wakes are captured together, from one candle fetch.
+        """
+        pending = sorted(self.offsets)
+        while pending:
+            delay = max(0.0, (closes_at(disseminated + pending[0]) - self.clock()).total_seconds())
+            if delay:
+                await asyncio.sleep(delay)
+            # Latency counts from detection, or from the candle's close if that is later
+            since = time.perf_counter() if delay else detected
+            now = self.clock()
+            batch = [offset for offset in pending if closes_at(disseminated + offset) <= now] or pending[:1]
+            pending = pending[len(batch):]
+            await self.capture_batch(item, instrument_key, disseminated, batch, since)
+
+    async def capture_batch(self, item: dict, instrument_key: str, disseminated: datetime,
+                            offsets: Sequence[timedelta], since: float) -> List[dict]:
+        dues = [disseminated + offset for offset in offsets]
+        error = None
+        candles: List[Optional[Candle]] = [None] * len(dues)
+        try:
+            with span('snapshot_capture'):
+                today = self.clock().date()
+                by_day = {}
+                for day in sorted({due.date() for due in dues}):
+                    by_day[day] = await asyncio.to_thread(self.fetch_candles, instrument_key, day, today)
+            for i, due in enumerate(dues):
+                arrays = by_day[due.date()]
+                if arrays is None or len(arrays) == 0:
+                    continue
+                target = np.array([IST.localize(due).timestamp()])
+                index = int(upstox.resolve_candle_indices(arrays['minute'], target)[0])
+                if index >= 0:
+                    candles[i] = upstox.candle_at(arrays, index)
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+            print(f"Snapshot of {item.get('symbol')} failed: {error}")
+        latency = time.perf_counter() - since
+
+        records = []
+        for offset, due, candle in zip(offsets, dues, candles):
+            records.append({
+                'id': announcement_id(item),
+                'symbol': item.get('symbol'),
+                'subject': item.get('desc'),
+                'disseminated': disseminated.isoformat(sep=' '),
+                'offset_minutes': offset.total_seconds() / 60,
+                'due': due.isoformat(sep=' '),
+                'captured': self.clock().isoformat(sep=' ', timespec='seconds'),
+                'latency_seconds': round(latency, 3),
+                'candle': candle.to_dict() if candle else None,
+                'error': error,
+            })
+        self.snapshots.extend(records)
+        if self.snapshots_path:
+            try:
+                os.makedirs(os.path.dirname(self.snapshots_path) or '.', exist_ok=True)
+                with open(self.snapshots_path, 'a', encoding='utf-8') as f:
+                    f.write(''.join(json.dumps(record) + '\n' for record in records))
+            except OSError as e:
+                print(f"Error writing snapshots to {self.snapshots_path}: {e}")
+                for record in records:
+                    record['error'] = record['error'] or f"write failed: {e}"
+        return records
+
+    async def drain(self) -> None:
+        """Waits for every scheduled snapshot."""
+        while self.tasks:
+            await asyncio.gather(*list(self.tasks), return_exceptions=True)
+
+    async def run(self, max_polls: Optional[int] = None, stop: Optional[asyncio.Event] = None) -> None:
+        """Polls every poll_seconds until stopped (or max_polls), then waits for pending snapshots."""
+        polls = 0
+        while not (stop is not None and stop.is_set()) and (max_polls is None or polls < max_polls):
+            started = time.perf_counter()
+            await self.poll_once()
+            polls += 1
+            wait = max(0.0, self.poll_seconds - (time.perf_counter() - started))
+            if stop is None:
+                await asyncio.sleep(wait)
+            else:
+                try:
+                    await asyncio.wait_for(stop.wait(), wait)
+                except asyncio.TimeoutError:
+                    pass
+        await self.drain()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Watch NSE announcements and capture prices right after new ones.')
+    parser.add_argument('--subjects', nargs='+', default=list(WATCH_SUBJECTS))
+    parser.add_argument('--offsets', nargs='+', type=float, default=list(SNAPSHOT_OFFSETS_MINUTES),
+                        help='Snapshot offsets in minutes after dissemination')
+    parser.add_argument('--poll-seconds', type=float, default=POLL_SECONDS)
+    parser.add_argument('--output', default=SNAPSHOTS_PATH, help='Snapshot JSONL file')
+    parser.add_argument('--catch-up', action='store_true',
+                        help='Also snapshot the announcements already in the feed at startup')
+    parser.add_argument('--base-url', default=NSE_BASE_URL, help='NSE host, e.g. a local stub feed')
+    parser.add_argument('--metrics', action='store_true',
+                        help=f'Write run metrics to {instrumentation.METRICS_DIR} (same as {instrumentation.ENV_FLAG}=1)')
+    args = parser.parse_args()
+    if args.metrics:
+        instrumentation.enable()
+
+    watcher = AnnouncementWatcher(FeedPoller(args.base_url), args.subjects, args.offsets, args.poll_seconds,
+                                  args.output, args.catch_up)
+    try:
+        asyncio.run(watcher.run())
+    except KeyboardInterrupt:
+        print(f"Stopped after {len(watcher.seen)} announcements seen, {len(watcher.snapshots)} snapshots.")
+    instrumentation.write_reports('announcement_watcher')
@@ -0,0 +1,148 @@
+import os
+from datetime import datetime
+from typing import Iterator, List, Optional, Sequence
+import pandas as pd
+from trading_calendar import TRADING_END, TRADING_START
+
+# pyarrow is optional: without it announcements are always read from the CSV
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+CHUNK_SIZE = 100_000
+DATETIME_FORMATS = ('%Y-%m-%d %H:%M:%S', '%d-%b-%Y %H:%M:%S')
+TIME_COLUMN = 'DISSEMINATION_TIME'
+
+
+def parquet_path_for(csv_path: str) -> str:
+    return f"{os.path.splitext(csv_path)[0]}.parquet"
+
+
+def detect_datetime_format(values: pd.Series) -> Optional[str]:
+    """Returns the first DATETIME_FORMATS entry that parses the first non-empty value."""
+    for value in values:
+        value = value.strip()
+        if not value:
+            continue
+        for fmt in DATETIME_FORMATS:
+            try:
+                datetime.strptime(value, fmt)
+                return fmt
+            except ValueError:
+                continue
+        return None
+    return None
+
+
+def parse_dissemination(values: pd.Series) -> pd.Series:
+    """
+    Vectorized DISSEMINATION parsing. The format is detected once from the chunk's first
+    value; rows that do not match it (mixed-format dumps) get a second vectorized pass with
+    the other formats. Unparseable values become NaT.
+    """
+    values = values.str.strip()
+    detected = detect_datetime_format(values)
+    formats = [detected] if detected else []
+    formats += [fmt for fmt in DATETIME_FORMATS if fmt != detected]
+    parsed = pd.Series(pd.NaT, index=values.index, dtype='datetime64[s]')
+    for fmt in formats:
+        missing = parsed.isna()
+        if not missing.any():
+            break
+        parsed[missing] = pd.to_datetime(values[missing], format=fmt, errors='coerce')
+    return parsed
+
+
+def trading_hours_mask(times: pd.Series) -> pd.Series:
+    seconds = times.dt.hour * 3600 + times.dt.minute * 60 + times.dt.second
+    start = TRADING_START.hour * 3600 + TRADING_START.minute * 60
+    end = TRADING_END.hour * 3600 + TRADING_END.minute * 60
+    return times.notna() & (seconds >= start) & (seconds <= end)
+
+
+def _parquet_is_fresh(csv_path: str, parquet_path: str) -> bool:
+    if pq is None or not os.path.exists(parquet_path):
+        return False
+    metadata = pq.read_schema(parquet_path).metadata or {}
+    stat = os.stat(csv_path)
+    return (metadata.get(b'source_mtime_ns') == str(stat.st_mtime_ns).encode()
+            and metadata.get(b'source_size') == str(stat.st_size).encode())
+
+
+def _read_csv_chunks(csv_path: str, parquet_path: str, chunk_size: int) -> Iterator[pd.DataFrame]:
+    """Reads typed chunks from the CSV, writing them to a Parquet copy on the way when pyarrow is available."""
+    stat = os.stat(csv_path)
+    tmp_path = f"{parquet_path}.tmp"
+    writer = None
+    completed = False
+    try:
+        for chunk in pd.read_csv(csv_path, dtype=str, keep_default_na=False, encoding='utf-8-sig',
+                                 chunksize=chunk_size):
+            chunk[TIME_COLUMN] = parse_dissemination(chunk['DISSEMINATION'])
+            if pa is not None:
+                table = pa.Table.from_pandas(chunk, preserve_index=False)
+                if writer is None:
+                    schema = table.schema.with_metadata({
+                        'source_mtime_ns': str(stat.st_mtime_ns),
+                        'source_size': str(stat.st_size),
+                    })
+                    writer = pq.ParquetWriter(tmp_path, schema)
+                writer.write_table(table.cast(writer.schema))
+            yield chunk
+        completed = True
+    finally:
+        if writer is not None:
+            writer.close()
+            if completed:
+                os.replace(tmp_path, parquet_path)
+            else:
+                # Abandoned part-way through: a partial copy must not be mistaken for a fresh one
+                os.remove(tmp_path)
+
+
+def _read_parquet_chunks(parquet_path: str, chunk_size: int) -> Iterator[pd.DataFrame]:
+    parquet_file = pq.ParquetFile(parquet_path)
+    for batch in parquet_file.iter_batches(batch_size=chunk_size):
+        chunk = batch.to_pandas()
+        # Parquet has no second-resolution timestamps; restore the CSV path's dtype
+        chunk[TIME_COLUMN] = chunk[TIME_COLUMN].astype('datetime64[s]')
+        yield chunk
+
+
+def iter_announcements(csv_path: str, subjects: Optional[Sequence[str]] = None, trading_hours_only: bool = False,
+                       chunk_size: int = CHUNK_SIZE) -> Iterator[pd.DataFrame]:
+    """
+    Streams an NSE announcements CSV as typed DataFrame chunks.
+
+    Every chunk keeps the CSV's columns as strings and adds a parsed DISSEMINATION_TIME
+    column (naive IST, NaT where unparseable). SUBJECT and trading-hours filters are
+    applied as boolean masks. The first full read persists a typed Parquet copy next to
+    the CSV. Later runs read that copy directly for as long as the CSV is unchanged.
+
+    Args:
+        csv_path (str): Path to the announcements CSV.
+        subjects (Optional[Sequence[str]]): Keep only these SUBJECT values (after stripping).
+        trading_hours_only (bool): Keep only rows disseminated within trading hours.
+        chunk_size (int): Rows per chunk.
+    """
+    parquet_path = parquet_path_for(csv_path)
+    if _parquet_is_fresh(csv_path, parquet_path):
+        chunks = _read_parquet_chunks(parquet_path, chunk_size)
+    else:
+        chunks = _read_csv_chunks(csv_path, parquet_path, chunk_size)
+    for chunk in chunks:
+        mask = pd.Series(True, index=chunk.index)
+        if subjects is not None:
+            mask &= chunk['SUBJECT'].str.strip().isin(list(subjects))
+        if trading_hours_only:
+            mask &= trading_hours_mask(chunk[TIME_COLUMN])
+        yield chunk[mask]
+
+
+def load_announcements(csv_path: str, subjects: Optional[Sequence[str]] = None,
+                       trading_hours_only: bool = False) -> pd.DataFrame:
+    chunks: List[pd.DataFrame] = list(iter_announcements(csv_path, subjects, trading_hours_only))
+    return pd.concat(chunks, ignore_index=True) if chunks else pd.DataFrame()
@@ -0,0 +1,134 @@
+from typing import Callable, Dict, Optional, Sequence, Tuple
+import numpy as np
+import pandas as pd
+from candle_store import CANDLE_DTYPE
+from fetch_engine import DEFAULT_CONCURRENCY
+from instrumentation import add_rows, span
+import upstox
+
+IST_OFFSET_SECONDS = 19800  # IST is UTC+05:30
+
+
+def _epoch_seconds(times: np.ndarray) -> np.ndarray:
+    """Naive IST datetime64[s] -> float seconds since the Unix epoch (NaN for NaT)."""
+    seconds = times.astype(np.int64).astype(np.float64) - IST_OFFSET_SECONDS
+    return np.where(np.isnat(times), np.nan, seconds)
+
+
+def asof_candles(symbols: Sequence[str], times, concurrency: int = DEFAULT_CONCURRENCY,
+                 key_lookup: Optional[Callable[[str], Optional[str]]] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Resolves the candle for every (symbol, time) row of a table at once.
+
+    Every instrument-day the rows touch is fetched once (see upstox.prefetch_day_candles),
+    then each instrument's days are concatenated into one minute-sorted array and all of
+    its rows are matched in a single as-of search with the usual tolerance: the candle of
+    the target minute, else the nearest one within 1 minute (see upstox.resolve_candle_indices).
+
+    Args:
+        symbols (Sequence[str]): NSE trading symbol per row.
+        times: Naive IST target time per row (datetime64-convertible, NaT/None to skip).
+        concurrency (int): Maximum number of candle requests in flight for missing days.
+        key_lookup (Callable): trading symbol -> instrument key (default upstox.get_instrument_key).
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: (CANDLE_DTYPE row per input row, bool mask of rows
+                                       where a candle was found).
+    """
+    key_lookup = key_lookup or upstox.get_instrument_key
+    times = pd.to_datetime(pd.Series(times), errors='coerce').to_numpy(dtype='datetime64[s]')
+    count = len(times)
+    candles = np.zeros(count, dtype=CANDLE_DTYPE)
+    found = np.zeros(count, dtype=bool)
+    if count == 0:
+        return candles, found
+
+    symbol_codes, unique_symbols = pd.factorize(pd.Series(symbols, dtype=object), use_na_sentinel=True)
+    keys = []
+    for symbol in unique_symbols:
+        key = key_lookup(symbol)
+        if not key:
+            print(f"Instrument key for {symbol} not found.")
+        keys.append(key)
+    # Symbols sharing an instrument key are joined together
+    key_codes_by_symbol, unique_keys = pd.factorize(pd.Series(keys, dtype=object), use_na_sentinel=True)
+    key_codes = np.where(symbol_codes >= 0, key_codes_by_symbol[np.maximum(symbol_codes, 0)], -1)
+
+    valid = (key_codes >= 0) & ~np.isnat(times)
+    rows = np.flatnonzero(valid)
+    days = times[rows].astype('datetime64[D]')
+    # Rows grouped by instrument, then day
+    order = np.lexsort((days.astype(np.int64), key_codes[rows]))
+    rows, days = rows[order], days[order]
+    row_keys = key_codes[rows]
+
+    # Unique (instrument, day) pairs, sorted the same way
+    day_pairs = np.unique(np.stack([row_keys, days.astype(np.int64)], axis=1), axis=0)
+    instrument_days = [(unique_keys[key_code], day) for key_code, day in
+                       zip(day_pairs[:, 0].tolist(), day_pairs[:, 1].astype('datetime64[D]').astype(object))]
+    with span('prefetch'):
+        day_arrays = upstox.prefetch_day_candles(instrument_days, concurrency)
+
+    seconds = _epoch_seconds(times)
+    with span('candle_scan'):
+        key_starts = np.flatnonzero(np.diff(row_keys, prepend=-1))
+        key_ends = np.append(key_starts[1:], len(rows))
+        pair_starts = np.searchsorted(day_pairs[:, 0], row_keys[key_starts], side='left')
+        pair_ends = np.searchsorted(day_pairs[:, 0], row_keys[key_starts], side='right')
+        for row_lo, row_hi, pair_lo, pair_hi in zip(key_starts, key_ends, pair_starts, pair_ends):
+            arrays = []
+            for i in range(pair_lo, pair_hi):
+                if day_arrays[i] is None or len(day_arrays[i]) == 0:
+                    print(f"No candles available for {instrument_days[i][0]} on {instrument_days[i][1]}.")
+                else:
+                    arrays.append(day_arrays[i])
+            if not arrays:
+                continue
+            merged = np.concatenate(arrays) if len(arrays) > 1 else arrays[0]
+            group_rows = rows[row_lo:row_hi]
+            indices = upstox.resolve_candle_indices(merged['minute'], seconds[group_rows])
+            hit = indices >= 0
+            candles[group_rows[hit]] = merged[indices[hit]]
+            found[group_rows[hit]] = True
+    add_rows('price_lookups', count)
+    return candles, found
+
+
+def candle_columns(candles: np.ndarray, found: np.ndarray, prefix: str) -> Dict[str, np.ndarray]:
+    """
+    <prefix>_timestamp/open/high/low/close/volume columns, valued like the Candle records
+    of the row-by-row path: ISO timestamps with the IST offset and prices rounded to 2
+    decimals. Rows without a candle are None/NaN.
+    """
+    ist = (candles['minute'] * 60 + IST_OFFSET_SECONDS).astype('datetime64[s]')
+    timestamps = np.char.add(np.datetime_as_string(ist, unit='s'), '+05:30').astype(object)
+    columns = {f"{prefix}_timestamp": np.where(found, timestamps, None)}
+    for field in ('open', 'high', 'low', 'close'):
+        columns[f"{prefix}_{field}"] = np.where(found, np.round(candles[field].astype(np.float64), 2), np.nan)
+    columns[f"{prefix}_volume"] = np.where(found, candles['volume'].astype(np.float64), np.nan)
+    return columns
+
+
+def attach_candles(df: pd.DataFrame, windows: Dict[str, Sequence], symbol_column: str = 'nse_id',
+                   concurrency: int = DEFAULT_CONCURRENCY,
+                   key_lookup: Optional[Callable[[str], Optional[str]]] = None) -> pd.DataFrame:
+    """
+    Table-level price join: resolves the candle at each of several time columns for
+    every row, e.g. windows={'start': df['price_start_time'], 'end': df['price_end_time']}
+    gives the start_* and end_* columns. All windows are resolved in one asof_candles pass.
+
+    Returns:
+        pd.DataFrame: Indexed like df, with <prefix>_<field> columns per window.
+    """
+    symbols = df[symbol_column].to_numpy(dtype=object)
+    prefixes = list(windows)
+    times = np.concatenate([
+        pd.to_datetime(pd.Series(windows[prefix]), errors='coerce').to_numpy(dtype='datetime64[s]')
+        for prefix in prefixes
+    ]) if prefixes else np.empty(0, dtype='datetime64[s]')
+    candles, found = asof_candles(np.tile(symbols, len(prefixes)), times, concurrency, key_lookup)
+    columns = {}
+    for i, prefix in enumerate(prefixes):
+        part = slice(i * len(df), (i + 1) * len(df))
+        columns.update(candle_columns(candles[part], found[part], prefix))
+    return pd.DataFrame(columns, index=df.index)
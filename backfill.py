@@ -0,0 +1,267 @@
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+import candle_store
+import instrumentation
+from instrumentation import add_rows, span
+from fetch_engine import DEFAULT_CONCURRENCY, get_session
+from instrument_index import DEFAULT_SEGMENT, load_index
+from request_planner import plan_range_requests
+from trading_calendar import IST, trading_days
+import upstox
+
+# Upstox minute history starts in January 2022
+HISTORY_START = date(2022, 1, 1)
+# One line per finished work unit; the last line for a unit wins
+MANIFEST_PATH = 'stockanalysis/backfill_manifest.jsonl'
+COMPLETED, EMPTY, FAILED = 'completed', 'empty', 'failed'
+# Seconds between progress lines while running
+REPORT_SECONDS = 10.0
+
+Unit = Tuple[str, date, date]  # (instrument_key, from_day, to_day), both days inclusive
+
+
+def unit_id(unit: Unit) -> str:
+    instrument_key, from_day, to_day = unit
+    return f"{instrument_key}|{from_day.isoformat()}|{to_day.isoformat()}"
+
+
+def universe(segment: str = DEFAULT_SEGMENT, symbols: Optional[Iterable[str]] = None) -> List[str]:
+    """Instrument keys of a segment in the instrument index (NSE.json and NSE_MIS.json), optionally limited to symbols."""
+    index = load_index()
+    if symbols is not None:
+        keys = (index.get((segment, symbol)) for symbol in symbols)
+        return sorted({key for key in keys if key})
+    return sorted({key for (key_segment, _), key in index.items() if key_segment == segment})
+
+
+def plan_units(instrument_keys: Sequence[str], from_day: date, to_day: date) -> List[Unit]:
+    """Every instrument's trading days in [from_day, to_day], packed into range requests (see request_planner)."""
+    days = trading_days(from_day, to_day)
+    return plan_range_requests((instrument_key, day) for instrument_key in instrument_keys for day in days)
+
+
+def load_manifest(path: str = MANIFEST_PATH) -> Dict[str, dict]:
+    """Latest manifest entry per unit id."""
+    entries = {}
+    if not os.path.exists(path):
+        return entries
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                # A crash mid-write can leave a truncated last line; that unit is simply redone
+                continue
+            entries[entry['unit']] = entry
+    return entries
+
+
+def terminate_last_line(path: str) -> None:
+    # Appending after a truncated last line would glue the next entry onto it
+    if not os.path.exists(path) or os.path.getsize(path) == 0:
+        return
+    with open(path, 'rb+') as f:
+        f.seek(-1, os.SEEK_END)
+        if f.read(1) != b'\n':
+            f.write(b'\n')
+
+
+def _stored_files(instrument_key: str, store_dir: Optional[str] = None) -> set:
+    directory = os.path.dirname(candle_store._partition_path(instrument_key, HISTORY_START, store_dir))
+    return set(os.listdir(directory)) if os.path.isdir(directory) else set()
+
+
+def missing_days(unit: Unit, stored: Optional[set] = None, store_dir: Optional[str] = None) -> List[date]:
+    """
+    Trading days of a unit without a partition in the candle store. `stored` is the set of
+    file names in the instrument's store directory, listed once per instrument by callers
+    checking many units.
+
+    Units end before today, so their partitions are written immutable; a partition left
+    mutable by an ad hoc fetch is re-downloaded by candle_store on its next read.
+    """
+    instrument_key, from_day, to_day = unit
+    if stored is None:
+        stored = _stored_files(instrument_key, store_dir)
+    return [day for day in trading_days(from_day, to_day) if f"{day.isoformat()}.npz" not in stored]
+
+
+def pending_units(units: Sequence[Unit], manifest: Dict[str, dict], retry_failed: bool = True,
+                  check_gaps: bool = True, store_dir: Optional[str] = None) -> Tuple[List[Unit], int]:
+    """
+    Units still to run: never finished, failed (when retry_failed), or (when check_gaps)
+    recorded as completed but with trading days missing from the candle store, e.g. after
+    partitions were deleted.
+
+    Returns:
+        Tuple[List[Unit], int]: The pending units and how many of them are gap refills.
+    """
+    pending, gaps = [], 0
+    listings: Dict[str, set] = {}
+    for unit in units:
+        entry = manifest.get(unit_id(unit))
+        status = entry['status'] if entry else None
+        if status is None or (status == FAILED and retry_failed):
+            pending.append(unit)
+        elif status == COMPLETED and check_gaps:
+            instrument_key = unit[0]
+            if instrument_key not in listings:
+                listings[instrument_key] = _stored_files(instrument_key, store_dir)
+            if missing_days(unit, listings[instrument_key]):
+                pending.append(unit)
+                gaps += 1
+    return pending, gaps
+
+
+def run_unit(unit: Unit) -> dict:
+    """Downloads one unit into the candle store and returns its manifest entry."""
+    instrument_key, from_day, to_day = unit
+    started = time.perf_counter()
+    try:
+        by_day = upstox.fetch_range_candles(instrument_key, from_day, to_day)
+    except Exception as e:
+        by_day, error = None, str(e)
+    else:
+        error = None if by_day is not None else 'request failed'
+    entry = {'unit': unit_id(unit), 'seconds': round(time.perf_counter() - started, 3),
+             'at': datetime.now(IST).isoformat(timespec='seconds')}
+    if by_day is None:
+        entry.update(status=FAILED, error=error)
+    else:
+        candles = sum(len(arrays) for arrays in by_day.values())
+        # No candles at all over the range: not listed yet, suspended or delisted
+        entry.update(status=COMPLETED if candles else EMPTY, candles=candles)
+    return entry
+
+
+class Progress:
+    """Throughput and ETA over the units of one run, printed at most every report_seconds."""
+
+    def __init__(self, total: int, report_seconds: float = REPORT_SECONDS):
+        self.total = total
+        self.report_seconds = report_seconds
+        self.started = self.last_report = time.perf_counter()
+        self.counts = {COMPLETED: 0, EMPTY: 0, FAILED: 0}
+        self.candles = 0
+
+    @property
+    def done(self) -> int:
+        return sum(self.counts.values())
+
+    def update(self, entry: dict) -> None:
+        self.counts[entry['status']] += 1
+        self.candles += entry.get('candles', 0)
+        now = time.perf_counter()
+        if now - self.last_report >= self.report_seconds or self.done == self.total:
+            self.last_report = now
+            print(self.line())
+
+    def line(self) -> str:
+        elapsed = max(time.perf_counter() - self.started, 1e-9)
+        rate = self.done / elapsed
+        remaining = (self.total - self.done) / rate if rate else float('inf')
+        eta = str(timedelta(seconds=int(remaining))) if remaining != float('inf') else '?'
+        percent = self.done / self.total * 100 if self.total else 100.0
+        return (f"Backfill: {self.done}/{self.total} units ({percent:.1f}%), "
+                f"{self.counts[COMPLETED]} completed, {self.counts[EMPTY]} empty, {self.counts[FAILED]} failed | "
+                f"{rate:.2f} units/s, {self.candles / elapsed:,.0f} candles/s | ETA {eta}")
+
+
+def backfill(instrument_keys: Sequence[str], from_day: date = HISTORY_START, to_day: Optional[date] = None,
+             concurrency: int = DEFAULT_CONCURRENCY, manifest_path: str = MANIFEST_PATH,
+             retry_failed: bool = True, check_gaps: bool = True, limit: Optional[int] = None,
+             report_seconds: float = REPORT_SECONDS) -> Dict[str, int]:
+    """
+    Downloads minute history for instrument_keys into the candle store.
+
+    The range is cut into (instrument, date range) units of at most one request each. Units
+    run on `concurrency` threads, all sharing fetch_engine's Upstox rate limiter. Every
+    finished unit is appended to the manifest as completed, empty (no candles in the
+    range) or failed. A rerun skips finished units, so an interrupted backfill resumes
+    where it stopped, and refills completed units with days missing from the store.
+
+    Args:
+        instrument_keys (Sequence[str]): Instruments to backfill, e.g. universe().
+        from_day (date): First day (default HISTORY_START).
+        to_day (date): Last day (default yesterday, IST: only finished days are final).
+        concurrency (int): Units in flight.
+        manifest_path (str): Manifest JSONL file.
+        retry_failed (bool): Rerun units recorded as failed.
+        check_gaps (bool): Verify completed units against the candle store.
+        limit (int): Run at most this many pending units.
+
+    Returns:
+        Dict[str, int]: Unit counts of this run by status, plus 'planned', 'pending' and 'gaps'.
+    """
+    to_day = to_day or datetime.now(IST).date() - timedelta(days=1)
+    with span('backfill_plan'):
+        units = plan_units(instrument_keys, from_day, to_day)
+        pending, gaps = pending_units(units, load_manifest(manifest_path), retry_failed, check_gaps)
+    if limit is not None:
+        pending = pending[:limit]
+    print(f"Backfill {from_day} to {to_day}: {len(units)} units planned for {len(instrument_keys)} instruments, "
+          f"{len(pending)} to run ({gaps} gap refills).")
+
+    progress = Progress(len(pending), report_seconds)
+    if pending:
+        get_session(concurrency)  # One pooled connection per worker
+        os.makedirs(os.path.dirname(manifest_path) or '.', exist_ok=True)
+        terminate_last_line(manifest_path)
+        with open(manifest_path, 'a', encoding='utf-8') as manifest, \
+                ThreadPoolExecutor(max_workers=max(1, concurrency)) as executor:
+            futures = [executor.submit(run_unit, unit) for unit in pending]
+            try:
+                for future in as_completed(futures):
+                    entry = future.result()
+                    manifest.write(json.dumps(entry) + '\n')
+                    manifest.flush()
+                    add_rows('backfill_units', 1)
+                    progress.update(entry)
+            except KeyboardInterrupt:
+                executor.shutdown(wait=False, cancel_futures=True)
+                print(f"Interrupted: {progress.line()}. Rerun to resume.")
+                raise
+    return dict(progress.counts, planned=len(units), pending=len(pending), gaps=gaps)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Resumable minute-history backfill of the instrument universe.')
+    parser.add_argument('--from', dest='from_day', type=date.fromisoformat, default=HISTORY_START)
+    parser.add_argument('--to', dest='to_day', type=date.fromisoformat, default=None,
+                        help='Last day to backfill (default: yesterday)')
+    parser.add_argument('--segment', default=DEFAULT_SEGMENT)
+    parser.add_argument('--symbols', nargs='+', default=None, help='Only these trading symbols')
+    parser.add_argument('--concurrency', type=int, default=DEFAULT_CONCURRENCY, help='Units in flight')
+    parser.add_argument('--manifest', default=MANIFEST_PATH)
+    parser.add_argument('--limit', type=int, default=None, help='Run at most this many units')
+    parser.add_argument('--skip-failed', action='store_true', help='Do not retry units recorded as failed')
+    parser.add_argument('--no-gap-check', action='store_true',
+                        help='Trust completed units without checking the candle store')
+    parser.add_argument('--restart', action='store_true', help='Discard the manifest and start over')
+    parser.add_argument('--rollups', action='store_true', help='Update the rollups of backfilled instruments afterwards')
+    parser.add_argument('--metrics', action='store_true',
+                        help=f'Write run metrics to {instrumentation.METRICS_DIR} (same as {instrumentation.ENV_FLAG}=1)')
+    args = parser.parse_args()
+    if args.metrics:
+        instrumentation.enable()
+    if args.restart and os.path.exists(args.manifest):
+        os.remove(args.manifest)
+
+    keys = universe(args.segment, args.symbols)
+    counts = backfill(keys, args.from_day, args.to_day, args.concurrency, args.manifest,
+                      retry_failed=not args.skip_failed, check_gaps=not args.no_gap_check, limit=args.limit)
+    print(f"Backfill finished: {counts}")
+    if args.rollups:
+        from rollups import update_rollups
+        added = sum(update_rollups(instrument_key)[1] for instrument_key in keys)
+        print(f"Rolled up {added} new instrument-days.")
+    candle_store.report_stats()
+    instrumentation.write_reports('backfill')
@@ -0,0 +1,210 @@
+import argparse
+import time
+import warnings
+from typing import Dict, Optional, Sequence
+import numpy as np
+import pandas as pd
+from fetch_engine import DEFAULT_CONCURRENCY
+from moneycontrol_earnings import clean_numeric
+import results_store
+from profit_analysis import TIME_COLUMN, build_feature_matrix
+from trading_calendar import TRADING_END, TRADING_START
+
+SWEEP_CSV = 'stockanalysis/backtest_sweep.csv'
+SURPRISE_METRIC = 'net_profit'
+DEFAULT_THRESHOLDS = list(range(0, 101, 5))  # minimum surprise, %
+DEFAULT_VOLUME_FILTERS = [0, 2000, 10000, 50000]  # minimum start candle volume
+DEFAULT_DELAYS = [0, 1, 5, 15]  # trading minutes from the start candle to entry
+DEFAULT_HOLDING = [5, 15, 40, 60, 120]  # trading minutes from entry to exit
+# Round-trip cost of a trade in % of the entry price: fees plus slippage on both legs
+COST_MODELS = {
+    'frictionless': 0.0,
+    'fees': 0.1,
+    'fees+slippage': 0.2,
+    'fees+high_slippage': 0.5,
+}
+# Trades needed before a combination is ranked
+MIN_TRADES = 5
+# Upper bound on values held at once by sweep(), combinations x announcements
+MAX_CHUNK_VALUES = 4_000_000
+
+
+def trading_hours_mask(df: pd.DataFrame) -> np.ndarray:
+    """
+    Vectorized filter_trading_hours (without its volume condition, which is a sweep
+    parameter): announcement, start and end times all within TRADING_START-TRADING_END.
+    """
+    mask = np.ones(len(df), dtype=bool)
+    for column in (TIME_COLUMN, 'start_timestamp', 'end_timestamp'):
+        if column not in df.columns:
+            continue
+        # Wall-clock IST time; tz-aware timestamps keep their +05:30 offset
+        times = pd.to_datetime(df[column].astype('string').str.slice(0, 19), errors='coerce')
+        clock = times.dt.hour * 60 + times.dt.minute
+        start, end = TRADING_START.hour * 60 + TRADING_START.minute, TRADING_END.hour * 60 + TRADING_END.minute
+        mask &= ((clock >= start) & (clock <= end)).fillna(False).to_numpy(dtype=bool)
+    return mask
+
+
+def window_returns(df: pd.DataFrame) -> np.ndarray:
+    """The stored start -> end price window as an (N, 1 delay, 1 holding period) % return matrix."""
+    returns = (clean_numeric(df['end_close']) / clean_numeric(df['start_close']) - 1) * 100
+    return returns.to_numpy(dtype=np.float64).reshape(-1, 1, 1)
+
+
+def offset_returns(df: pd.DataFrame, delays: Sequence[int], holding: Sequence[int],
+                   concurrency: int = DEFAULT_CONCURRENCY) -> np.ndarray:
+    """
+    (N, delays, holding periods) % returns from entry (start candle + delay) to exit
+    (entry + holding), all in trading minutes, from one event_study pass over the candle store.
+    """
+    from event_study import run_event_study
+
+    offsets = sorted({delay for delay in delays} | {delay + hold for delay in delays for hold in holding})
+    horizons = [f"{offset}m" for offset in offsets if offset > 0]
+    study = run_event_study(df, horizons, concurrency=concurrency)['return'] if horizons else None
+    # Price at each offset relative to the start candle close
+    ratio = {0: np.ones(len(df))}
+    ratio.update({offset: 1 + study[f"{offset}m"].to_numpy(dtype=np.float64) / 100 for offset in offsets if offset > 0})
+    returns = np.empty((len(df), len(delays), len(holding)))
+    for i, delay in enumerate(delays):
+        for j, hold in enumerate(holding):
+            returns[:, i, j] = (ratio[delay + hold] / ratio[delay] - 1) * 100
+    return returns
+
+
+def sweep(returns: np.ndarray, surprise: np.ndarray, volume: np.ndarray,
+          thresholds: Sequence[float] = DEFAULT_THRESHOLDS, volume_filters: Sequence[float] = DEFAULT_VOLUME_FILTERS,
+          cost_models: Optional[Dict[str, float]] = None, eligible: Optional[np.ndarray] = None,
+          delays: Optional[Sequence] = None, holding: Optional[Sequence] = None) -> pd.DataFrame:
+    """
+    Backtests every (threshold, volume filter, entry delay, holding period, cost model)
+    combination at once: enter every eligible announcement with surprise > threshold and
+    start volume >= the filter, one equal-sized trade each.
+
+    The evaluation is a single broadcast over (thresholds, volume filters, delays,
+    holding periods, costs, announcements), chunked over thresholds to bound memory.
+
+    Args:
+        returns (np.ndarray): (N, delays, holding periods) gross % returns, rows in time order,
+                              NaN where a price is missing (see offset_returns/window_returns).
+        surprise (np.ndarray): (N,) earnings surprise, %.
+        volume (np.ndarray): (N,) start candle volume.
+        cost_models (Dict[str, float]): name -> round-trip cost in % (default COST_MODELS).
+        eligible (np.ndarray): (N,) bool, e.g. trading_hours_mask(df).
+        delays, holding: Labels of the returns axes (default their positions).
+
+    Returns:
+        pd.DataFrame: One row per combination with trades, hit_rate, mean/median/total
+                      net return and max_drawdown (peak-to-trough of the cumulative net
+                      return, in % points).
+    """
+    cost_models = COST_MODELS if cost_models is None else cost_models
+    n, n_delays, n_holding = returns.shape
+    delays = list(range(n_delays)) if delays is None else list(delays)
+    holding = list(range(n_holding)) if holding is None else list(holding)
+    thresholds = np.asarray(thresholds, dtype=np.float64)
+    volume_filters = np.asarray(volume_filters, dtype=np.float64)
+    costs = np.asarray(list(cost_models.values()), dtype=np.float64)
+    eligible = np.ones(n, dtype=bool) if eligible is None else np.asarray(eligible, dtype=bool)
+    if n == 0:
+        # One announcement that never trades keeps the reductions below well defined
+        n, returns, surprise, volume, eligible = 1, np.full((1, n_delays, n_holding), np.nan), [np.nan], [np.nan], [False]
+    surprise, volume = np.asarray(surprise, dtype=np.float64), np.asarray(volume, dtype=np.float64)
+
+    # (delay, holding, cost, N) net returns and (delay, holding, 1, N) availability
+    gross = np.moveaxis(returns, 0, -1)[:, :, None, :]
+    net = gross - costs[None, None, :, None]
+    priced = ~np.isnan(gross)
+    # (threshold, volume filter, N) entry signals; NaN surprise/volume never trade
+    with np.errstate(invalid='ignore'):
+        signal = ((surprise[None, :] > thresholds[:, None])[:, None, :]
+                  & (volume[None, :] >= volume_filters[:, None])[None, :, :] & eligible)
+
+    combos = len(volume_filters) * n_delays * n_holding * len(costs)
+    step = max(1, MAX_CHUNK_VALUES // max(1, combos * n))
+    stats = {name: [] for name in ('trades', 'hits', 'mean', 'median', 'total', 'drawdown')}
+    for lo in range(0, len(thresholds), step):
+        # (threshold chunk, volume filter, delay, holding, cost, N)
+        chunk = signal[lo:lo + step]
+        taken = np.broadcast_to(chunk[:, :, None, None, None, :] & priced, chunk.shape[:2] + net.shape)
+        pnl = np.where(taken, net, 0.0)
+        trades = taken.sum(axis=-1)
+        equity = np.cumsum(pnl, axis=-1)
+        peak = np.maximum.accumulate(np.maximum(equity, 0.0), axis=-1)
+        with warnings.catch_warnings(), np.errstate(invalid='ignore', divide='ignore'):
+            warnings.simplefilter('ignore', RuntimeWarning)
+            stats['median'].append(np.nanmedian(np.where(taken, net, np.nan), axis=-1))
+            stats['mean'].append(equity[..., -1] / trades)
+        stats['trades'].append(trades)
+        stats['hits'].append((taken & (net > 0)).sum(axis=-1))
+        stats['total'].append(equity[..., -1])
+        stats['drawdown'].append((peak - equity).max(axis=-1))
+    stats = {name: np.concatenate(values).ravel() for name, values in stats.items()}
+
+    grid = pd.MultiIndex.from_product(
+        [thresholds, volume_filters, delays, holding, list(cost_models)],
+        names=['threshold', 'min_volume', 'entry_delay', 'holding', 'cost_model'],
+    ).to_frame(index=False)
+    trades = stats['trades']
+    with np.errstate(invalid='ignore', divide='ignore'):
+        hit_rate = np.where(trades > 0, stats['hits'] / trades, np.nan)
+    return grid.assign(
+        trades=trades, hit_rate=hit_rate, mean_return=stats['mean'], median_return=stats['median'],
+        total_return=stats['total'], max_drawdown=stats['drawdown'],
+    )
+
+
+def rank(results: pd.DataFrame, by: str = 'mean_return', min_trades: int = MIN_TRADES) -> pd.DataFrame:
+    """Best combinations first; combinations with fewer than min_trades trades go last."""
+    enough = results['trades'] >= min_trades
+    ranked = results.assign(_enough=enough).sort_values(
+        ['_enough', by, 'hit_rate', 'max_drawdown'], ascending=[False, False, False, True],
+        na_position='last', kind='stable',
+    )
+    return ranked.drop(columns='_enough').reset_index(drop=True)
+
+
+def backtest(df: pd.DataFrame, returns: np.ndarray, metric: str = SURPRISE_METRIC, session_only: bool = True,
+             **sweep_args) -> pd.DataFrame:
+    """Runs sweep() over a results table, rows taken in announcement order, and ranks the outcome."""
+    order = np.argsort(pd.to_datetime(df[TIME_COLUMN], errors='coerce').to_numpy(), kind='stable')
+    features, _ = build_feature_matrix(df)
+    surprise = features[f"{metric}_surprise_pct"].to_numpy()
+    volume = clean_numeric(df['start_volume']).to_numpy() if 'start_volume' in df.columns else np.zeros(len(df))
+    eligible = trading_hours_mask(df) if session_only else None
+    return rank(sweep(returns[order], surprise[order], volume[order],
+                      eligible=None if eligible is None else eligible[order], **sweep_args))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Sweep earnings-surprise entry strategies over announcement price moves.')
+    parser.add_argument('--input', default=None,
+                        help='Read this .xlsx or .csv results table instead of the results store')
+    parser.add_argument('--output', default=SWEEP_CSV)
+    parser.add_argument('--metric', default=SURPRISE_METRIC, help='Earnings metric whose surprise triggers entries')
+    parser.add_argument('--thresholds', type=float, nargs='+', default=DEFAULT_THRESHOLDS)
+    parser.add_argument('--volume-filters', type=float, nargs='+', default=DEFAULT_VOLUME_FILTERS)
+    parser.add_argument('--candles', action='store_true',
+                        help='Price entry delays and holding periods from the candle store '
+                             '(default: only the stored start/end window)')
+    parser.add_argument('--delays', type=int, nargs='+', default=DEFAULT_DELAYS)
+    parser.add_argument('--holding', type=int, nargs='+', default=DEFAULT_HOLDING)
+    parser.add_argument('--all-hours', action='store_true', help='Do not restrict to announcements in trading hours')
+    parser.add_argument('--concurrency', type=int, default=DEFAULT_CONCURRENCY,
+                        help='Maximum number of candle requests in flight')
+    args = parser.parse_args()
+
+    df = results_store.typed_results(results_store.load_table(args.input)) if args.input else results_store.read_results()
+    if args.candles:
+        returns = offset_returns(df, args.delays, args.holding, args.concurrency)
+        axes = {'delays': args.delays, 'holding': args.holding}
+    else:
+        returns = window_returns(df)
+        axes = {'delays': [0], 'holding': ['window']}
+    started = time.perf_counter()
+    results = backtest(df, returns, args.metric, not args.all_hours, thresholds=args.thresholds,
+                       volume_filters=args.volume_filters, **axes)
+    print(f"Swept {len(results)} combinations over {len(df)} announcements in {time.perf_counter() - started:.2f}s")
+    print(results.head(20).to_string(index=False))
+    results.to_csv(args.output, index=False)
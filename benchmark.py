@@ -0,0 +1,271 @@
+import argparse
+import contextlib
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import date, datetime
+from typing import Callable, Dict, Iterator, List, Optional, Sequence
+import numpy as np
+import candle_store
+import fetch_engine
+import historicaldata
+import instrument_index
+import process_announcements
+import results_store
+import upstox
+from fetch_engine import DEFAULT_CONCURRENCY, RateLimiter
+from get_prices_for_times import get_prices_for_times
+from synthetic_data import (board_meeting_results, random_session_times, write_announcements_csv,
+                            write_nse_json)
+from upstox_stub import UpstoxStub
+
+# Synthetic announcements and candles fall in this (past, so immutable) range
+FROM_DAY = date(2025, 1, 1)
+TO_DAY = date(2025, 3, 31)
+DEFAULT_INSTRUMENT_COUNTS = [10_000, 100_000, 500_000]
+# Symbols the price benchmarks spread their requests over
+PRICE_SYMBOLS = 50
+SEED = 7
+
+
+@contextlib.contextmanager
+def patched(target, **attributes) -> Iterator[None]:
+    """Temporarily replaces module attributes (e.g. a module's file path constants)."""
+    originals = {name: getattr(target, name) for name in attributes}
+    for name, value in attributes.items():
+        setattr(target, name, value)
+    try:
+        yield
+    finally:
+        for name, value in originals.items():
+            setattr(target, name, value)
+
+
+@contextlib.contextmanager
+def bench_environment(workdir: str, nse_json: str, stub: Optional[UpstoxStub], rate_limit: bool) -> Iterator[None]:
+    """
+    Points the pipeline at the synthetic instrument file, a scratch candle store and the
+    local Upstox stub. The Upstox quotas are lifted unless rate_limit is set, so the
+    numbers reflect this code rather than the API's throttling.
+    """
+    with contextlib.ExitStack() as stack:
+        stack.enter_context(patched(instrument_index, SOURCE_PATHS=[nse_json],
+                                    INDEX_PATH=os.path.join(workdir, 'instrument_index.sqlite')))
+        stack.enter_context(patched(candle_store, CANDLE_STORE_DIR=os.path.join(workdir, 'candle_store')))
+        if stub is not None:
+            stack.enter_context(patched(upstox, UPSTOX_BASE_URL=stub.base_url))
+        if not rate_limit:
+            stack.enter_context(patched(fetch_engine, _limiter=RateLimiter([])))
+        instrument_index.reset_index()
+        stack.callback(instrument_index.reset_index)
+        yield
+
+
+def measure(name: str, func: Callable[[], object], items: int, stub: Optional[UpstoxStub] = None,
+            trace_memory: bool = True, **params) -> Dict:
+    """Runs func once, with the pipeline's progress output silenced, and records its cost."""
+    candle_store.STATS.update(hits=0, misses=0)
+    if stub is not None:
+        stub.reset_counters()
+    if trace_memory:
+        tracemalloc.start()
+    try:
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            started = time.perf_counter()
+            func()
+            seconds = time.perf_counter() - started
+        peak = tracemalloc.get_traced_memory()[1] if trace_memory else None
+    finally:
+        if trace_memory:
+            tracemalloc.stop()
+    return {
+        'benchmark': name,
+        'params': params,
+        'seconds': round(seconds, 4),
+        'items': items,
+        'items_per_sec': round(items / seconds, 1) if seconds > 0 else None,
+        'requests': stub.requests if stub is not None else 0,
+        'bytes_received': stub.bytes_sent if stub is not None else 0,
+        'store_hits': candle_store.STATS['hits'],
+        'store_misses': candle_store.STATS['misses'],
+        'peak_memory_mb': round(peak / 2 ** 20, 2) if peak is not None else None,
+    }
+
+
+def bench_instrument_lookup(workdir: str, counts: Sequence[int], lookups: int, trace_memory: bool) -> List[Dict]:
+    """get_instrument_key: index build (cold), index load (warm) and steady-state lookups per NSE.json size."""
+    results = []
+    for count in counts:
+        count_dir = os.path.join(workdir, f"instruments_{count}")
+        os.makedirs(count_dir)
+        nse_json = os.path.join(count_dir, 'NSE.json')
+        symbols = write_nse_json(nse_json, count)
+        queries = random.Random(SEED).choices(symbols, k=lookups)
+        with bench_environment(count_dir, nse_json, None, rate_limit=False):
+            results.append(measure('get_instrument_key.build', lambda: upstox.get_instrument_key(symbols[0]), 1,
+                                   trace_memory=trace_memory, instruments=count))
+            instrument_index.reset_index()
+            results.append(measure('get_instrument_key.load', lambda: upstox.get_instrument_key(symbols[0]), 1,
+                                   trace_memory=trace_memory, instruments=count))
+
+            def lookup_all():
+                for symbol in queries:
+                    upstox.get_instrument_key(symbol)
+
+            results.append(measure('get_instrument_key.lookup', lookup_all, lookups,
+                                   trace_memory=trace_memory, instruments=count))
+    return results
+
+
+def bench_fetch_historical_candle(symbols: Sequence[str], stub: UpstoxStub, calls: int,
+                                  trace_memory: bool) -> List[Dict]:
+    """fetch_historical_candle_v3 over random instrument-days: cold (API) then warm (candle store)."""
+    rng = np.random.default_rng(SEED)
+    times = random_session_times(rng, calls, FROM_DAY, TO_DAY, first_hour=9, last_hour=15)
+    targets = [(symbols[i], dt) for i, dt in zip(rng.integers(0, len(symbols), calls), times)]
+
+    def run():
+        for symbol, dt in targets:
+            upstox.fetch_historical_candle_v3(upstox.get_instrument_key(symbol), upstox.IST.localize(dt))
+
+    upstox.get_instrument_key(symbols[0])  # keep the index load out of the measurement
+    return [
+        measure('fetch_historical_candle_v3.cold', run, calls, stub, trace_memory, calls=calls),
+        measure('fetch_historical_candle_v3.warm', run, calls, stub, trace_memory, calls=calls),
+    ]
+
+
+def bench_get_prices_for_times(symbols: Sequence[str], stub: UpstoxStub, times_per_symbol: int,
+                               concurrency: int, trace_memory: bool) -> List[Dict]:
+    """get_prices_for_times for several symbols, each with many times over the whole range."""
+    rng = np.random.default_rng(SEED)
+    requests = {
+        symbol: [dt.strftime('%Y-%m-%d %H:%M:%S') for dt in
+                 random_session_times(rng, times_per_symbol, FROM_DAY, TO_DAY, first_hour=9, last_hour=15)]
+        for symbol in symbols[:10]
+    }
+
+    def run():
+        for symbol, dt_strs in requests.items():
+            get_prices_for_times(symbol, dt_strs, concurrency)
+
+    items = sum(len(dt_strs) for dt_strs in requests.values())
+    upstox.get_instrument_key(symbols[0])
+    return [
+        measure('get_prices_for_times.cold', run, items, stub, trace_memory, times=items, concurrency=concurrency),
+        measure('get_prices_for_times.warm', run, items, stub, trace_memory, times=items, concurrency=concurrency),
+    ]
+
+
+def bench_process_announcements(workdir: str, symbols: Sequence[str], stub: UpstoxStub, rows: int,
+                                concurrency: int, trace_memory: bool) -> List[Dict]:
+    """process_announcements.main over a synthetic announcements export, from scratch each time."""
+    csv_path = os.path.join(workdir, 'announcements.csv')
+    order_wins = write_announcements_csv(csv_path, symbols, rows, FROM_DAY, TO_DAY, SEED)
+    results = []
+    with patched(process_announcements, ANNOUNCEMENTS_CSV=csv_path,
+                 OUTPUT_CSV=os.path.join(workdir, 'announcements_with_price_diff.csv'),
+                 MANIFEST_PATH=os.path.join(workdir, 'announcements.manifest.jsonl')):
+        for phase in ('cold', 'warm'):
+            results.append(measure(f'process_announcements.main.{phase}',
+                                   lambda: process_announcements.main(concurrency, restart=True), order_wins,
+                                   stub, trace_memory, announcements=rows, concurrency=concurrency))
+    return results
+
+
+def bench_historicaldata(workdir: str, symbols: Sequence[str], stub: UpstoxStub, rows: int,
+                         concurrency: int, trace_memory: bool) -> List[Dict]:
+    """historicaldata.main (results store in, windows, as-of price join, results store out)."""
+    store_dir = os.path.join(workdir, 'results_store')
+    results = []
+    with patched(results_store, RESULTS_STORE_DIR=store_dir):
+        results_store.write_results(board_meeting_results(symbols, rows, FROM_DAY, TO_DAY, SEED))
+        for phase in ('cold', 'warm'):
+            results.append(measure(f'historicaldata.main.{phase}', lambda: historicaldata.main(concurrency), rows,
+                                   stub, trace_memory, rows=rows, concurrency=concurrency))
+    return results
+
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_report(results: List[Dict]) -> None:
+    header = f"{'benchmark':<36} {'params':<34} {'seconds':>9} {'items/s':>11} {'requests':>9} {'MB recv':>8} {'peak MB':>8}"
+    print(header)
+    print('-' * len(header))
+    for result in results:
+        params = ' '.join(f"{key}={value}" for key, value in result['params'].items())
+        peak = result['peak_memory_mb']
+        print(f"{result['benchmark']:<36} {params:<34} {result['seconds']:>9.3f} "
+              f"{result['items_per_sec'] or 0:>11.1f} {result['requests']:>9} "
+              f"{result['bytes_received'] / 2 ** 20:>8.1f} {'-' if peak is None else f'{peak:.1f}':>8}")
+
+
+def run_benchmarks(args) -> List[Dict]:
+    workdir = tempfile.mkdtemp(prefix='stockanalysis-bench-')
+    try:
+        results = []
+        selected = set(args.only or BENCHMARKS)
+        if 'instrument' in selected:
+            results += bench_instrument_lookup(workdir, args.instrument_counts, args.lookups, args.memory)
+
+        price_benchmarks = selected - {'instrument'}
+        if price_benchmarks:
+            nse_json = os.path.join(workdir, 'NSE.json')
+            symbols = write_nse_json(nse_json, min(args.instrument_counts))[:PRICE_SYMBOLS]
+            with UpstoxStub(args.latency_ms) as stub, \
+                    bench_environment(workdir, nse_json, stub, args.rate_limit):
+                if 'candle' in selected:
+                    results += bench_fetch_historical_candle(symbols, stub, args.candle_calls, args.memory)
+                if 'prices' in selected:
+                    results += bench_get_prices_for_times(symbols, stub, args.price_times, args.concurrency,
+                                                          args.memory)
+                if 'announcements' in selected:
+                    results += bench_process_announcements(workdir, symbols, stub, args.announcements,
+                                                           args.concurrency, args.memory)
+                if 'historicaldata' in selected:
+                    results += bench_historicaldata(workdir, symbols, stub, args.board_meetings,
+                                                    args.concurrency, args.memory)
+        return results
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+BENCHMARKS = ['instrument', 'candle', 'prices', 'announcements', 'historicaldata']
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Throughput benchmarks against synthetic data and a local Upstox stub.')
+    parser.add_argument('--only', nargs='+', choices=BENCHMARKS, help='Run only these benchmarks')
+    parser.add_argument('--instrument-counts', nargs='+', type=int, default=DEFAULT_INSTRUMENT_COUNTS,
+                        help='Synthetic NSE.json sizes to benchmark get_instrument_key on')
+    parser.add_argument('--lookups', type=int, default=100_000, help='get_instrument_key calls per size')
+    parser.add_argument('--latency-ms', type=float, default=20.0, help='Stub latency per candle request')
+    parser.add_argument('--candle-calls', type=int, default=200, help='fetch_historical_candle_v3 calls')
+    parser.add_argument('--price-times', type=int, default=200, help='Times per symbol for get_prices_for_times')
+    parser.add_argument('--announcements', type=int, default=5000, help='Rows in the synthetic announcements CSV')
+    parser.add_argument('--board-meetings', type=int, default=300, help='Rows in the synthetic results store')
+    parser.add_argument('--concurrency', type=int, default=DEFAULT_CONCURRENCY)
+    parser.add_argument('--rate-limit', action='store_true', help='Keep the Upstox API quotas in force')
+    parser.add_argument('--no-memory', dest='memory', action='store_false',
+                        help='Skip tracemalloc (faster, but no peak memory)')
+    parser.add_argument('--json', help='Also write the results, tagged with the git revision, to this file')
+    args = parser.parse_args()
+
+    started = datetime.now()
+    results = run_benchmarks(args)
+    print_report(results)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'revision': git_revision(), 'started': started.isoformat(timespec='seconds'),
+                       'python': sys.version.split()[0], 'results': results}, f, indent=2)
@@ -0,0 +1,281 @@
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from collections.abc import Mapping
+from datetime import date, datetime
+from typing import Dict, List, Optional, Sequence, Union
+import numpy as np
+import pytz
+
+CANDLE_STORE_DIR = 'stockanalysis/candle_store'
+IST = pytz.timezone('Asia/Kolkata')
+
+# Column layout of a stored instrument-day. 'minute' is the candle start as
+# minutes since the Unix epoch; prices are float32 (NSE ticks fit comfortably).
+COLUMN_DTYPES = {
+    'minute': np.int64,
+    'open': np.float32,
+    'high': np.float32,
+    'low': np.float32,
+    'close': np.float32,
+    'volume': np.int64,
+    'oi': np.int64,
+}
+# One instrument-day is a single structured array with these fields, so a candle is one
+# 44-byte row and arrays['close'] is a zero-copy column view
+CANDLE_DTYPE = np.dtype(list(COLUMN_DTYPES.items()))
+# 'YYYY-MM-DDTHH:MM:SS+05:30', the timestamp format the Upstox API uses
+ISO_TIMESTAMP_LENGTH = 25
+
+MINUTES_PER_DAY = 24 * 60
+IST_OFFSET_MINUTES = 330  # IST is UTC+05:30 with no daylight saving
+EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+# Read-through counters for the current process, see report_stats()
+STATS = {'hits': 0, 'misses': 0}
+_stats_lock = threading.Lock()
+
+# Optional in-process LRU of immutable partitions for long-running processes (see price_daemon)
+_memory_cache: 'OrderedDict[str, np.ndarray]' = OrderedDict()
+_memory_cache_size = 0
+_memory_cache_lock = threading.Lock()
+
+
+def _partition_path(instrument_key: str, day: date, store_dir: Optional[str] = None) -> str:
+    # Instrument keys look like 'NSE_EQ|INE825A01020'; '|' is not safe in every filesystem
+    safe_key = instrument_key.replace('|', '_')
+    return os.path.join(store_dir or CANDLE_STORE_DIR, safe_key, f"{day.isoformat()}.npz")
+
+
+def _count(stat: str) -> None:
+    # load_day runs on fetch_all worker threads and price daemon request threads
+    with _stats_lock:
+        STATS[stat] += 1
+
+
+def atomic_tmp_file(path: str):
+    """
+    A uniquely named temporary file next to path, opened for binary writing, to be
+    os.replace()d onto path once complete. Concurrent writers of the same path each get
+    their own file, so the last replace wins instead of one writer losing its file.
+    """
+    return tempfile.NamedTemporaryFile(dir=os.path.dirname(path), prefix=f"{os.path.basename(path)}.",
+                                       suffix='.tmp', delete=False)
+
+
+def is_immutable_day(day: date) -> bool:
+    """Trading days before today (IST) can no longer change, so their candles are final."""
+    return day < datetime.now(IST).date()
+
+
+class Candle:
+    """
+    A single candle picked out of a day's array. Reads like the dicts callers used to get
+    (candle['close'], candle.get('volume'), == {...}) without allocating one per candle.
+    """
+    __slots__ = ('minute', 'open', 'high', 'low', 'close', 'volume')
+    FIELDS = ('timestamp', 'open', 'high', 'low', 'close', 'volume')
+
+    def __init__(self, minute: int, open: float, high: float, low: float, close: float, volume: int):
+        self.minute = minute
+        self.open = open
+        self.high = high
+        self.low = low
+        self.close = close
+        self.volume = volume
+
+    @property
+    def timestamp(self) -> str:
+        """Candle start as an IST ISO-8601 string, e.g. '2024-05-14T10:00:00+05:30'."""
+        return datetime.fromtimestamp(self.minute * 60, IST).isoformat()
+
+    def __getitem__(self, key: str):
+        if key not in self.FIELDS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def get(self, key: str, default=None):
+        return getattr(self, key) if key in self.FIELDS else default
+
+    def keys(self):
+        return self.FIELDS
+
+    def items(self):
+        return [(key, getattr(self, key)) for key in self.FIELDS]
+
+    def to_dict(self) -> Dict[str, Union[str, float, int]]:
+        return dict(self.items())
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, (Candle, Mapping)):
+            return self.to_dict() == dict(other.items())
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return f"Candle({self.to_dict()!r})"
+
+
+def empty_arrays() -> np.ndarray:
+    return np.empty(0, dtype=CANDLE_DTYPE)
+
+
+def as_candle_array(arrays: Union[np.ndarray, Dict[str, np.ndarray]]) -> np.ndarray:
+    """Accepts a CANDLE_DTYPE array or a {column: values} dict and returns a CANDLE_DTYPE array."""
+    if isinstance(arrays, np.ndarray) and arrays.dtype == CANDLE_DTYPE:
+        return arrays
+    result = np.empty(len(arrays['minute']), dtype=CANDLE_DTYPE)
+    for name in COLUMN_DTYPES:
+        result[name] = arrays[name]
+    return result
+
+
+def _days_from_civil(year: np.ndarray, month: np.ndarray, day: np.ndarray) -> np.ndarray:
+    """Days since 1970-01-01 for proleptic Gregorian dates, in integer arithmetic."""
+    year = year - (month <= 2)
+    era = year // 400
+    year_of_era = year - era * 400
+    day_of_year = (153 * ((month + 9) % 12) + 2) // 5 + day - 1
+    day_of_era = year_of_era * 365 + year_of_era // 4 - year_of_era // 100 + day_of_year
+    return era * 146097 + day_of_era - 719468
+
+
+def decode_timestamps(timestamps: Sequence[str]) -> np.ndarray:
+    """
+    Decodes ISO-8601 candle timestamps to minutes since the Unix epoch in bulk.
+
+    Timestamps in the API's fixed 'YYYY-MM-DDTHH:MM:SS+HH:MM' layout are decoded as one
+    character matrix with integer arithmetic; anything else (other offset formats,
+    fractional seconds) falls back to datetime.fromisoformat per timestamp.
+    """
+    count = len(timestamps)
+    if count == 0:
+        return np.empty(0, dtype=np.int64)
+    try:
+        raw = ''.join(timestamps).encode('ascii')
+    except (TypeError, UnicodeEncodeError):
+        raw = b''
+    if len(raw) == count * ISO_TIMESTAMP_LENGTH:
+        chars = np.frombuffer(raw, dtype=np.uint8).reshape(count, ISO_TIMESTAMP_LENGTH)
+        separators = chars[:, [4, 7, 10, 13, 16, 22]]
+        sign = chars[:, 19]
+        if ((separators == np.frombuffer(b'--T:::', dtype=np.uint8)).all()
+                and np.isin(sign, np.frombuffer(b'+-', dtype=np.uint8)).all()):
+            digits = chars.astype(np.int64) - ord('0')
+
+            def number(start: int, end: int) -> np.ndarray:
+                value = digits[:, start]
+                for position in range(start + 1, end):
+                    value = value * 10 + digits[:, position]
+                return value
+
+            days = _days_from_civil(number(0, 4), number(5, 7), number(8, 10))
+            offsets = np.where(sign == ord('-'), -1, 1) * (number(20, 22) * 60 + number(23, 25))
+            return days * MINUTES_PER_DAY + number(11, 13) * 60 + number(14, 16) - offsets
+    return np.array([int(datetime.fromisoformat(ts).timestamp()) // 60 for ts in timestamps], dtype=np.int64)
+
+
+def candles_to_arrays(candles: List[list]) -> np.ndarray:
+    """
+    Converts raw Upstox candles ([timestamp_str, open, high, low, close, volume, oi])
+    into a CANDLE_DTYPE array sorted by minute. The API returns candles newest first.
+    """
+    if not candles:
+        return empty_arrays()
+    minutes = decode_timestamps([candle[0] for candle in candles])
+    order = np.argsort(minutes, kind='stable')
+    if all(len(candle) >= 7 for candle in candles):
+        values = np.array([candle[1:7] for candle in candles], dtype=np.float64)
+    else:
+        values = np.array([(list(candle[1:7]) + [0] * 6)[:6] for candle in candles], dtype=np.float64)
+    arrays = np.empty(len(candles), dtype=CANDLE_DTYPE)
+    arrays['minute'] = minutes[order]
+    values = values[order]
+    for column, name in enumerate(['open', 'high', 'low', 'close', 'volume', 'oi']):
+        arrays[name] = values[:, column]
+    return arrays
+
+
+def split_arrays_by_day(arrays: np.ndarray) -> Dict[date, np.ndarray]:
+    """Splits a multi-day range of minute-sorted candles into per-trading-day (IST) slices."""
+    epoch_days = (arrays['minute'] + IST_OFFSET_MINUTES) // MINUTES_PER_DAY
+    days, starts = np.unique(epoch_days, return_index=True)
+    ends = np.append(starts[1:], len(arrays))
+    return {
+        date.fromordinal(EPOCH_ORDINAL + int(epoch_day)): arrays[start:end]
+        for epoch_day, start, end in zip(days, starts, ends)
+    }
+
+
+def enable_memory_cache(max_days: int) -> None:
+    """
+    Keeps up to max_days immutable instrument-days in memory, least recently used
+    evicted first, so repeated reads skip the disk. 0 disables the cache.
+    """
+    global _memory_cache_size
+    with _memory_cache_lock:
+        _memory_cache_size = max_days
+        while len(_memory_cache) > max_days:
+            _memory_cache.popitem(last=False)
+
+
+def _remember(path: str, arrays: np.ndarray) -> None:
+    if not _memory_cache_size:
+        return
+    arrays.flags.writeable = False  # shared between callers
+    with _memory_cache_lock:
+        _memory_cache[path] = arrays
+        _memory_cache.move_to_end(path)
+        while len(_memory_cache) > _memory_cache_size:
+            _memory_cache.popitem(last=False)
+
+
+def load_day(instrument_key: str, day: date, store_dir: Optional[str] = None) -> Optional[np.ndarray]:
+    """
+    Returns the stored candles for an instrument-day, or None on a cache miss.
+
+    Only partitions marked immutable count as hits. A partition written while its
+    day was still trading is re-downloaded, after which it becomes immutable.
+    """
+    path = _partition_path(instrument_key, day, store_dir)
+    if _memory_cache_size:
+        with _memory_cache_lock:
+            cached = _memory_cache.get(path)
+            if cached is not None:
+                _memory_cache.move_to_end(path)
+        if cached is not None:
+            _count('hits')
+            return cached
+    if os.path.exists(path):
+        with np.load(path) as partition:
+            if bool(partition['immutable']):
+                _count('hits')
+                arrays = partition['candles']
+                _remember(path, arrays)
+                return arrays
+    _count('misses')
+    return None
+
+
+def save_day(instrument_key: str, day: date, arrays: Union[np.ndarray, Dict[str, np.ndarray]],
+             immutable: Optional[bool] = None, store_dir: Optional[str] = None) -> str:
+    """
+    Writes an instrument-day partition atomically. An empty day (holiday or
+    suspension) is stored too, so it is not requested again.
+    """
+    if immutable is None:
+        immutable = is_immutable_day(day)
+    path = _partition_path(instrument_key, day, store_dir)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with atomic_tmp_file(path) as f:
+        np.savez(f, immutable=np.bool_(immutable), candles=as_candle_array(arrays))
+    os.replace(f.name, path)
+    if immutable:
+        _remember(path, as_candle_array(arrays).copy())
+    return path
+
+
+def report_stats() -> None:
+    total = STATS['hits'] + STATS['misses']
+    hit_rate = (STATS['hits'] / total * 100) if total else 0.0
+    print(f"Candle store: {STATS['hits']} hits, {STATS['misses']} misses ({hit_rate:.1f}% hit rate)")
@@ -0,0 +1,189 @@
+import argparse
+import re
+from collections import defaultdict
+from typing import Dict, List, Sequence, Tuple
+import numpy as np
+import pandas as pd
+import results_store
+from candle_store import report_stats
+from fetch_engine import DEFAULT_CONCURRENCY
+from historicaldata import get_price_windows
+from trading_calendar import SESSION_CLOSES, SESSION_OPENS, add_trading_minutes
+from upstox import get_instrument_key, prefetch_day_candles, resolve_candle_indices
+
+DEFAULT_HORIZONS = ['1m', '5m', '15m', '40m', '1h', 'EOD', 'next-open']
+METRICS = ['return', 'mfe', 'mae', 'volume_ratio']
+HORIZON_PATTERN = re.compile(r'^(\d+)(m|h)$')
+IST_OFFSET_SECONDS = 19800  # IST is UTC+05:30
+UNIX_EPOCH = np.datetime64('1970-01-01T00:00:00', 's')
+
+
+def horizon_end_times(starts: np.ndarray, horizon: str) -> np.ndarray:
+    """
+    End time of a horizon for each start time (naive IST datetime64[s]).
+
+    'Nm'/'Nh' horizons count trading minutes, so an announcement at the close runs into
+    the next session. 'EOD' is the close of the first session trading after the start,
+    and 'next-open' is the open of the first session starting after it.
+    """
+    starts = np.asarray(starts, dtype='datetime64[s]')
+    valid = ~np.isnat(starts)
+    result = np.full(len(starts), np.datetime64('NaT'), dtype='datetime64[s]')
+    match = HORIZON_PATTERN.match(horizon)
+    if match:
+        minutes = int(match.group(1)) * (60 if match.group(2) == 'h' else 1)
+        return add_trading_minutes(starts, minutes)
+    if horizon == 'EOD':
+        idx = np.searchsorted(SESSION_CLOSES, starts[valid], side='right')
+    elif horizon == 'next-open':
+        idx = np.searchsorted(SESSION_OPENS, starts[valid], side='right')
+    else:
+        raise ValueError(f"Unknown horizon '{horizon}'")
+    in_range = idx < len(SESSION_OPENS)
+    sessions = SESSION_CLOSES if horizon == 'EOD' else SESSION_OPENS
+    result[valid] = np.where(in_range, sessions[np.minimum(idx, len(sessions) - 1)], np.datetime64('NaT'))
+    return result
+
+
+def _epoch_seconds(ist_times: np.ndarray) -> np.ndarray:
+    """Naive IST datetime64 -> float seconds since the Unix epoch (NaN for NaT)."""
+    seconds = (ist_times - UNIX_EPOCH).astype(np.int64).astype(np.float64) - IST_OFFSET_SECONDS
+    return np.where(np.isnat(ist_times), np.nan, seconds)
+
+
+def _window_extreme(values: np.ndarray, lo: np.ndarray, hi: np.ndarray, ufunc) -> np.ndarray:
+    """ufunc.reduce over values[lo:hi] for many (possibly overlapping) windows at once."""
+    if len(lo) == 0:
+        return np.empty(0)
+    padded = np.append(values, values[-1:])  # reduceat indices must stay below len(values)
+    bounds = np.empty(2 * len(lo), dtype=np.int64)
+    bounds[0::2] = lo
+    bounds[1::2] = hi
+    reduced = ufunc.reduceat(padded, bounds)[0::2]
+    return np.where(hi > lo, reduced, np.nan)
+
+
+def _study_instrument(arrays_by_day: List[Dict[str, np.ndarray]], starts: np.ndarray,
+                      ends: Dict[str, np.ndarray], horizons: Sequence[str]) -> Dict[str, np.ndarray]:
+    """Computes every metric for one instrument's announcements, returning (rows x horizons) arrays."""
+    rows = len(starts)
+    out = {metric: np.full((rows, len(horizons)), np.nan) for metric in METRICS}
+    days = [arrays for arrays in arrays_by_day if arrays is not None and len(arrays['minute'])]
+    if not days:
+        return out
+    minutes = np.concatenate([arrays['minute'] for arrays in days])
+    order = np.argsort(minutes, kind='stable')
+    minutes = minutes[order]
+    high, low, close, volume = (
+        np.concatenate([arrays[name] for arrays in days])[order].astype(np.float64)
+        for name in ('high', 'low', 'close', 'volume')
+    )
+    cum_volume = np.concatenate([[0.0], np.cumsum(volume)])
+
+    # Baseline: mean volume per candle over each trading day
+    day_ids, day_of_candle = np.unique((minutes + IST_OFFSET_SECONDS // 60) // 1440, return_inverse=True)
+    day_mean_volume = np.bincount(day_of_candle, weights=volume) / np.bincount(day_of_candle)
+
+    start_idx = resolve_candle_indices(minutes, _epoch_seconds(starts))
+    has_start = start_idx >= 0
+    safe_start = np.maximum(start_idx, 0)
+    start_price = np.where(has_start, close[safe_start], np.nan)
+    baseline = day_mean_volume[day_of_candle[safe_start]]
+
+    for column, horizon in enumerate(horizons):
+        end_idx = resolve_candle_indices(minutes, _epoch_seconds(ends[horizon]))
+        valid = has_start & (end_idx >= 0) & (end_idx >= start_idx)
+        safe_end = np.maximum(end_idx, 0)
+        # Window covers the candles after the start candle up to and including the end candle
+        lo = np.where(valid, safe_start + 1, 0)
+        hi = np.where(valid, safe_end + 1, 0)
+        candles = hi - lo
+        out['return'][:, column] = np.where(valid, (close[safe_end] / start_price - 1) * 100, np.nan)
+        out['mfe'][:, column] = (_window_extreme(high, lo, hi, np.maximum) / start_price - 1) * 100
+        out['mae'][:, column] = (_window_extreme(low, lo, hi, np.minimum) / start_price - 1) * 100
+        window_volume = cum_volume[hi] - cum_volume[lo]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            out['volume_ratio'][:, column] = np.where(
+                valid & (candles > 0), window_volume / (candles * baseline), np.nan
+            )
+    return out
+
+
+def run_event_study(announcements: pd.DataFrame, horizons: Sequence[str] = DEFAULT_HORIZONS,
+                    symbol_column: str = 'nse_id', time_column: str = 'board_announcement_time',
+                    concurrency: int = DEFAULT_CONCURRENCY) -> pd.DataFrame:
+    """
+    Computes returns, max favourable/adverse excursion and volume ratios for every
+    announcement at every horizon in one pass over the cached per-day candle arrays.
+
+    The event starts at historicaldata.get_price_start_time(board time): the announcement
+    time itself inside a session, otherwise the previous session's close. Each metric is
+    measured from the start candle's close:
+
+    - return: % change to the close of the horizon's end candle
+    - mfe / mae: % distance to the highest high / lowest low after the start candle
+    - volume_ratio: volume traded in the window over the same number of average candles
+      of the window's trading day
+
+    Args:
+        announcements (pd.DataFrame): One row per announcement.
+        horizons (Sequence[str]): e.g. '1m', '40m', '1h', 'EOD', 'next-open'.
+        symbol_column (str): Column holding the NSE trading symbol.
+        time_column (str): Column holding the naive IST announcement time.
+        concurrency (int): Maximum number of candle requests in flight for missing days.
+
+    Returns:
+        pd.DataFrame: Indexed like `announcements`, with (metric, horizon) MultiIndex
+                      columns, so result['return'] is the N x H return matrix.
+    """
+    horizons = list(horizons)
+    starts, _ = get_price_windows(pd.to_datetime(announcements[time_column], errors='coerce'))
+    ends = {horizon: horizon_end_times(starts, horizon) for horizon in horizons}
+
+    keys_by_symbol = {symbol: get_instrument_key(symbol) for symbol in pd.unique(announcements[symbol_column])}
+    rows_by_key: Dict[str, List[int]] = defaultdict(list)
+    for position, symbol in enumerate(announcements[symbol_column]):
+        if keys_by_symbol.get(symbol) and not np.isnat(starts[position]):
+            rows_by_key[keys_by_symbol[symbol]].append(position)
+
+    # Every instrument-day a start or horizon end falls on
+    needed: Dict[str, List] = {}
+    instrument_days: List[Tuple[str, object]] = []
+    for instrument_key, positions in rows_by_key.items():
+        times = np.concatenate([starts[positions]] + [ends[horizon][positions] for horizon in horizons])
+        days = np.unique(times[~np.isnat(times)].astype('datetime64[D]')).astype(object)
+        needed[instrument_key] = list(days)
+        instrument_days.extend((instrument_key, day) for day in days)
+    day_arrays = dict(zip(dict.fromkeys(instrument_days), prefetch_day_candles(instrument_days, concurrency)))
+
+    matrix = {metric: np.full((len(announcements), len(horizons)), np.nan) for metric in METRICS}
+    for instrument_key, positions in rows_by_key.items():
+        arrays_by_day = [day_arrays[(instrument_key, day)] for day in needed[instrument_key]]
+        instrument_ends = {horizon: ends[horizon][positions] for horizon in horizons}
+        result = _study_instrument(arrays_by_day, starts[positions], instrument_ends, horizons)
+        for metric in METRICS:
+            matrix[metric][positions] = result[metric]
+
+    columns = pd.MultiIndex.from_product([METRICS, horizons], names=['metric', 'horizon'])
+    return pd.DataFrame(np.hstack([matrix[metric] for metric in METRICS]), index=announcements.index, columns=columns)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Multi-horizon event study over board meeting announcements.')
+    parser.add_argument('--input', default=None,
+                        help='Read this .xlsx or .csv results table instead of the results store')
+    parser.add_argument('--output', default='stockanalysis/event_study_results.csv')
+    parser.add_argument('--horizons', nargs='+', default=DEFAULT_HORIZONS)
+    parser.add_argument('--concurrency', type=int, default=DEFAULT_CONCURRENCY,
+                        help='Maximum number of candle requests in flight')
+    args = parser.parse_args()
+
+    if args.input:
+        df = results_store.typed_results(results_store.load_table(args.input))
+    else:
+        df = results_store.read_results(results_store.KEY_COLUMNS)
+    study = run_event_study(df, args.horizons, concurrency=args.concurrency)
+    study.columns = [f"{metric}_{horizon}" for metric, horizon in study.columns]
+    print(study.describe().T)
+    pd.concat([df[['nse_id', 'board_announcement_time']], study], axis=1).to_csv(args.output, index=False)
+    report_stats()
@@ -0,0 +1,153 @@
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterable, List, Optional, Tuple, TypeVar
+import requests
+from requests.adapters import HTTPAdapter
+import instrumentation
+
+# Upstox standard API quotas: (max requests, window in seconds)
+UPSTOX_RATE_LIMITS = [(50, 1.0), (500, 60.0), (2000, 1800.0)]
+DEFAULT_CONCURRENCY = 8
+MAX_RETRIES = 5
+BACKOFF_BASE_SECONDS = 0.5
+BACKOFF_MAX_SECONDS = 30.0
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+REQUEST_TIMEOUT_SECONDS = 30
+
+T = TypeVar('T')
+R = TypeVar('R')
+
+
+class TokenBucket:
+    """Thread-safe token bucket allowing `capacity` requests per `period` seconds."""
+
+    def __init__(self, capacity: int, period: float):
+        self.capacity = capacity
+        self.rate = capacity / period
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self) -> float:
+        """Seconds until a token is available (0 if one is available now)."""
+        with self.lock:
+            self._refill(time.monotonic())
+            return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def take(self) -> None:
+        with self.lock:
+            self._refill(time.monotonic())
+            self.tokens -= 1
+
+
+class RateLimiter:
+    """Combines one token bucket per quota window; a request must fit every window."""
+
+    def __init__(self, limits: Iterable[Tuple[int, float]] = UPSTOX_RATE_LIMITS):
+        self.buckets = [TokenBucket(capacity, period) for capacity, period in limits]
+        self.lock = threading.Lock()
+
+    def acquire(self) -> None:
+        # Serialise acquisition so waiting threads do not overdraw the buckets
+        with self.lock:
+            while True:
+                wait = max((bucket.wait_time() for bucket in self.buckets), default=0.0)
+                if wait <= 0:
+                    break
+                time.sleep(wait)
+            for bucket in self.buckets:
+                bucket.take()
+
+
+class Pacer:
+    """Spaces out request starts by a random gap drawn from `pacing` seconds, shared by all threads."""
+
+    def __init__(self, pacing: Tuple[float, float]):
+        self.pacing = pacing
+        self.next_start = 0.0
+        self.lock = threading.Lock()
+
+    def wait(self) -> None:
+        with self.lock:
+            now = time.monotonic()
+            start = max(now, self.next_start)
+            self.next_start = start + random.uniform(*self.pacing)
+        if start > now:
+            time.sleep(start - now)
+
+
+_session: Optional[requests.Session] = None
+_pool_size = 0
+_session_lock = threading.Lock()
+_limiter = RateLimiter()
+
+
+def get_session(pool_size: int = DEFAULT_CONCURRENCY) -> requests.Session:
+    """
+    Returns the process-wide keep-alive session, creating it on first use and growing
+    its connection pool when a caller needs more parallel connections.
+    """
+    global _session, _pool_size
+    with _session_lock:
+        if _session is None:
+            _session = requests.Session()
+        if pool_size > _pool_size:
+            adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+            _session.mount('https://', adapter)
+            _session.mount('http://', adapter)
+            _pool_size = pool_size
+        return _session
+
+
+def _retry_delay(attempt: int, response: Optional[requests.Response]) -> float:
+    if response is not None and response.headers.get('Retry-After', '').isdigit():
+        return float(response.headers['Retry-After'])
+    delay = min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * (2 ** attempt))
+    return delay * random.uniform(0.5, 1.0)
+
+
+def http_get(url: str, **kwargs) -> requests.Response:
+    """
+    GET over the pooled session under the Upstox rate limits.
+
+    Retries with exponential backoff (honouring Retry-After) on 429/5xx responses and
+    connection errors. The last response is returned once retries are exhausted, so
+    callers keep handling non-200 responses themselves.
+    """
+    kwargs.setdefault('timeout', REQUEST_TIMEOUT_SECONDS)
+    session = get_session()
+    for attempt in range(MAX_RETRIES + 1):
+        _limiter.acquire()
+        started = time.perf_counter()
+        try:
+            response = session.get(url, **kwargs)
+        except (requests.ConnectionError, requests.Timeout):
+            instrumentation.record_http(time.perf_counter() - started, 'error')
+            if attempt == MAX_RETRIES:
+                raise
+            time.sleep(_retry_delay(attempt, None))
+            continue
+        if instrumentation.is_enabled():
+            instrumentation.record_http(time.perf_counter() - started, response.status_code, len(response.content))
+        if response.status_code not in RETRY_STATUS_CODES or attempt == MAX_RETRIES:
+            return response
+        time.sleep(_retry_delay(attempt, response))
+    return response
+
+
+def fetch_all(func: Callable[[T], R], items: Iterable[T], concurrency: int = DEFAULT_CONCURRENCY) -> List[R]:
+    """
+    Runs func over items on a bounded thread pool and returns the results in input order.
+    With concurrency <= 1 the items are processed sequentially on the calling thread.
+    """
+    items = list(items)
+    if concurrency <= 1 or len(items) <= 1:
+        return [func(item) for item in items]
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        return list(executor.map(func, items))
@@ -1,42 +1,61 @@
 import sys
+from price_client import run_client
+
+# Thin client mode: when a price daemon is running, answer the CLI call through it before
+# paying for the imports and the instrument index load below
+if __name__ == '__main__' and run_client(sys.argv[1:]):
+    sys.exit(0)
+
 from datetime import datetime
-import pytz
-from typing import List, Dict, Optional
-from upstox import get_instrument_key, fetch_historical_candle_v3, IST
+import numpy as np
+from typing import List, Optional, Tuple
+from upstox import get_instrument_key, candle_at
+from asof_join import asof_candles
+from candle_store import Candle
+from fetch_engine import DEFAULT_CONCURRENCY
 
 
-def get_prices_for_times(trading_symbol: str, datetime_strs: List[str]) -> List[Optional[Dict]]:
-    """
-    Given a trading symbol and a list of datetime strings (in 'YYYY-MM-DD HH:MM:SS' IST),
-    return a list of price data dicts (or None if not found) for each time.
+def get_prices_for_pairs(pairs: List[Tuple[str, str]], concurrency: int = DEFAULT_CONCURRENCY) -> List[Optional[Candle]]:
     """
-    instrument_key = get_instrument_key(trading_symbol)
-    if not instrument_key:
-        print(f"Instrument key for {trading_symbol} not found.")
-        return [None] * len(datetime_strs)
+    Batch price lookup for many (trading_symbol, datetime string) pairs, with datetime strings
+    in 'YYYY-MM-DD HH:MM:SS' IST.
+
+    The pairs are resolved as one table by asof_join.asof_candles: each instrument-day is
+    fetched once (with up to `concurrency` requests in flight), and all targets of an
+    instrument are matched in one sorted as-of search over its candles.
 
-    results = []
-    for dt_str in datetime_strs:
+    Returns:
+        List[Optional[Candle]]: Candles (or None if not found), in the order of `pairs`.
+    """
+    times = np.full(len(pairs), np.datetime64('NaT'), dtype='datetime64[s]')
+    for position, (_, dt_str) in enumerate(pairs):
         try:
-            dt_naive = datetime.strptime(dt_str, '%Y-%m-%d %H:%M:%S')
-            dt_ist = IST.localize(dt_naive)
-            price_data = fetch_historical_candle_v3(instrument_key, dt_ist)
-            results.append(price_data)
-        except Exception as e:
+            times[position] = datetime.strptime(dt_str, '%Y-%m-%d %H:%M:%S')
+        except (TypeError, ValueError) as e:
             print(f"Error processing {dt_str}: {e}")
-            results.append(None)
-    return results
+    candles, found = asof_candles([symbol for symbol, _ in pairs], times, concurrency, get_instrument_key)
+    return [candle_at(candles, position) if hit else None for position, hit in enumerate(found.tolist())]
+
+
+def get_prices_for_times(trading_symbol: str, datetime_strs: List[str],
+                         concurrency: int = DEFAULT_CONCURRENCY) -> List[Optional[Candle]]:
+    """
+    Given a trading symbol and a list of datetime strings (in 'YYYY-MM-DD HH:MM:SS' IST),
+    return a list of candles (or None if not found) for each time.
+    """
+    return get_prices_for_pairs([(trading_symbol, dt_str) for dt_str in datetime_strs], concurrency)
 
 
 def main():
     if len(sys.argv) < 3:
         print("Usage: python get_prices_for_times.py <TRADING_SYMBOL> <YYYY-MM-DD HH:MM:SS> [<YYYY-MM-DD HH:MM:SS> ...]")
+        print("Calls are answered by price_daemon.py when it is running.")
         sys.exit(1)
     trading_symbol = sys.argv[1]
     datetime_strs = sys.argv[2:]
-    prices = get_prices_for_times(trading_symbol, datetime_strs)
+    prices = get_prices_for_pairs([(trading_symbol, dt_str) for dt_str in datetime_strs])
     for dt_str, price in zip(datetime_strs, prices):
-        print(f"{dt_str}: {price}")
+        print(f"{dt_str}: {price.to_dict() if price else None}")
 
 if __name__ == '__main__':
-    main() 
\ No newline at end of file
+    main()
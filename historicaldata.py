@@ -1,32 +1,37 @@
+import argparse
+import os
 import pandas as pd
-from datetime import datetime, timedelta, time
-import pytz
-from typing import Optional, Dict, Any
-from upstox import get_instrument_key, fetch_historical_candle_v3
+from datetime import datetime
+import numpy as np
+from typing import Optional, Tuple
+from asof_join import attach_candles
+from results_store import KEY_COLUMNS, export_results, read_results, write_results
+from fetch_engine import DEFAULT_CONCURRENCY
+from candle_store import report_stats
+import instrumentation
+from instrumentation import add_rows, span
+from trading_calendar import add_minutes_within_session, previous_session_time, snap_to_previous, to_datetimes
 
-IST = pytz.timezone('Asia/Kolkata')
+PRICE_WINDOW_MINUTES = 40
+RESULTS_XLSX = './stockanalysis/stock_analysis_results.xlsx'
+OUTPUT_CSV = 'stock_analysis_dummy.csv'
+PRICE_COLUMNS = [
+    'start_timestamp', 'start_open', 'start_high', 'start_low', 'start_close', 'start_volume',
+    'end_timestamp', 'end_open', 'end_high', 'end_low', 'end_close', 'end_volume'
+]
 
 def get_price_start_time(board_time: datetime) -> datetime:
     # board_time: naive datetime in IST
-    trading_start = time(9, 30)
-    trading_end = time(15, 30)
-    
-    if board_time.time() < trading_start:
-        # Before trading hours, return trading end time of the previous day
-        previous_day = board_time - timedelta(days=1)
-        return datetime.combine(previous_day.date(), trading_end)
-    elif board_time.time() > trading_end:
-        # After trading hours, return trading end time of the current day
-        return datetime.combine(board_time.date(), trading_end)
-    else:
-        # Within trading hours, return board_time
-        return board_time
+    # Within a trading session, return board_time; otherwise return the close of the
+    # previous session (skipping weekends and NSE holidays, see trading_calendar)
+    return previous_session_time(board_time)
 
 def get_price_end_time(start_time: datetime) -> datetime:
     """
     Calculates the price end time based on the start time.
-    The price end time is generally 40 minutes after the start time,
-    but if the start time is after trading hours, it is set to the next day's trading start time.
+    The price end time is generally 40 minutes after the start time, capped at the
+    session close, but if the start time is outside a trading session, it is set to
+    the next session's open.
 
     Args:
         start_time (datetime): The start time for the price.
@@ -34,93 +39,50 @@ def get_price_end_time(start_time: datetime) -> datetime:
     Returns:
         datetime: The calculated price end time.
     """
-    trading_start = time(9, 30)  # 9:30 AM
-    trading_end = time(15, 30)    # 3:30 PM
-
-    # Calculate the initial end time (40 minutes after start time)
-    initial_end_time = start_time + timedelta(minutes=40)
+    return to_datetimes(add_minutes_within_session(start_time, PRICE_WINDOW_MINUTES))[0]
 
-    # Check if the start time is after trading hours
-    if start_time.time() > trading_end:
-        # Set to the next day's trading start time
-        next_day = start_time + timedelta(days=1)
-        return datetime.combine(next_day.date(), trading_start)
+def get_price_windows(board_times: pd.Series) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Vectorized get_price_start_time/get_price_end_time over a whole column of naive IST
+    board announcement times. Returns datetime64 arrays, NaT where board_time is missing.
+    """
+    return snap_to_previous(board_times), add_minutes_within_session(board_times, PRICE_WINDOW_MINUTES)
 
-    # Check if the initial end time is within trading hours
-    if initial_end_time.time() > trading_end:
-        # If it exceeds trading hours, set it to the end of trading hours
-        return datetime.combine(initial_end_time.date(), trading_end)
-    
-    return initial_end_time
+def price_window_columns(df: pd.DataFrame, concurrency: int = DEFAULT_CONCURRENCY) -> pd.DataFrame:
+    """
+    The PRICE_COLUMNS for a whole frame with precomputed price windows, joined at table
+    level (see asof_join.attach_candles) instead of one candle lookup per row.
+    """
+    return attach_candles(df, {'start': df['price_start_time'], 'end': df['price_end_time']}, 'nse_id', concurrency)
 
-def fetch_candle_details(nse_id: str, dt: datetime) -> Optional[Dict[str, Any]]:
-    instrument_key = get_instrument_key(nse_id)
-    if not instrument_key:
-        print(f"Instrument key not found for {nse_id}")
-        return None
-    dt_ist = IST.localize(dt)
-    candle = fetch_historical_candle_v3(instrument_key, dt_ist)
-    if candle:
-        return {
-            'timestamp': candle['timestamp'],
-            'open': candle['open'],
-            'high': candle['high'],
-            'low': candle['low'],
-            'close': candle['close'],
-            'volume': candle['volume']
-        }
-    return None
+def main(concurrency: int = DEFAULT_CONCURRENCY, export_path: Optional[str] = None) -> None:
+    instrumentation.reset()
+    # Typed announcements from the results store: only the join keys are read
+    with span('read_results'):
+        df = read_results(KEY_COLUMNS)
+    if df.empty and os.path.exists(RESULTS_XLSX):
+        # One-time import of a results sheet written before the store existed
+        print(f"Results store is empty, importing {RESULTS_XLSX}")
+        with span('read_excel'):
+            write_results(pd.read_excel(RESULTS_XLSX))
+            df = read_results(KEY_COLUMNS)
 
-def fetch_price_details_for_row(row: pd.Series) -> pd.Series:
-    nse_id = row['nse_id']
-    board_time = row['board_announcement_time']
-    if pd.isnull(board_time):
-        print(f"Skipping {nse_id} due to invalid board_announcement_time")
-        return pd.Series([None] * 12, index=[
-            'start_timestamp', 'start_open', 'start_high', 'start_low', 'start_close', 'start_volume',
-            'end_timestamp', 'end_open', 'end_high', 'end_low', 'end_close', 'end_volume'
-        ])
-    price_start_time = get_price_start_time(board_time)
-    price_end_time = get_price_end_time(board_time)
-    start_candle = fetch_candle_details(nse_id, price_start_time)
-    end_candle = fetch_candle_details(nse_id, price_end_time)
-    return pd.Series([
-        start_candle['timestamp'] if start_candle else None,
-        start_candle['open'] if start_candle else None,
-        start_candle['high'] if start_candle else None,
-        start_candle['low'] if start_candle else None,
-        start_candle['close'] if start_candle else None,
-        start_candle['volume'] if start_candle else None,
-        end_candle['timestamp'] if end_candle else None,
-        end_candle['open'] if end_candle else None,
-        end_candle['high'] if end_candle else None,
-        end_candle['low'] if end_candle else None,
-        end_candle['close'] if end_candle else None,
-        end_candle['volume'] if end_candle else None,
-    ], index=[
-        'start_timestamp', 'start_open', 'start_high', 'start_low', 'start_close', 'start_volume',
-        'end_timestamp', 'end_open', 'end_high', 'end_low', 'end_close', 'end_volume'
-    ])
+    # Compute every row's price window in one vectorized pass over the trading calendar
+    with span('price_windows'):
+        df['price_start_time'], df['price_end_time'] = get_price_windows(df['board_announcement_time'])
+    skipped = df['price_start_time'].isna() | df['price_end_time'].isna()
+    if skipped.any():
+        invalid = df['board_announcement_time'].isna()
+        print(f"Skipping {int((skipped & invalid).sum())} rows with an invalid board_announcement_time and "
+              f"{int((skipped & ~invalid).sum())} outside the trading calendar: "
+              f"{', '.join(df.loc[skipped, 'nse_id'].astype(str))}")
 
-if __name__ == "__main__":
-    # Load the Excel file
-    df = pd.read_excel('./stockanalysis/stock_analysis_results.xlsx')
-    # df = df[:10]
-    # Ensure 'nse_id' and 'board_announcement_time' columns exist and are datetime
-    df['board_announcement_time'] = pd.to_datetime(df['exchdisstime'], errors='coerce')  # Convert to datetime, coerce errors to NaT
-    
-    # Check for NaT values and handle them
-    if df['board_announcement_time'].isnull().any():
-        print("Warning: Some board announcement times could not be converted to datetime.")
-        print(df[df['board_announcement_time'].isnull()])  # Print rows with NaT values
-
-    # Apply the function and expand the results into separate columns
-    df[
-        [
-            'start_timestamp', 'start_open', 'start_high', 'start_low', 'start_close', 'start_volume',
-            'end_timestamp', 'end_open', 'end_high', 'end_low', 'end_close', 'end_volume'
-        ]
-    ] = df.apply(fetch_price_details_for_row, axis=1)
+    # Resolve every row's start and end candle in one as-of join per instrument
+    with span('price_join'):
+        prices = price_window_columns(df, concurrency)
+        for name in PRICE_COLUMNS:
+            df[name] = prices[name]
+    add_rows('announcements', len(df))
     
     # Print the relevant columns
     print(df[
@@ -130,4 +92,24 @@ if __name__ == "__main__":
             'end_timestamp', 'end_open', 'end_high', 'end_low', 'end_close', 'end_volume'
         ]
     ])
-    df.to_csv('stock_analysis_dummy.csv', index=False)
\ No newline at end of file
+    # Prices are upserted next to the stored earnings columns of each announcement
+    with span('write_results'):
+        write_results(df)
+    if export_path:
+        with span('export'):
+            export_results(export_path)
+    report_stats()
+    instrumentation.write_reports('historicaldata')
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Attach start/end candles to board meeting announcements.')
+    parser.add_argument('--concurrency', type=int, default=DEFAULT_CONCURRENCY,
+                        help='Maximum number of candle requests in flight')
+    parser.add_argument('--export', nargs='?', const=OUTPUT_CSV, default=None,
+                        help=f'Also export the results store to .csv/.xlsx (default path: {OUTPUT_CSV})')
+    parser.add_argument('--metrics', action='store_true',
+                        help=f'Write run metrics to {instrumentation.METRICS_DIR} (same as {instrumentation.ENV_FLAG}=1)')
+    args = parser.parse_args()
+    if args.metrics:
+        instrumentation.enable()
+    main(concurrency=args.concurrency, export_path=args.export)
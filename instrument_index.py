@@ -0,0 +1,163 @@
+import hashlib
+import os
+import sqlite3
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Use ijson for large file streaming
+try:
+    import ijson
+except ImportError:
+    import sys
+    import subprocess
+    subprocess.check_call([sys.executable, '-m', 'pip', 'install', 'ijson'])
+    import ijson
+
+NSE_JSON_PATH = 'stockanalysis/NSE.json'
+NSE_MIS_JSON_PATH = 'stockanalysis/NSE_MIS.json'
+INDEX_PATH = 'stockanalysis/instrument_index.sqlite'
+# Earlier sources win when the same (segment, trading_symbol) appears twice
+SOURCE_PATHS = [NSE_JSON_PATH, NSE_MIS_JSON_PATH]
+DEFAULT_SEGMENT = 'NSE_EQ'
+INSERT_BATCH_SIZE = 5000
+
+# In-process copy of the index, loaded lazily on first lookup
+_index: Optional[Dict[Tuple[str, str], str]] = None
+
+
+def _file_hash(path: str) -> str:
+    sha1 = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            sha1.update(chunk)
+    return sha1.hexdigest()
+
+
+def _existing_sources(sources: Iterable[str]) -> List[str]:
+    return [path for path in sources if os.path.exists(path)]
+
+
+def _index_is_current(index_path: str, sources: List[str]) -> bool:
+    """
+    Checks whether the compiled index at index_path was built from the current
+    contents of sources.
+
+    A source whose mtime and size are unchanged is trusted without hashing. When
+    only the mtime moved (e.g. the file was re-downloaded with identical bytes),
+    the stored SHA-1 is compared and the recorded mtime refreshed on a match, so
+    the index is not rebuilt needlessly.
+    """
+    if not os.path.exists(index_path):
+        return False
+    conn = sqlite3.connect(index_path)
+    try:
+        try:
+            rows = conn.execute('SELECT path, mtime_ns, size, sha1 FROM sources').fetchall()
+        except sqlite3.DatabaseError:
+            return False
+        recorded = {path: (mtime_ns, size, sha1) for path, mtime_ns, size, sha1 in rows}
+        if set(recorded) != set(sources):
+            return False
+        for path in sources:
+            mtime_ns, size, sha1 = recorded[path]
+            stat = os.stat(path)
+            if stat.st_mtime_ns == mtime_ns and stat.st_size == size:
+                continue
+            if stat.st_size != size or _file_hash(path) != sha1:
+                return False
+            conn.execute('UPDATE sources SET mtime_ns = ? WHERE path = ?', (stat.st_mtime_ns, path))
+        conn.commit()
+        return True
+    finally:
+        conn.close()
+
+
+def build_index(sources: Optional[Iterable[str]] = None, index_path: Optional[str] = None) -> int:
+    """
+    Compiles the instrument JSON files into a SQLite index keyed by
+    (segment, trading_symbol).
+
+    The JSON files are streamed with ijson so the full instrument list is never
+    held in memory. The index is written to a temporary file and swapped into
+    place atomically.
+
+    Args:
+        sources (Optional[Iterable[str]]): Instrument JSON files in precedence order, defaults to SOURCE_PATHS.
+        index_path (Optional[str]): Where to write the compiled index, defaults to INDEX_PATH.
+
+    Returns:
+        int: The number of instruments in the index.
+    """
+    sources = _existing_sources(SOURCE_PATHS if sources is None else sources)
+    index_path = index_path or INDEX_PATH
+    tmp_path = f"{index_path}.tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+
+    conn = sqlite3.connect(tmp_path)
+    try:
+        conn.execute(
+            'CREATE TABLE instruments ('
+            'segment TEXT NOT NULL, trading_symbol TEXT NOT NULL, instrument_key TEXT NOT NULL, '
+            'PRIMARY KEY (segment, trading_symbol)) WITHOUT ROWID'
+        )
+        conn.execute(
+            'CREATE TABLE sources (path TEXT PRIMARY KEY, mtime_ns INTEGER, size INTEGER, sha1 TEXT)'
+        )
+        for path in sources:
+            stat = os.stat(path)
+            batch = []
+            with open(path, 'rb') as f:
+                for instrument in ijson.items(f, 'item'):
+                    segment = instrument.get('segment')
+                    trading_symbol = instrument.get('trading_symbol')
+                    instrument_key = instrument.get('instrument_key')
+                    if not (segment and trading_symbol and instrument_key):
+                        continue
+                    batch.append((segment, trading_symbol, instrument_key))
+                    if len(batch) >= INSERT_BATCH_SIZE:
+                        conn.executemany('INSERT OR IGNORE INTO instruments VALUES (?, ?, ?)', batch)
+                        batch = []
+            if batch:
+                conn.executemany('INSERT OR IGNORE INTO instruments VALUES (?, ?, ?)', batch)
+            conn.execute(
+                'INSERT INTO sources VALUES (?, ?, ?, ?)',
+                (path, stat.st_mtime_ns, stat.st_size, _file_hash(path)),
+            )
+        conn.commit()
+        count = conn.execute('SELECT COUNT(*) FROM instruments').fetchone()[0]
+    finally:
+        conn.close()
+
+    os.replace(tmp_path, index_path)
+    print(f"Built instrument index {index_path} with {count} instruments from {len(sources)} file(s).")
+    return count
+
+
+def load_index(sources: Optional[Iterable[str]] = None, index_path: Optional[str] = None) -> Dict[Tuple[str, str], str]:
+    """
+    Returns the instrument index as a {(segment, trading_symbol): instrument_key} dict,
+    rebuilding the on-disk index first if any source file has changed.
+    """
+    sources = _existing_sources(SOURCE_PATHS if sources is None else sources)
+    index_path = index_path or INDEX_PATH
+    if not _index_is_current(index_path, sources):
+        build_index(sources, index_path)
+    conn = sqlite3.connect(index_path)
+    try:
+        rows = conn.execute('SELECT segment, trading_symbol, instrument_key FROM instruments')
+        return {(segment, trading_symbol): instrument_key for segment, trading_symbol, instrument_key in rows}
+    finally:
+        conn.close()
+
+
+def reset_index() -> None:
+    """Drops the in-process index so the next lookup reloads (and if needed rebuilds) it."""
+    global _index
+    _index = None
+
+
+def lookup_instrument_key(trading_symbol: str, segment: str = DEFAULT_SEGMENT) -> Optional[str]:
+    global _index
+    if _index is None:
+        _index = load_index()
+    return _index.get((segment, trading_symbol))
@@ -0,0 +1,197 @@
+import bisect
+import contextlib
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+
+# Set STOCKANALYSIS_METRICS=1 (or pass --metrics to a pipeline) to collect run metrics
+ENV_FLAG = 'STOCKANALYSIS_METRICS'
+METRICS_DIR = 'stockanalysis/metrics'
+# Upper bounds (seconds) of the HTTP latency histogram buckets, Prometheus-style
+HTTP_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+PROMETHEUS_PREFIX = 'stockanalysis'
+
+_enabled = os.environ.get(ENV_FLAG, '') not in ('', '0')
+_lock = threading.Lock()
+_NOOP_SPAN = contextlib.nullcontext()
+
+
+def _new_state() -> Dict:
+    return {
+        'started': time.time(),
+        'spans': defaultdict(lambda: [0, 0.0, 0.0]),  # name -> [calls, seconds, max seconds]
+        'http_buckets': [0] * (len(HTTP_LATENCY_BUCKETS) + 1),
+        'http_seconds': 0.0,
+        'http_max_seconds': 0.0,
+        'http_status': defaultdict(int),
+        'http_bytes': 0,
+        'rows': defaultdict(int),
+    }
+
+
+_state = _new_state()
+
+
+def enable(flag: bool = True) -> None:
+    global _enabled
+    _enabled = flag
+
+
+def is_enabled() -> bool:
+    return _enabled
+
+
+def reset() -> None:
+    """Clears everything collected so far and restarts the run clock."""
+    global _state
+    with _lock:
+        _state = _new_state()
+
+
+class _Span:
+    __slots__ = ('name', 'started')
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self) -> '_Span':
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        elapsed = time.perf_counter() - self.started
+        with _lock:
+            entry = _state['spans'][self.name]
+            entry[0] += 1
+            entry[1] += elapsed
+            if elapsed > entry[2]:
+                entry[2] = elapsed
+
+
+def span(name: str):
+    """
+    Times a block under `name`. Spans of the same name accumulate, including spans
+    running concurrently on worker threads. When metrics are disabled this returns a
+    shared no-op context manager.
+    """
+    if not _enabled:
+        return _NOOP_SPAN
+    return _Span(name)
+
+
+def record_http(seconds: float, status, bytes_received: int = 0) -> None:
+    """Records one HTTP exchange: latency, status code (or 'error') and response size."""
+    if not _enabled:
+        return
+    bucket = bisect.bisect_left(HTTP_LATENCY_BUCKETS, seconds)
+    with _lock:
+        _state['http_buckets'][bucket] += 1
+        _state['http_seconds'] += seconds
+        _state['http_max_seconds'] = max(_state['http_max_seconds'], seconds)
+        _state['http_status'][str(status)] += 1
+        _state['http_bytes'] += bytes_received
+
+
+def add_rows(stage: str, count: int) -> None:
+    """Counts rows processed by a stage, reported as a total and as rows/sec over the run."""
+    if not _enabled:
+        return
+    with _lock:
+        _state['rows'][stage] += count
+
+
+def summary(run: Optional[str] = None) -> Dict:
+    """The collected metrics as a JSON-serialisable dict."""
+    with _lock:
+        duration = time.time() - _state['started']
+        requests = sum(_state['http_buckets'])
+        cumulative, buckets = 0, {}
+        for bound, count in zip(list(HTTP_LATENCY_BUCKETS) + ['+Inf'], _state['http_buckets']):
+            cumulative += count
+            buckets[str(bound)] = cumulative
+        return {
+            'run': run,
+            'started': datetime.fromtimestamp(_state['started']).isoformat(timespec='seconds'),
+            'duration_seconds': round(duration, 3),
+            'spans': {
+                name: {'calls': calls, 'seconds': round(seconds, 6), 'max_seconds': round(longest, 6)}
+                for name, (calls, seconds, longest) in sorted(_state['spans'].items())
+            },
+            'http': {
+                'requests': requests,
+                'bytes_received': _state['http_bytes'],
+                'status_counts': dict(sorted(_state['http_status'].items())),
+                'latency_seconds': {
+                    'sum': round(_state['http_seconds'], 6),
+                    'mean': round(_state['http_seconds'] / requests, 6) if requests else None,
+                    'max': round(_state['http_max_seconds'], 6),
+                    'buckets': buckets,
+                },
+            },
+            'rows': {
+                stage: {'rows': rows, 'rows_per_sec': round(rows / duration, 2) if duration > 0 else None}
+                for stage, rows in sorted(_state['rows'].items())
+            },
+        }
+
+
+def to_prometheus(metrics: Dict) -> str:
+    """Renders a summary() dict in the Prometheus text exposition format."""
+    p = PROMETHEUS_PREFIX
+    lines = [
+        f'# HELP {p}_run_duration_seconds Wall-clock duration of the run.',
+        f'# TYPE {p}_run_duration_seconds gauge',
+        f'{p}_run_duration_seconds {metrics["duration_seconds"]}',
+        f'# HELP {p}_span_seconds_total Time spent inside each instrumented stage.',
+        f'# TYPE {p}_span_seconds_total counter',
+    ]
+    lines += [f'{p}_span_seconds_total{{span="{name}"}} {entry["seconds"]}' for name, entry in metrics['spans'].items()]
+    lines += [f'# HELP {p}_span_calls_total Number of times each instrumented stage ran.',
+              f'# TYPE {p}_span_calls_total counter']
+    lines += [f'{p}_span_calls_total{{span="{name}"}} {entry["calls"]}' for name, entry in metrics['spans'].items()]
+
+    http = metrics['http']
+    lines += [f'# HELP {p}_http_request_duration_seconds Latency of HTTP requests.',
+              f'# TYPE {p}_http_request_duration_seconds histogram']
+    lines += [f'{p}_http_request_duration_seconds_bucket{{le="{bound}"}} {count}'
+              for bound, count in http['latency_seconds']['buckets'].items()]
+    lines += [f'{p}_http_request_duration_seconds_sum {http["latency_seconds"]["sum"]}',
+              f'{p}_http_request_duration_seconds_count {http["requests"]}',
+              f'# HELP {p}_http_responses_total HTTP responses by status code.',
+              f'# TYPE {p}_http_responses_total counter']
+    lines += [f'{p}_http_responses_total{{status="{status}"}} {count}' for status, count in http['status_counts'].items()]
+    lines += [f'# HELP {p}_http_response_bytes_total Bytes received in HTTP response bodies.',
+              f'# TYPE {p}_http_response_bytes_total counter',
+              f'{p}_http_response_bytes_total {http["bytes_received"]}',
+              f'# HELP {p}_rows_total Rows processed by each stage.',
+              f'# TYPE {p}_rows_total counter']
+    lines += [f'{p}_rows_total{{stage="{stage}"}} {entry["rows"]}' for stage, entry in metrics['rows'].items()]
+    lines += [f'# HELP {p}_rows_per_second Rows processed per second of run time.',
+              f'# TYPE {p}_rows_per_second gauge']
+    lines += [f'{p}_rows_per_second{{stage="{stage}"}} {entry["rows_per_sec"]}'
+              for stage, entry in metrics['rows'].items()]
+    return '\n'.join(lines) + '\n'
+
+
+def write_reports(run: str, metrics_dir: Optional[str] = None) -> Optional[Tuple[str, str]]:
+    """
+    Writes <run>.json and <run>.prom to metrics_dir (default METRICS_DIR) when metrics
+    are enabled. Returns the two paths, or None when disabled.
+    """
+    if not _enabled:
+        return None
+    metrics = summary(run)
+    metrics_dir = metrics_dir or METRICS_DIR
+    os.makedirs(metrics_dir, exist_ok=True)
+    json_path = os.path.join(metrics_dir, f"{run}.json")
+    prom_path = os.path.join(metrics_dir, f"{run}.prom")
+    for path, text in ((json_path, json.dumps(metrics, indent=2)), (prom_path, to_prometheus(metrics))):
+        with open(f"{path}.tmp", 'w', encoding='utf-8') as f:
+            f.write(text)
+        os.replace(f"{path}.tmp", path)
+    print(f"Run metrics written to {json_path} and {prom_path}")
+    return json_path, prom_path
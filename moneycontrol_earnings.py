@@ -0,0 +1,239 @@
+import argparse
+import json
+import os
+import re
+from typing import Dict, Iterable, List, Optional, Tuple
+import pandas as pd
+import requests
+from requests.adapters import HTTPAdapter
+from fetch_engine import Pacer, fetch_all
+
+EARNINGS_URL = 'https://api.moneycontrol.com/mcapi/v1/earnings/actual-estimate'
+PRICEFEED_URL = 'https://priceapi.moneycontrol.com/pricefeed/nse/equitycash'
+EARNINGS_CSV = 'stockanalysis/moneycontrol_earnings.csv'
+STATE_PATH = 'stockanalysis/moneycontrol_earnings_state.json'
+NSE_ID_CACHE_PATH = 'stockanalysis/moneycontrol_nse_ids.json'
+PAGE_LIMIT = 100
+DEFAULT_CONCURRENCY = 4
+# Random gap between consecutive pricefeed request starts, across all workers
+PACING_SECONDS = (0.25, 0.5)
+REQUEST_TIMEOUT_SECONDS = 30
+# Positions of the fields used here within each row of data.list
+SC_ID_INDEX = 0
+STOCK_NAME_INDEX = 1
+MTGDATE_INDEX = 5
+QUARTER_DATA_INDEX = 9
+
+HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+    "Accept-Language": "en-US,en;q=0.9",
+    "Referer": "https://www.moneycontrol.com/"
+}
+
+
+def create_session(pool_size: int = DEFAULT_CONCURRENCY) -> requests.Session:
+    session = requests.Session()
+    session.headers.update(HEADERS)
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+def _load_json(path: str, default):
+    if not os.path.exists(path):
+        return default
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _save_json(path: str, value) -> None:
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(value, f, indent=1, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def clean_numeric(values: pd.Series) -> pd.Series:
+    """Vectorized '3,977' / '₹ 1,028' / '-' -> float64, with NaN for anything unparseable."""
+    text = values.astype('string').str.replace(r'[,₹$\s]', '', regex=True)
+    return pd.to_numeric(text, errors='coerce').astype('float64')
+
+
+def metric_column(metric: str) -> str:
+    """'Net Profit' -> 'net_profit'"""
+    return re.sub(r'[^0-9a-z]+', '_', str(metric).lower()).strip('_')
+
+
+def fetch_page(session: requests.Session, page: int, limit: int = PAGE_LIMIT,
+               earnings_url: str = EARNINGS_URL) -> Optional[List[list]]:
+    """Returns the data.list rows of one results page, or None if the request failed."""
+    try:
+        response = session.get(earnings_url, params={'page': page, 'limit': limit},
+                               timeout=REQUEST_TIMEOUT_SECONDS)
+        if response.status_code != 200:
+            print(f"Error fetching earnings page {page}: {response.status_code}")
+            return None
+        return (response.json().get('data') or {}).get('list') or []
+    except (requests.RequestException, ValueError) as e:
+        print(f"Error fetching earnings page {page}: {e}")
+        return None
+
+
+def _page_mtgdates(rows: List[list]) -> pd.Series:
+    return pd.to_datetime(pd.Series([row[MTGDATE_INDEX] for row in rows], dtype=object),
+                          format='mixed', errors='coerce')
+
+
+def fetch_result_rows(session: requests.Session, since: Optional[pd.Timestamp] = None,
+                      concurrency: int = DEFAULT_CONCURRENCY, limit: int = PAGE_LIMIT,
+                      earnings_url: str = EARNINGS_URL) -> Tuple[List[list], bool]:
+    """
+    Pages through the actual-vs-estimate results, `concurrency` pages at a time.
+
+    The API lists the latest meetings first, so paging stops at the first short or empty
+    page, or, when `since` is given, at the first page reaching back past it. A failed
+    page stops paging too, but the rows are then returned with complete=False, since
+    older results were left unfetched.
+
+    Returns:
+        Tuple[List[list], bool]: The rows fetched, and whether paging reached its end.
+    """
+    rows: List[list] = []
+    page = 1
+    while True:
+        pages = list(range(page, page + concurrency))
+        results = fetch_all(lambda p: fetch_page(session, p, limit, earnings_url), pages, concurrency)
+        for page_rows in results:
+            if page_rows is None:
+                return rows, False
+            rows.extend(page_rows)
+            if len(page_rows) < limit:
+                return rows, True
+            if since is not None and (_page_mtgdates(page_rows) < since).any():
+                return rows, True
+        page += concurrency
+
+
+def rows_to_frame(rows: List[list]) -> pd.DataFrame:
+    """
+    Builds the typed results table. Every quarterData entry ([metric, actual, estimated, ...])
+    becomes a pair of float columns, e.g. net_profit_actual and net_profit_estimated.
+    """
+    df = pd.DataFrame({
+        'sc_id': [row[SC_ID_INDEX] for row in rows],
+        'stock_name': [row[STOCK_NAME_INDEX] for row in rows],
+        'mtgdate': _page_mtgdates(rows) if rows else pd.Series(dtype='datetime64[ns]'),
+    })
+    quarter_data = pd.Series([row[QUARTER_DATA_INDEX] or [] for row in rows], dtype=object).explode().dropna()
+    if quarter_data.empty:
+        return df
+
+    entries = pd.DataFrame(quarter_data.tolist(), index=quarter_data.index).iloc[:, :3]
+    entries.columns = ['metric', 'actual', 'estimated']
+    entries['metric'] = entries['metric'].map(metric_column)
+    entries['actual'] = clean_numeric(entries['actual'])
+    entries['estimated'] = clean_numeric(entries['estimated'])
+    wide = entries.groupby([entries.index, 'metric']).first().unstack('metric')
+    wide.columns = [f"{metric}_{kind}" for kind, metric in wide.columns]
+    wide = wide[sorted(wide.columns)]
+    return df.join(wide)
+
+
+def resolve_nse_ids(session: requests.Session, sc_ids: Iterable[str], concurrency: int = DEFAULT_CONCURRENCY,
+                    pacing: Tuple[float, float] = PACING_SECONDS, cache_path: str = NSE_ID_CACHE_PATH,
+                    pricefeed_url: str = PRICEFEED_URL) -> Dict[str, Optional[str]]:
+    """
+    Maps Moneycontrol sc_ids to NSE symbols through a persistent cache. Only sc_ids the
+    cache has never seen hit the pricefeed API. A successful response without an NSEID
+    (e.g. BSE-only stocks) is cached as None; failed requests are retried on the next run.
+    """
+    sc_ids = list(dict.fromkeys(sc_ids))
+    cache = _load_json(cache_path, {})
+    missing = [sc_id for sc_id in sc_ids if sc_id not in cache]
+    pacer = Pacer(pacing)
+
+    def lookup(sc_id: str) -> Tuple[bool, Optional[str]]:
+        pacer.wait()
+        try:
+            response = session.get(f"{pricefeed_url}/{sc_id}", timeout=REQUEST_TIMEOUT_SECONDS)
+            if response.status_code != 200:
+                return False, None
+            return True, (response.json().get('data') or {}).get('NSEID') or None
+        except (requests.RequestException, ValueError):
+            return False, None
+
+    if missing:
+        resolved = 0
+        for sc_id, (ok, nse_id) in zip(missing, fetch_all(lookup, missing, concurrency)):
+            if ok:
+                cache[sc_id] = nse_id
+                resolved += 1
+        if resolved:
+            _save_json(cache_path, cache)
+    return {sc_id: cache.get(sc_id) for sc_id in sc_ids}
+
+
+def ingest_earnings(concurrency: int = DEFAULT_CONCURRENCY, full: bool = False, output_csv: str = EARNINGS_CSV,
+                    state_path: str = STATE_PATH, cache_path: str = NSE_ID_CACHE_PATH,
+                    earnings_url: str = EARNINGS_URL, pricefeed_url: str = PRICEFEED_URL,
+                    pacing: Tuple[float, float] = PACING_SECONDS, limit: int = PAGE_LIMIT) -> pd.DataFrame:
+    """
+    Pulls Moneycontrol's actual-vs-estimate results newer than the last run, resolves
+    their nse_id and merges them into output_csv.
+
+    The latest ingested mtgdate is kept in state_path. Results from that day onwards are
+    fetched again, since more companies may have reported on it, and deduplicated by
+    (sc_id, mtgdate) against what is already stored. The state only advances when
+    paging reached its end; after a failed page the next run starts from the old state.
+
+    Args:
+        concurrency (int): Pages / pricefeed requests in flight at once.
+        full (bool): Ignore the saved state and page through every result.
+        limit (int): Results per page.
+
+    Returns:
+        pd.DataFrame: The results fetched by this run, with an nse_id column.
+    """
+    state = {} if full else _load_json(state_path, {})
+    since = pd.Timestamp(state['latest_mtgdate']) if state.get('latest_mtgdate') else None
+    session = create_session(concurrency)
+
+    rows, complete = fetch_result_rows(session, since, concurrency, limit, earnings_url)
+    df = rows_to_frame(rows)
+    if since is not None:
+        df = df[df['mtgdate'] >= since].reset_index(drop=True)
+    nse_ids = resolve_nse_ids(session, df['sc_id'], concurrency, pacing, cache_path, pricefeed_url)
+    df.insert(2, 'nse_id', df['sc_id'].map(nse_ids))
+    if df.empty:
+        return df
+
+    if os.path.exists(output_csv):
+        stored = pd.read_csv(output_csv, parse_dates=['mtgdate'])
+        merged = pd.concat([stored, df], ignore_index=True)
+    else:
+        merged = df
+    merged = merged.drop_duplicates(['sc_id', 'mtgdate'], keep='last').sort_values('mtgdate', kind='stable')
+    os.makedirs(os.path.dirname(output_csv) or '.', exist_ok=True)
+    merged.to_csv(f"{output_csv}.tmp", index=False)
+    os.replace(f"{output_csv}.tmp", output_csv)
+
+    if not complete:
+        # Advancing the state would skip the unfetched pages on every later run
+        print("Earnings paging stopped at a failed page; the saved state is left as it was.")
+        return df
+    latest = df['mtgdate'].max()
+    if pd.notna(latest) and (since is None or latest > since):
+        _save_json(state_path, {'latest_mtgdate': latest.strftime('%Y-%m-%d')})
+    return df
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Ingest Moneycontrol actual-vs-estimate earnings results.')
+    parser.add_argument('--concurrency', type=int, default=DEFAULT_CONCURRENCY)
+    parser.add_argument('--full', action='store_true', help='Ignore the saved state and fetch every page')
+    args = parser.parse_args()
+    results = ingest_earnings(args.concurrency, args.full)
+    print(f"Fetched {len(results)} results")
+    print(results)
@@ -0,0 +1,157 @@
+import argparse
+import json
+import os
+import threading
+from datetime import date, datetime
+from typing import Dict, Iterable, List, Optional, Union
+from urllib.parse import quote
+import requests
+from requests.adapters import HTTPAdapter
+import pytz
+from fetch_engine import Pacer, fetch_all
+
+NSE_BASE_URL = 'https://www.nseindia.com'
+DISCLOSURE_CACHE_DIR = 'stockanalysis/nse_disclosure_cache'
+BOARD_MEETING_DESC = 'Outcome of Board Meeting'
+DEFAULT_CONCURRENCY = 4
+# Random gap between consecutive request starts, across all workers, to avoid NSE's scraping detection
+PACING_SECONDS = (1.0, 2.0)
+REQUEST_TIMEOUT_SECONDS = 30
+IST = pytz.timezone('Asia/Kolkata')
+
+HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+    "Accept-Language": "en-US,en;q=0.9",
+    "Referer": "https://www.nseindia.com/"
+}
+
+
+def create_session(base_url: str = NSE_BASE_URL, pool_size: int = DEFAULT_CONCURRENCY) -> requests.Session:
+    """
+    Returns a pooled session carrying NSE's cookies. NSE only serves its JSON APIs to
+    clients that have loaded the home page first, so the home page is requested once here.
+    """
+    session = requests.Session()
+    session.headers.update(HEADERS)
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    session.get(f"{base_url}/", timeout=REQUEST_TIMEOUT_SECONDS)
+    return session
+
+
+def _format_date(value: Union[str, date]) -> str:
+    return value.strftime('%d-%m-%Y') if isinstance(value, date) else value
+
+
+def _cache_path(symbol: str, from_date: str, to_date: str, cache_dir: Optional[str] = None) -> str:
+    return os.path.join(cache_dir or DISCLOSURE_CACHE_DIR, f"{symbol}_{from_date}_{to_date}.json")
+
+
+def _range_is_final(to_date: str) -> bool:
+    """A date range that ended before today (IST) can no longer gain announcements."""
+    return datetime.strptime(to_date, '%d-%m-%Y').date() < datetime.now(IST).date()
+
+
+def fetch_disclosures(session: requests.Session, symbol: str, from_date: Union[str, date], to_date: Union[str, date],
+                      base_url: str = NSE_BASE_URL, pacer: Optional[Pacer] = None,
+                      cache_dir: Optional[str] = None) -> Optional[List[dict]]:
+    """
+    Fetches a symbol's corporate announcements for a date range from NSE's
+    corporate-disclosure-getquote API, reading through an on-disk cache.
+
+    Args:
+        session (requests.Session): Session from create_session (carries NSE cookies).
+        symbol (str): NSE trading symbol.
+        from_date, to_date (Union[str, date]): Range as dates or 'DD-MM-YYYY' strings.
+        base_url (str): NSE host, overridable for testing against a stub server.
+        pacer (Optional[Pacer]): Shared pacing between requests.
+        cache_dir (Optional[str]): Cache directory, defaults to DISCLOSURE_CACHE_DIR.
+
+    Returns:
+        Optional[List[dict]]: The announcements, or None if the request failed.
+    """
+    from_date, to_date = _format_date(from_date), _format_date(to_date)
+    path = _cache_path(symbol, from_date, to_date, cache_dir)
+    if os.path.exists(path):
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+
+    # Query string is built into the URL as NSE expects, not passed as params
+    url = (f"{base_url}/api/corporate-disclosure-getquote?symbol={quote(symbol)}&corpType=announcement"
+           f"&market=equities&from_date={from_date}&to_date={to_date}")
+    if pacer is not None:
+        pacer.wait()
+    try:
+        response = session.get(url, timeout=REQUEST_TIMEOUT_SECONDS)
+        if response.status_code in (401, 403):
+            # Cookies expired mid-run: refresh them from the home page and retry once
+            session.get(f"{base_url}/", timeout=REQUEST_TIMEOUT_SECONDS)
+            response = session.get(url, timeout=REQUEST_TIMEOUT_SECONDS)
+        if response.status_code != 200:
+            print(f"Error fetching disclosures for {symbol}: {response.status_code}")
+            return None
+        disclosures = response.json()
+    except (requests.RequestException, ValueError) as e:
+        print(f"Error fetching disclosures for {symbol}: {e}")
+        return None
+
+    if _range_is_final(to_date):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(disclosures, f)
+        os.replace(tmp_path, path)
+    return disclosures
+
+
+def board_meeting_time(disclosures: Optional[List[dict]], desc: str = BOARD_MEETING_DESC) -> Optional[str]:
+    """Returns exchdisstime of the last announcement whose desc matches, or None."""
+    board_meeting = None
+    for item in disclosures or []:
+        if item.get('desc') == desc:
+            board_meeting = item
+    return board_meeting['exchdisstime'] if board_meeting else None
+
+
+def fetch_board_meeting_times(symbols: Iterable[str], from_date: Union[str, date], to_date: Union[str, date],
+                              concurrency: int = DEFAULT_CONCURRENCY, base_url: str = NSE_BASE_URL,
+                              pacing=PACING_SECONDS, cache_dir: Optional[str] = None) -> Dict[str, Optional[str]]:
+    """
+    Looks up the "Outcome of Board Meeting" exchdisstime for many symbols over one date
+    range. Cookies are bootstrapped once, then disclosures are fetched over a pooled
+    session with up to `concurrency` requests in flight, paced by a random gap between
+    request starts. Cached responses need no session or pacing at all.
+
+    Returns:
+        Dict[str, Optional[str]]: exchdisstime (e.g. '12-May-2025 14:10:51') per symbol.
+    """
+    symbols = [symbol for symbol in dict.fromkeys(symbols) if symbol]
+    from_date, to_date = _format_date(from_date), _format_date(to_date)
+    session = None
+    session_lock = threading.Lock()
+    pacer = Pacer(pacing)
+
+    def lookup(symbol: str) -> Optional[str]:
+        nonlocal session
+        if not os.path.exists(_cache_path(symbol, from_date, to_date, cache_dir)):
+            with session_lock:
+                if session is None:
+                    session = create_session(base_url, concurrency)
+        disclosures = fetch_disclosures(session, symbol, from_date, to_date, base_url, pacer, cache_dir)
+        return board_meeting_time(disclosures)
+
+    times = fetch_all(lookup, symbols, concurrency)
+    return dict(zip(symbols, times))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Fetch "Outcome of Board Meeting" times from NSE.')
+    parser.add_argument('symbols', nargs='+')
+    parser.add_argument('--from-date', required=True, help='DD-MM-YYYY')
+    parser.add_argument('--to-date', required=True, help='DD-MM-YYYY')
+    parser.add_argument('--concurrency', type=int, default=DEFAULT_CONCURRENCY)
+    args = parser.parse_args()
+    for symbol, exchdisstime in fetch_board_meeting_times(args.symbols, args.from_date, args.to_date,
+                                                          args.concurrency).items():
+        print(f"{symbol}: {exchdisstime}")
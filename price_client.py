@@ -0,0 +1,85 @@
+import http.client
+import json
+import os
+import socket
+from typing import List, Optional, Sequence, Tuple
+from urllib.parse import urlparse
+
+# Client for price_daemon. Deliberately standard-library only: it runs before the CLI
+# imports numpy, requests and the instrument index, which is the cost the daemon avoids.
+
+# 'http://127.0.0.1:8765' or 'unix:///path/to/price_daemon.sock'
+DAEMON_ADDRESS_ENV = 'STOCKANALYSIS_PRICE_DAEMON'
+DEFAULT_DAEMON_ADDRESS = 'http://127.0.0.1:8765'
+CONNECT_TIMEOUT_SECONDS = 0.5
+QUERY_TIMEOUT_SECONDS = 300
+
+
+def daemon_address() -> str:
+    return os.environ.get(DAEMON_ADDRESS_ENV) or DEFAULT_DAEMON_ADDRESS
+
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+    """HTTP over a Unix domain socket."""
+
+    def __init__(self, socket_path: str, timeout: float):
+        super().__init__('localhost', timeout=timeout)
+        self.socket_path = socket_path
+
+    def connect(self) -> None:
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.socket_path)
+
+
+def _connection(address: str, timeout: float) -> http.client.HTTPConnection:
+    parsed = urlparse(address)
+    if parsed.scheme == 'unix':
+        return UnixHTTPConnection(parsed.path, timeout)
+    return http.client.HTTPConnection(parsed.hostname, parsed.port or 80, timeout=timeout)
+
+
+def query_daemon(pairs: Sequence[Tuple[str, str]], address: Optional[str] = None,
+                 timeout: float = QUERY_TIMEOUT_SECONDS) -> Optional[List[Optional[dict]]]:
+    """
+    Sends (trading_symbol, 'YYYY-MM-DD HH:MM:SS') pairs to a running price daemon as one
+    JSONL batch and returns its answers in order (candle dicts, or None where no candle
+    was found).
+
+    Returns None when no daemon is listening at the address, so callers can fall back to
+    resolving the prices in-process.
+    """
+    connection = _connection(address or daemon_address(), CONNECT_TIMEOUT_SECONDS)
+    try:
+        try:
+            connection.connect()
+        except OSError:
+            return None
+        connection.sock.settimeout(timeout)
+        body = ''.join(json.dumps({'symbol': symbol, 'time': dt_str}) + '\n' for symbol, dt_str in pairs)
+        connection.request('POST', '/prices', body=body.encode('utf-8'),
+                           headers={'Content-Type': 'application/x-ndjson'})
+        response = connection.getresponse()
+        payload = response.read().decode('utf-8')
+        if response.status != 200:
+            raise RuntimeError(f"Price daemon error {response.status}: {payload.strip()}")
+        return [json.loads(line)['price'] for line in payload.splitlines() if line.strip()]
+    finally:
+        connection.close()
+
+
+def run_client(argv: Sequence[str]) -> bool:
+    """
+    Thin client mode of get_prices_for_times.py: answers `SYMBOL TIME [TIME ...]` through
+    a running daemon. Returns False (having printed nothing) when the arguments are
+    incomplete or no daemon is running, so the CLI can handle the call itself.
+    """
+    if len(argv) < 2:
+        return False
+    trading_symbol, datetime_strs = argv[0], list(argv[1:])
+    prices = query_daemon([(trading_symbol, dt_str) for dt_str in datetime_strs])
+    if prices is None:
+        return False
+    for dt_str, price in zip(datetime_strs, prices):
+        print(f"{dt_str}: {price}")
+    return True
@@ -0,0 +1,136 @@
+import argparse
+import json
+import os
+import signal
+import socketserver
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer, ThreadingHTTPServer
+from typing import List, Optional, Tuple
+from urllib.parse import urlparse
+import candle_store
+from fetch_engine import DEFAULT_CONCURRENCY, get_session
+from get_prices_for_times import get_prices_for_pairs
+from instrument_index import lookup_instrument_key
+from price_client import daemon_address
+
+# Immutable instrument-days kept in memory on top of the on-disk candle store (~17 KB each, ~80 MB)
+DEFAULT_MEMORY_CACHE_DAYS = 5000
+
+
+class PriceRequestHandler(BaseHTTPRequestHandler):
+    """
+    POST /prices takes a JSONL body of {"symbol": ..., "time": "YYYY-MM-DD HH:MM:SS"} lines
+    and answers with one {"symbol", "time", "price"} line per query, in order. The whole
+    body is resolved as one get_prices_for_pairs batch. GET /health reports liveness.
+    """
+    protocol_version = 'HTTP/1.1'
+    concurrency = DEFAULT_CONCURRENCY
+    started = time.time()
+    queries = 0
+    queries_lock = threading.Lock()
+
+    def _send(self, status: int, body: bytes, content_type: str = 'application/json') -> None:
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if urlparse(self.path).path != '/health':
+            self._send(404, b'{"error": "not found"}')
+            return
+        body = {'status': 'ok', 'pid': os.getpid(), 'uptime_seconds': round(time.time() - self.started, 1),
+                'queries': type(self).queries, 'candle_store': dict(candle_store.STATS)}
+        self._send(200, json.dumps(body).encode())
+
+    def do_POST(self):
+        if urlparse(self.path).path != '/prices':
+            self._send(404, b'{"error": "not found"}')
+            return
+        length = int(self.headers.get('Content-Length') or 0)
+        try:
+            queries = [json.loads(line) for line in self.rfile.read(length).decode('utf-8').splitlines()
+                       if line.strip()]
+            pairs: List[Tuple[str, str]] = [(query['symbol'], query['time']) for query in queries]
+        except (ValueError, KeyError, TypeError) as e:
+            self._send(400, json.dumps({'error': f"Bad JSONL query: {e}"}).encode())
+            return
+        prices = get_prices_for_pairs(pairs, self.concurrency)
+        with self.queries_lock:
+            type(self).queries += len(pairs)
+        lines = [
+            json.dumps({'symbol': symbol, 'time': dt_str, 'price': price.to_dict() if price else None})
+            for (symbol, dt_str), price in zip(pairs, prices)
+        ]
+        self._send(200, ''.join(line + '\n' for line in lines).encode('utf-8'), 'application/x-ndjson')
+
+    def address_string(self) -> str:
+        # Unix socket peers have no (host, port) address
+        return self.client_address[0] if isinstance(self.client_address, tuple) else 'unix'
+
+    def log_message(self, format, *args):
+        pass
+
+
+class ThreadingUnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def server_bind(self):
+        socketserver.UnixStreamServer.server_bind(self)
+        self.server_name, self.server_port = 'localhost', 0
+
+
+def create_server(address: Optional[str] = None) -> HTTPServer:
+    """Binds the daemon to 'http://host:port' or 'unix:///path.sock' (default: price_client.daemon_address())."""
+    parsed = urlparse(address or daemon_address())
+    if parsed.scheme == 'unix':
+        if os.path.exists(parsed.path):
+            os.remove(parsed.path)  # stale socket from a previous run
+        return ThreadingUnixHTTPServer(parsed.path, PriceRequestHandler)
+    server = ThreadingHTTPServer((parsed.hostname or '127.0.0.1', parsed.port or 0), PriceRequestHandler)
+    server.daemon_threads = True
+    return server
+
+
+def warm_up(concurrency: int, memory_cache_days: int) -> None:
+    """Loads the instrument index and opens the connection pool before the first query."""
+    candle_store.enable_memory_cache(memory_cache_days)
+    lookup_instrument_key('')
+    get_session(concurrency)
+
+
+def serve(address: Optional[str] = None, concurrency: int = DEFAULT_CONCURRENCY,
+          memory_cache_days: int = DEFAULT_MEMORY_CACHE_DAYS) -> None:
+    PriceRequestHandler.concurrency = concurrency
+    PriceRequestHandler.started = time.time()
+    warm_up(concurrency, memory_cache_days)
+    server = create_server(address)
+    # SIGTERM stops the daemon cleanly like Ctrl-C does
+    signal.signal(signal.SIGTERM, lambda *_: threading.Thread(target=server.shutdown).start())
+    listening = address or daemon_address()
+    print(f"Price daemon listening on {listening} (pid {os.getpid()})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        parsed = urlparse(listening)
+        if parsed.scheme == 'unix' and os.path.exists(parsed.path):
+            os.remove(parsed.path)
+        candle_store.report_stats()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Resident price-query service keeping the instrument index, candle cache and HTTP pool warm.')
+    parser.add_argument('--address', default=None,
+                        help="'http://127.0.0.1:8765' (default, or $STOCKANALYSIS_PRICE_DAEMON) or 'unix:///path.sock'")
+    parser.add_argument('--concurrency', type=int, default=DEFAULT_CONCURRENCY,
+                        help='Maximum number of candle requests in flight per query batch')
+    parser.add_argument('--memory-cache-days', type=int, default=DEFAULT_MEMORY_CACHE_DAYS,
+                        help='Instrument-days of candles kept in memory (0 to disable)')
+    args = parser.parse_args()
+    serve(args.address, args.concurrency, args.memory_cache_days)
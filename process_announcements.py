@@ -1,119 +1,249 @@
+import argparse
 import csv
-from datetime import datetime, timedelta, time as dtime
-import pytz
-from get_prices_for_times import get_prices_for_times
-from upstox import IST
+import io
+import json
+import os
+import numpy as np
+import pandas as pd
+from announcements_ingest import TIME_COLUMN, iter_announcements
+from backfill import terminate_last_line
+from get_prices_for_times import get_prices_for_pairs
+from fetch_engine import DEFAULT_CONCURRENCY
+from candle_store import report_stats
+import instrumentation
+from instrumentation import add_rows, span
+from trading_calendar import snap_to_next, snap_to_previous
 
 ANNOUNCEMENTS_CSV = 'stockanalysis/annnouncements-nse.csv'
 OUTPUT_CSV = 'stockanalysis/annnouncements-nse_with_price_diff.csv'
-TRADING_START = dtime(9, 30)
-TRADING_END = dtime(15, 30)
-WEEKDAYS = set(range(0, 5))  # Monday=0, ..., Friday=4
+# Checkpoint of (SYMBOL, DISSEMINATION, SUBJECT) keys already written to OUTPUT_CSV
+MANIFEST_PATH = 'stockanalysis/annnouncements-nse_with_price_diff.manifest.jsonl'
+SUBJECT = 'Bagging/Receiving of orders/contracts'
+BATCH_SIZE = 200
+START_OFFSET = np.timedelta64(1, 'm')
+END_OFFSET = np.timedelta64(1, 'h')
 
 
-def is_trading_day(dt):
-    return dt.weekday() in WEEKDAYS
+def compute_windows(diss_dts):
+    """
+    Vectorized start/end times for a batch of dissemination times (naive IST).
+    Start is 1 min after dissemination snapped back onto the trading timeline, end is
+    1 hr after dissemination snapped forward. Returns 'YYYY-MM-DD HH:MM:SS' strings, or
+    None where the time falls outside the trading calendar.
+    """
+    diss = np.asarray(diss_dts, dtype='datetime64[s]')
+    starts = snap_to_previous(diss + START_OFFSET)
+    ends = snap_to_next(diss + END_OFFSET)
+    return _format_times(starts), _format_times(ends)
 
-def get_trading_start(dt):
-    return dt.replace(hour=9, minute=30, second=0, microsecond=0)
+def _format_times(values):
+    return [None if value == 'NaT' else value.replace('T', ' ') for value in np.datetime_as_string(values, unit='s')]
 
-def get_trading_end(dt):
-    return dt.replace(hour=15, minute=30, second=0, microsecond=0)
+def announcement_key(row):
+    return (row['SYMBOL'].strip(), row['DISSEMINATION'].strip(), row['SUBJECT'].strip())
 
-def adjust_to_trading_time(dt, after=True):
-    # If after=True, move to next trading start if outside hours; else move to last trading time
-    if not is_trading_day(dt):
-        current_dt = dt
-        if after:
-            # Move forward to the next weekday
-            while not is_trading_day(current_dt):
-                current_dt += timedelta(days=1)
-            return get_trading_start(current_dt)
-        else:
-            # Move backward to the previous weekday
-            while not is_trading_day(current_dt):
-                current_dt -= timedelta(days=1)
-            return get_trading_end(current_dt)
-
-    if dt.time() < TRADING_START:
-        # Before trading hours on a trading day
-        if after:
-            # For 'after', adjust to the start of the same trading day
-            return get_trading_start(dt)
-        else:
-            # For 'before', fallback to previous trading day's end
-            current_dt = dt - timedelta(days=1)
-            while not is_trading_day(current_dt):
-                current_dt -= timedelta(days=1)
-            return get_trading_end(current_dt)
-
-    if dt.time() > TRADING_END:
-        # After trading hours on a trading day
-        if after:
-            # For 'after', move to the next trading day's start
-            current_dt = dt + timedelta(days=1)
-            while not is_trading_day(current_dt):
-                current_dt += timedelta(days=1)
-            return get_trading_start(current_dt)
-        else:
-            # For 'before', adjust to the end of the same trading day
-            return get_trading_end(dt)
+def load_manifest(path=MANIFEST_PATH):
+    """Returns the (SYMBOL, DISSEMINATION, SUBJECT) keys of rows already written to the output."""
+    done = set()
+    if not os.path.exists(path):
+        return done
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                # A crash mid-write can leave a truncated last line; if that row reached the
+                # output, recover_output finds it there
+                continue
+            done.add((entry['SYMBOL'], entry['DISSEMINATION'], entry['SUBJECT']))
+    return done
 
-    # Within trading hours
-    return dt
+def _last_record_end(data: bytes) -> int:
+    # Offset just past the last newline outside a quoted field ('"' and '\n' never occur
+    # inside multi-byte UTF-8 sequences)
+    end = start = quotes = 0
+    pos = data.find(b'\n')
+    while pos != -1:
+        quotes += data.count(b'"', start, pos)
+        start = pos
+        if quotes % 2 == 0:
+            end = pos + 1
+        pos = data.find(b'\n', pos + 1)
+    return end
 
-def parse_datetime(dt_str):
-    for fmt in ('%Y-%m-%d %H:%M:%S', '%d-%b-%Y %H:%M:%S'):
-        try:
-            return datetime.strptime(dt_str, fmt)
-        except ValueError:
+def recover_output(path=OUTPUT_CSV):
+    """
+    Truncates the output to its last complete row and returns the keys of the rows in it,
+    or None if it has no complete header to append to. Rows are written before their
+    manifest entries, so rows that reached the output before a crash are found here
+    instead of being written a second time.
+    """
+    if not os.path.exists(path):
+        return None
+    with open(path, 'rb+') as f:
+        data = f.read()
+        end = _last_record_end(data)
+        if end < len(data):
+            print(f"Truncating a partly written row at the end of {path}")
+            f.truncate(end)
+    if end == 0:
+        return None
+    reader = csv.DictReader(io.StringIO(data[:end].decode('utf-8'), newline=''))
+    return {announcement_key(row) for row in reader}
+
+def read_announcements(path):
+    # Stage 1: parse. Columnar chunked ingest with vectorized DISSEMINATION parsing and
+    # the SUBJECT filter applied as a mask (see announcements_ingest)
+    fieldnames = list(pd.read_csv(path, nrows=0, encoding='utf-8-sig').columns)
+
+    def rows():
+        chunks = iter_announcements(path, subjects=[SUBJECT])
+        while True:
+            with span('read_csv'):
+                chunk = next(chunks, None)
+            if chunk is None:
+                return
+            diss_dts = chunk[TIME_COLUMN]
+            for row, diss_dt in zip(chunk.drop(columns=[TIME_COLUMN]).to_dict('records'), diss_dts):
+                yield row, diss_dt
+
+    return fieldnames, rows()
+
+def filter_announcements(rows, done):
+    # Stage 2: skip announcements already in the checkpoint manifest
+    for row, diss_dt in rows:
+        if announcement_key(row) in done:
             continue
-    raise ValueError(f"Date '{dt_str}' is not in a recognized format")
+        yield row, diss_dt
 
-def main():
-    with open(ANNOUNCEMENTS_CSV, newline='', encoding='utf-8-sig') as infile, \
-         open(OUTPUT_CSV, 'w', newline='', encoding='utf-8') as outfile:
-        reader = csv.DictReader(infile)
-        fieldnames = reader.fieldnames + ['start_time', 'end_time', 'start_close', 'end_close', 'pct_diff']
-        writer = csv.DictWriter(outfile, fieldnames=fieldnames)
-        writer.writeheader()
-        for row in reader:
-            if row['SUBJECT'].strip() != 'Bagging/Receiving of orders/contracts':
-                continue
+def batched(rows, batch_size):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def window_stage(batches):
+    # Stage 3: vectorized start/end times per batch; unparseable rows are passed on as skipped
+    for batch in batches:
+        with span('window'):
+            rows = []
+            diss_dts = []
+            skipped = []
+            for row, diss_dt in batch:
+                if pd.isnull(diss_dt):
+                    print(f"Skipping row due to date parse error: Date '{row['DISSEMINATION']}' is not in a recognized format")
+                    skipped.append(row)
+                    continue
+                rows.append(row)
+                diss_dts.append(diss_dt)
+            start_strs, end_strs = compute_windows(diss_dts)
+            for row, start_str, end_str in zip(rows, start_strs, end_strs):
+                row.update({'start_time': start_str, 'end_time': end_str})
+        yield rows, skipped
+
+def price_stage(batches, concurrency):
+    # Stage 4: one batched, concurrent price lookup per batch
+    for rows, skipped in batches:
+        pairs = []
+        for row in rows:
             symbol = row['SYMBOL'].strip()
-            diss_str = row['DISSEMINATION'].strip()
-            try:
-                diss_dt_naive = parse_datetime(diss_str)
-                diss_dt = IST.localize(diss_dt_naive)
-            except Exception as e:
-                print(f"Skipping row due to date parse error: {e}")
-                continue
-            # Start time: 1 min after dissemination, adjusted if needed
-            start_dt = diss_dt + timedelta(minutes=1)
-            start_dt = adjust_to_trading_time(start_dt, after=False)
-            # End time: 1 hr after dissemination, adjusted if needed
-            end_dt = diss_dt + timedelta(hours=1)
-            end_dt = adjust_to_trading_time(end_dt, after=True)
-            # Get close prices
-            start_str = start_dt.strftime('%Y-%m-%d %H:%M:%S')
-            end_str = end_dt.strftime('%Y-%m-%d %H:%M:%S')
-            prices = get_prices_for_times(symbol, [start_str, end_str])
-            start_close = prices[0]['close'] if prices[0] else None
-            end_close = prices[1]['close'] if prices[1] else None
-            pct_diff = None
-            if start_close and end_close:
-                try:
-                    pct_diff = ((end_close - start_close) / start_close) * 100
-                except Exception:
-                    pct_diff = None
-            row.update({
-                'start_time': start_str,
-                'end_time': end_str,
-                'start_close': start_close,
-                'end_close': end_close,
-                'pct_diff': pct_diff
-            })
-            writer.writerow(row)
+            pairs.extend([(symbol, row['start_time']), (symbol, row['end_time'])])
+        with span('price_fetch'):
+            prices = get_prices_for_pairs(pairs, concurrency) if pairs else []
+        yield rows, prices, skipped
+
+def enrich_stage(batches):
+    # Stage 5: close prices and percentage move
+    for rows, prices, skipped in batches:
+        with span('enrich'):
+            for i, row in enumerate(rows):
+                start_price, end_price = prices[2 * i], prices[2 * i + 1]
+                start_close = start_price['close'] if start_price else None
+                end_close = end_price['close'] if end_price else None
+                pct_diff = None
+                if start_close and end_close:
+                    try:
+                        pct_diff = ((end_close - start_close) / start_close) * 100
+                    except Exception:
+                        pct_diff = None
+                row.update({
+                    'start_close': start_close,
+                    'end_close': end_close,
+                    'pct_diff': pct_diff
+                })
+        yield rows, skipped
+
+def write_stage(batches, writer, outfile, manifest):
+    """
+    Writes each batch to the output and fsyncs it, then records the batch's keys
+    (including rows skipped for bad dates) in the checkpoint manifest. A crash between
+    the two is repaired on resume by recover_output.
+    """
+    written = 0
+    for rows, skipped in batches:
+        with span('write_csv'):
+            writer.writerows(rows)
+            outfile.flush()
+            os.fsync(outfile.fileno())
+            for row in rows + skipped:
+                symbol, dissemination, subject = announcement_key(row)
+                manifest.write(json.dumps({'SYMBOL': symbol, 'DISSEMINATION': dissemination, 'SUBJECT': subject}) + '\n')
+            manifest.flush()
+        written += len(rows)
+        add_rows('announcements', len(rows))
+        print(f"Wrote {written} rows to {OUTPUT_CSV}")
+    return written
+
+def main(concurrency=DEFAULT_CONCURRENCY, batch_size=BATCH_SIZE, restart=False):
+    """
+    Streams the announcements CSV through parse -> filter -> window -> price fetch -> enrich/write
+    in batches of batch_size rows. Rows recorded in the checkpoint manifest are skipped, so a
+    rerun resumes after a crash and a daily refresh only processes newly appended announcements.
+    Pass restart=True to discard the manifest and output and recompute everything.
+    """
+    instrumentation.reset()
+    if restart:
+        for path in (OUTPUT_CSV, MANIFEST_PATH):
+            if os.path.exists(path):
+                os.remove(path)
+    written = recover_output(OUTPUT_CSV)
+    resume = written is not None
+    done = load_manifest(MANIFEST_PATH) | written if resume else set()
+    if resume:
+        terminate_last_line(MANIFEST_PATH)
+    input_fieldnames, rows = read_announcements(ANNOUNCEMENTS_CSV)
+    with open(OUTPUT_CSV, 'a' if resume else 'w', newline='', encoding='utf-8') as outfile, \
+         open(MANIFEST_PATH, 'a' if resume else 'w', encoding='utf-8') as manifest:
+        fieldnames = input_fieldnames + ['start_time', 'end_time', 'start_close', 'end_close', 'pct_diff']
+        writer = csv.DictWriter(outfile, fieldnames=fieldnames)
+        if resume:
+            print(f"Resuming: {len(done)} announcements already processed")
+        else:
+            writer.writeheader()
+        batches = batched(filter_announcements(rows, done), batch_size)
+        batches = enrich_stage(price_stage(window_stage(batches), concurrency))
+        write_stage(batches, writer, outfile, manifest)
+    report_stats()
+    instrumentation.write_reports('process_announcements')
 
 if __name__ == '__main__':
-    main() 
\ No newline at end of file
+    parser = argparse.ArgumentParser(description='Attach price moves to NSE order-win announcements.')
+    parser.add_argument('--concurrency', type=int, default=DEFAULT_CONCURRENCY,
+                        help='Maximum number of candle requests in flight')
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE,
+                        help='Rows fetched and flushed to the output per batch')
+    parser.add_argument('--restart', action='store_true',
+                        help='Ignore the checkpoint manifest and recompute every row')
+    parser.add_argument('--metrics', action='store_true',
+                        help=f'Write run metrics to {instrumentation.METRICS_DIR} (same as {instrumentation.ENV_FLAG}=1)')
+    args = parser.parse_args()
+    if args.metrics:
+        instrumentation.enable()
+    main(concurrency=args.concurrency, batch_size=args.batch_size, restart=args.restart) 
\ No newline at end of file
@@ -0,0 +1,255 @@
+import argparse
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from itertools import product
+from typing import Dict, List, Optional, Sequence, Tuple
+import numpy as np
+import pandas as pd
+import sklearn
+from sklearn.ensemble import GradientBoostingRegressor, RandomForestRegressor
+from sklearn.impute import SimpleImputer
+from sklearn.linear_model import Ridge
+from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
+from sklearn.model_selection import TimeSeriesSplit
+from sklearn.pipeline import make_pipeline
+from sklearn.tree import DecisionTreeRegressor
+import results_store
+from moneycontrol_earnings import clean_numeric
+
+EVALUATION_CSV = 'stockanalysis/model_evaluation.csv'
+# One JSON file of fold scores per feature/target data hash, see evaluate_grid()
+EVAL_CACHE_DIR = 'stockanalysis/model_eval_cache'
+TIME_COLUMN = 'board_announcement_time'
+# Return over the start/end price window stored by historicaldata (the notebook's close_low_diff)
+WINDOW_TARGET = 'return_window'
+DEFAULT_SPLITS = 5
+
+MODELS = {
+    'decision_tree': DecisionTreeRegressor,
+    'random_forest': RandomForestRegressor,
+    'gradient_boosting': GradientBoostingRegressor,
+    'ridge': Ridge,
+}
+# Hyperparameter values per model; every combination is one grid point
+DEFAULT_GRID = {
+    'decision_tree': {'max_depth': [2, 3, 5, None], 'min_samples_leaf': [1, 5, 10], 'random_state': [42]},
+    'random_forest': {'n_estimators': [100], 'max_depth': [3, 5, None], 'min_samples_leaf': [1, 5],
+                      'random_state': [42]},
+    'gradient_boosting': {'n_estimators': [100], 'max_depth': [2, 3], 'learning_rate': [0.05, 0.1],
+                          'random_state': [42]},
+    'ridge': {'alpha': [0.1, 1.0, 10.0]},
+}
+
+
+def metric_names(df: pd.DataFrame) -> List[str]:
+    """Earnings metrics with both an _actual and an _estimated column, e.g. 'net_profit'."""
+    return sorted(
+        column[:-len('_actual')] for column in df.columns
+        if column.endswith('_actual') and f"{column[:-len('_actual')]}_estimated" in df.columns
+    )
+
+
+def _pct_change(new: pd.Series, old: pd.Series) -> pd.Series:
+    # Against |old| so a smaller loss than estimated is a positive surprise
+    return ((new - old) / old.abs() * 100).where(old != 0)
+
+
+def build_feature_matrix(df: pd.DataFrame, study: Optional[pd.DataFrame] = None) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Builds model inputs from a results table such as results_store.read_results() returns.
+
+    Features, per earnings metric: the actual and estimated values and the surprise
+    (actual vs estimated, %). Plus the announcement's minute of day and the log of the
+    start candle volume when available.
+
+    Targets: return_window, the % change from start_close to end_close, and for every
+    horizon of an event_study.run_event_study result, return_<horizon>.
+
+    Args:
+        df (pd.DataFrame): One row per announcement, metric columns as raw strings or numbers.
+        study (pd.DataFrame): Optional run_event_study output indexed like df.
+
+    Returns:
+        Tuple[pd.DataFrame, pd.DataFrame]: (features, targets), both indexed like df,
+                                           all float64 with NaN where unavailable.
+    """
+    features = {}
+    for metric in metric_names(df):
+        actual = clean_numeric(df[f"{metric}_actual"])
+        estimated = clean_numeric(df[f"{metric}_estimated"])
+        features[f"{metric}_actual"] = actual
+        features[f"{metric}_estimated"] = estimated
+        features[f"{metric}_surprise_pct"] = _pct_change(actual, estimated)
+    if TIME_COLUMN in df.columns:
+        board_time = pd.to_datetime(df[TIME_COLUMN], errors='coerce')
+        features['minute_of_day'] = (board_time.dt.hour * 60 + board_time.dt.minute).astype('float64')
+    if 'start_volume' in df.columns:
+        features['log_start_volume'] = np.log1p(clean_numeric(df['start_volume']).clip(lower=0))
+
+    targets = {}
+    if 'start_close' in df.columns and 'end_close' in df.columns:
+        targets[WINDOW_TARGET] = _pct_change(clean_numeric(df['end_close']), clean_numeric(df['start_close']))
+    if study is not None:
+        for horizon in study['return'].columns:
+            targets[f"return_{horizon}"] = study['return'][horizon].astype('float64')
+    return pd.DataFrame(features, index=df.index), pd.DataFrame(targets, index=df.index)
+
+
+def grid_points(grid: Dict[str, Dict[str, list]]) -> List[Tuple[str, Dict]]:
+    """Expands {model: {param: [values]}} into (model, params) pairs."""
+    points = []
+    for model, params in grid.items():
+        names = sorted(params)
+        points.extend((model, dict(zip(names, values))) for values in product(*(params[name] for name in names)))
+    return points
+
+
+def time_splits(times: pd.Series, n_splits: int = DEFAULT_SPLITS) -> List[Tuple[np.ndarray, np.ndarray]]:
+    """
+    Walk-forward (expanding window) train/test positions over rows ordered by time: every
+    fold trains on everything announced before its test block.
+    """
+    order = np.argsort(pd.to_datetime(times, errors='coerce').to_numpy(), kind='stable')
+    return [(order[train], order[test]) for train, test in TimeSeriesSplit(n_splits=n_splits).split(order)]
+
+
+def data_hash(features: pd.DataFrame, targets: pd.DataFrame, splits: Sequence[Tuple[np.ndarray, np.ndarray]]) -> str:
+    """Content hash of everything a fit depends on besides the model itself."""
+    sha1 = hashlib.sha1(sklearn.__version__.encode())
+    for frame in (features, targets):
+        sha1.update(json.dumps(list(frame.columns)).encode())
+        sha1.update(pd.util.hash_pandas_object(frame, index=False).to_numpy().tobytes())
+    for train, test in splits:
+        sha1.update(np.asarray(train, dtype=np.int64).tobytes())
+        sha1.update(np.asarray(test, dtype=np.int64).tobytes())
+    return sha1.hexdigest()
+
+
+def _point_key(model: str, params: Dict, target: str) -> str:
+    return json.dumps([model, params, target], sort_keys=True)
+
+
+# Set once per worker process by _init_worker, so each task only pickles its grid point
+_worker_data: Dict = {}
+
+
+def _init_worker(features: np.ndarray, targets: Dict[str, np.ndarray],
+                 splits: Sequence[Tuple[np.ndarray, np.ndarray]]) -> None:
+    _worker_data.update(features=features, targets=targets, splits=splits)
+
+
+def _evaluate_point(task: Tuple[str, Dict, str]) -> Dict:
+    """Fits one grid point on every walk-forward fold and scores the pooled test predictions."""
+    model, params, target = task
+    X, y = _worker_data['features'], _worker_data['targets'][target]
+    actual, predicted = [], []
+    for train, test in _worker_data['splits']:
+        train, test = train[~np.isnan(y[train])], test[~np.isnan(y[test])]
+        if len(train) < 2 or len(test) == 0:
+            continue
+        estimator = make_pipeline(SimpleImputer(strategy='median', keep_empty_features=True), MODELS[model](**params))
+        estimator.fit(X[train], y[train])
+        actual.append(y[test])
+        predicted.append(estimator.predict(X[test]))
+    if not actual:
+        return {'folds': 0, 'n_test': 0, 'mae': None, 'rmse': None, 'r2': None, 'hit_rate': None}
+    folds = len(actual)
+    actual, predicted = np.concatenate(actual), np.concatenate(predicted)
+    return {
+        'folds': folds,
+        'n_test': int(len(actual)),
+        'mae': float(mean_absolute_error(actual, predicted)),
+        'rmse': float(np.sqrt(mean_squared_error(actual, predicted))),
+        'r2': float(r2_score(actual, predicted)) if len(actual) > 1 else None,
+        # Share of test announcements where the predicted direction of the move was right
+        'hit_rate': float(np.mean(np.sign(predicted) == np.sign(actual))),
+    }
+
+
+def evaluate_grid(features: pd.DataFrame, targets: pd.DataFrame, times: pd.Series,
+                  grid: Optional[Dict[str, Dict[str, list]]] = None, n_splits: int = DEFAULT_SPLITS,
+                  workers: Optional[int] = None, cache_dir: Optional[str] = EVAL_CACHE_DIR) -> pd.DataFrame:
+    """
+    Walk-forward evaluation of every (model, hyperparameters, target) combination.
+
+    Grid points are fitted in parallel on a process pool (one worker per core by default).
+    Scores are cached per grid point under the hash of the features, targets and splits,
+    so re-running on unchanged data only fits grid points that were not scored before.
+
+    Args:
+        features (pd.DataFrame): build_feature_matrix features.
+        targets (pd.DataFrame): build_feature_matrix targets; every column is evaluated.
+        times (pd.Series): Announcement time of each row, ordering the walk-forward folds.
+        grid (Dict): {model: {param: [values]}} over MODELS (default DEFAULT_GRID).
+        n_splits (int): Number of walk-forward folds.
+        workers (int): Worker processes (default os.cpu_count()); 1 evaluates in-process.
+        cache_dir (str): Directory of cached scores, None to always refit.
+
+    Returns:
+        pd.DataFrame: One row per grid point, best mean absolute error first within each target.
+    """
+    grid = DEFAULT_GRID if grid is None else grid
+    splits = time_splits(times, n_splits)
+    tasks = [(model, params, target) for target in targets.columns for model, params in grid_points(grid)]
+
+    cache_path = None
+    scores: Dict[str, Dict] = {}
+    if cache_dir:
+        cache_path = os.path.join(cache_dir, f"{data_hash(features, targets, splits)}.json")
+        if os.path.exists(cache_path):
+            with open(cache_path, encoding='utf-8') as f:
+                scores = json.load(f)
+    pending = [task for task in tasks if _point_key(*task) not in scores]
+
+    if pending:
+        X = features.to_numpy(dtype=np.float64)
+        y = {target: targets[target].to_numpy(dtype=np.float64) for target in targets.columns}
+        workers = min(workers or os.cpu_count() or 1, len(pending))
+        print(f"Fitting {len(pending)} of {len(tasks)} grid points on {workers} worker(s)")
+        if workers == 1:
+            _init_worker(X, y, splits)
+            results = [_evaluate_point(task) for task in pending]
+        else:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(X, y, splits)) as pool:
+                results = list(pool.map(_evaluate_point, pending, chunksize=max(1, len(pending) // (workers * 4))))
+        scores.update({_point_key(*task): result for task, result in zip(pending, results)})
+        if cache_path:
+            os.makedirs(cache_dir, exist_ok=True)
+            with open(f"{cache_path}.tmp", 'w', encoding='utf-8') as f:
+                json.dump(scores, f)
+            os.replace(f"{cache_path}.tmp", cache_path)
+    else:
+        print(f"All {len(tasks)} grid points cached")
+
+    rows = [
+        {'target': target, 'model': model, 'params': json.dumps(params, sort_keys=True), **scores[_point_key(model, params, target)]}
+        for model, params, target in tasks
+    ]
+    result = pd.DataFrame(rows)
+    return result.sort_values(['target', 'mae'], na_position='last', kind='stable').reset_index(drop=True)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Walk-forward model evaluation of earnings surprises vs price moves.')
+    parser.add_argument('--input', default=None,
+                        help='Read this .xlsx or .csv results table instead of the results store')
+    parser.add_argument('--output', default=EVALUATION_CSV)
+    parser.add_argument('--horizons', nargs='*', default=None,
+                        help='Also evaluate event_study returns at these horizons, e.g. 15m 1h EOD')
+    parser.add_argument('--splits', type=int, default=DEFAULT_SPLITS, help='Number of walk-forward folds')
+    parser.add_argument('--workers', type=int, default=None, help='Worker processes (default: one per core)')
+    parser.add_argument('--no-cache', action='store_true', help='Refit every grid point')
+    args = parser.parse_args()
+
+    df = results_store.typed_results(results_store.load_table(args.input)) if args.input else results_store.read_results()
+    study = None
+    if args.horizons:
+        from event_study import run_event_study
+        study = run_event_study(df, args.horizons)
+    features, targets = build_feature_matrix(df, study)
+    evaluation = evaluate_grid(features, targets, df[TIME_COLUMN], n_splits=args.splits, workers=args.workers,
+                               cache_dir=None if args.no_cache else EVAL_CACHE_DIR)
+    print(evaluation.groupby('target').head(5).to_string(index=False))
+    evaluation.to_csv(args.output, index=False)
@@ -0,0 +1,45 @@
+from collections import defaultdict
+from datetime import date, timedelta
+from typing import Dict, Iterable, List, Tuple
+
+# Upstox V3 returns at most one month of 1-15 minute candles per request. 28 days keeps
+# every range inside a calendar month's length, February included.
+MAX_RANGE_DAYS = 28
+
+
+def plan_range_requests(instrument_days: Iterable[Tuple[str, date]],
+                        max_range_days: int = MAX_RANGE_DAYS) -> List[Tuple[str, date, date]]:
+    """
+    Merges the instrument-days a run needs into the fewest (instrument_key, from_date, to_date)
+    range requests the API allows.
+
+    Days of one instrument are sorted and packed greedily: a range starts at the first
+    uncovered day and absorbs every later day that is still within max_range_days of it.
+
+    Args:
+        instrument_days (Iterable[Tuple[str, date]]): (instrument_key, trading day) pairs, duplicates allowed.
+        max_range_days (int): The longest span, in calendar days, a single request may cover.
+
+    Returns:
+        List[Tuple[str, date, date]]: Inclusive (instrument_key, from_date, to_date) ranges.
+    """
+    days_by_instrument: Dict[str, set] = defaultdict(set)
+    for instrument_key, day in instrument_days:
+        days_by_instrument[instrument_key].add(day)
+
+    ranges = []
+    for instrument_key, days in days_by_instrument.items():
+        days = sorted(days)
+        range_start = range_end = days[0]
+        for day in days[1:]:
+            if day - range_start < timedelta(days=max_range_days):
+                range_end = day
+                continue
+            ranges.append((instrument_key, range_start, range_end))
+            range_start = range_end = day
+        ranges.append((instrument_key, range_start, range_end))
+    return ranges
+
+
+def days_in_range(from_date: date, to_date: date) -> List[date]:
+    return [from_date + timedelta(days=offset) for offset in range((to_date - from_date).days + 1)]
@@ -0,0 +1,282 @@
+import argparse
+import os
+import re
+from typing import Dict, List, Optional, Sequence
+import numpy as np
+import pandas as pd
+from announcements_ingest import parse_dissemination
+from candle_store import atomic_tmp_file
+from moneycontrol_earnings import clean_numeric
+
+# pyarrow is an optional dependency of the pipeline, but the results store is Parquet only
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+RESULTS_STORE_DIR = 'stockanalysis/results_store'
+PARTITION_FILE = 'results.parquet'
+PARTITION_PATTERN = re.compile(r'^quarter=(\d{4}Q[1-4])$')
+KEY_COLUMNS = ['nse_id', 'board_announcement_time']
+TIME_COLUMN = 'board_announcement_time'
+
+# Explicit schema. Timestamps are naive IST; *_actual/*_estimated earnings metrics are
+# float64 like the price columns. Other columns keep the type pandas gives them.
+STRING_COLUMNS = ['sc_id', 'stock_name', 'nse_id', 'exchdisstime']
+TIMESTAMP_COLUMNS = ['mtgdate', 'board_announcement_time', 'price_start_time', 'price_end_time',
+                     'start_timestamp', 'end_timestamp']
+FLOAT_COLUMNS = [f"{prefix}_{field}" for prefix in ('start', 'end')
+                 for field in ('open', 'high', 'low', 'close', 'volume')]
+METRIC_PATTERN = re.compile(r'_(actual|estimated)$')
+OFFSET_PATTERN = r'(?:[+-]\d{2}:\d{2}|Z)$'
+IST_ZONE = 'Asia/Kolkata'
+
+
+def _require_pyarrow() -> None:
+    if pa is None:
+        raise ImportError('results_store needs pyarrow (pip install pyarrow)')
+
+
+def column_kind(column: str) -> Optional[str]:
+    """'string', 'float' or 'timestamp' for schema columns, None for columns left as they are."""
+    if column in STRING_COLUMNS:
+        return 'string'
+    if column in TIMESTAMP_COLUMNS:
+        return 'timestamp'
+    if column in FLOAT_COLUMNS or METRIC_PATTERN.search(column):
+        return 'float'
+    return None
+
+
+def to_ist_timestamps(values: pd.Series) -> pd.Series:
+    """
+    datetime64[s] naive IST from datetimes or strings. Values with a UTC offset
+    ('2025-05-14T13:14:00+05:30') are converted to IST, others are taken as IST already.
+    """
+    if isinstance(values.dtype, pd.DatetimeTZDtype):
+        return values.dt.tz_convert(IST_ZONE).dt.tz_localize(None).astype('datetime64[s]')
+    if pd.api.types.is_datetime64_dtype(values.dtype):
+        return values.astype('datetime64[s]')
+    text = values.astype('string').str.strip()
+    aware = text.str.contains(OFFSET_PATTERN, na=False).to_numpy(dtype=bool)
+    parsed = pd.Series(pd.NaT, index=values.index, dtype='datetime64[s]')
+    if aware.any():
+        parsed[aware] = (pd.to_datetime(text[aware], utc=True, errors='coerce')
+                         .dt.tz_convert(IST_ZONE).dt.tz_localize(None))
+    naive = ~aware & text.notna().to_numpy(dtype=bool)
+    if naive.any():
+        parsed[naive] = pd.to_datetime(text[naive], format='mixed', errors='coerce')
+    return parsed
+
+
+def typed_results(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    A copy of a results table with the store's column types: "11,162" strings become
+    floats, timestamps datetime64[s]. board_announcement_time is derived from
+    exchdisstime ('14-May-2025 13:14:38') when missing.
+    """
+    typed = df.copy()
+    if TIME_COLUMN not in typed.columns and 'exchdisstime' in typed.columns:
+        typed[TIME_COLUMN] = parse_dissemination(typed['exchdisstime'].astype('string').fillna(''))
+    for column in typed.columns:
+        kind = column_kind(column)
+        if kind == 'string':
+            typed[column] = typed[column].astype('string')
+        elif kind == 'timestamp':
+            typed[column] = to_ist_timestamps(typed[column])
+        elif kind == 'float':
+            typed[column] = clean_numeric(typed[column])
+    return typed
+
+
+def arrow_schema(df: pd.DataFrame):
+    """The Parquet schema of a typed frame: schema columns get their declared type."""
+    _require_pyarrow()
+    inferred = pa.Schema.from_pandas(df, preserve_index=False)
+    types = {'string': pa.string(), 'float': pa.float64(), 'timestamp': pa.timestamp('s')}
+    return pa.schema([pa.field(field.name, types.get(column_kind(field.name), field.type))
+                      for field in inferred])
+
+
+def quarter_labels(times: pd.Series) -> pd.Series:
+    """'2025Q2' style partition labels."""
+    return times.dt.to_period('Q').astype('string')
+
+
+def _partition_path(quarter: str, store_dir: Optional[str] = None) -> str:
+    return os.path.join(store_dir or RESULTS_STORE_DIR, f"quarter={quarter}", PARTITION_FILE)
+
+
+def quarters(store_dir: Optional[str] = None) -> List[str]:
+    """Quarters with a partition in the store, oldest first."""
+    store_dir = store_dir or RESULTS_STORE_DIR
+    if not os.path.isdir(store_dir):
+        return []
+    return sorted(match.group(1) for match in map(PARTITION_PATTERN.match, os.listdir(store_dir))
+                  if match and os.path.exists(_partition_path(match.group(1), store_dir)))
+
+
+def _read_partition(path: str, columns: Optional[Sequence[str]] = None) -> pd.DataFrame:
+    stored = pq.read_schema(path).names
+    present = [column for column in columns if column in stored] if columns is not None else None
+    df = pq.read_table(path, columns=present).to_pandas()
+    # Parquet has no second-resolution timestamps; restore the store's dtype
+    for column in df.columns:
+        if column_kind(column) == 'timestamp':
+            df[column] = df[column].astype('datetime64[s]')
+    if columns is not None:
+        df = df.reindex(columns=list(columns))
+    return df
+
+
+def _write_partition(df: pd.DataFrame, path: str) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    df = df.sort_values(KEY_COLUMNS[::-1], kind='stable').reset_index(drop=True)
+    table = pa.Table.from_pandas(df, schema=arrow_schema(df), preserve_index=False)
+    with atomic_tmp_file(path) as f:
+        pq.write_table(table, f)
+    os.replace(f.name, path)
+
+
+def _merge(existing: pd.DataFrame, new: pd.DataFrame, upsert: bool) -> pd.DataFrame:
+    order = list(existing.columns) + [column for column in new.columns if column not in existing.columns]
+    existing = existing.set_index(KEY_COLUMNS)
+    new = new.set_index(KEY_COLUMNS)
+    if not upsert:
+        new = new[~new.index.isin(existing.index)]
+        return pd.concat([existing, new]).reset_index()[order]
+    # Columns the new rows do not carry keep their stored values
+    kept = existing.columns.difference(new.columns)
+    if len(kept):
+        new = new.join(existing[kept], how='left')
+    return pd.concat([existing.drop(new.index.intersection(existing.index)), new]).reset_index()[order]
+
+
+def write_results(df: pd.DataFrame, mode: str = 'upsert', store_dir: Optional[str] = None) -> int:
+    """
+    Writes results rows into the store, keyed by (nse_id, board_announcement_time) and
+    partitioned by the quarter of the announcement. Only the touched quarters are
+    rewritten.
+
+    Args:
+        df (pd.DataFrame): Results rows, raw (strings from Excel/CSV) or already typed.
+        mode (str): 'upsert' replaces stored rows with the same key, keeping stored
+                    columns df does not have, so prices can be added to earnings rows.
+                    'append' only adds rows with new keys.
+        store_dir (str): Store directory (default RESULTS_STORE_DIR).
+
+    Returns:
+        int: Number of rows written (new or replaced).
+    """
+    _require_pyarrow()
+    if mode not in ('upsert', 'append'):
+        raise ValueError(f"Unknown write mode: {mode}")
+    typed = typed_results(df)
+    if TIME_COLUMN not in typed.columns or 'nse_id' not in typed.columns:
+        raise ValueError(f"Results need {KEY_COLUMNS} (or exchdisstime) columns")
+    keyed = typed[KEY_COLUMNS].notna().all(axis=1)
+    if not keyed.all():
+        print(f"Skipping {int((~keyed).sum())} rows without nse_id or announcement time.")
+    typed = typed[keyed].drop_duplicates(KEY_COLUMNS, keep='last')
+
+    written = 0
+    for quarter, part in typed.groupby(quarter_labels(typed[TIME_COLUMN]), sort=True):
+        path = _partition_path(quarter, store_dir)
+        if os.path.exists(path):
+            existing = _read_partition(path)
+            before = len(existing)
+            merged = _merge(existing, part, mode == 'upsert')
+            written += len(part) if mode == 'upsert' else len(merged) - before
+        else:
+            merged = part
+            written += len(part)
+        _write_partition(merged, path)
+    return written
+
+
+def read_results(columns: Optional[Sequence[str]] = None, from_time=None, to_time=None,
+                 store_dir: Optional[str] = None) -> pd.DataFrame:
+    """
+    Reads results from the store. Only the partitions of quarters overlapping
+    [from_time, to_time] are opened, and only the requested columns are decoded.
+
+    Args:
+        columns (Sequence[str]): Columns to read (default all); missing ones come back as NA.
+        from_time, to_time: Optional inclusive announcement time bounds (naive IST).
+        store_dir (str): Store directory (default RESULTS_STORE_DIR).
+
+    Returns:
+        pd.DataFrame: Typed rows ordered by announcement time, then nse_id.
+    """
+    _require_pyarrow()
+    from_time = pd.Timestamp(from_time) if from_time is not None else None
+    to_time = pd.Timestamp(to_time) if to_time is not None else None
+    selected = []
+    for quarter in quarters(store_dir):
+        period = pd.Period(quarter, freq='Q')
+        if (from_time is not None and period.end_time < from_time) or \
+                (to_time is not None and period.start_time > to_time):
+            continue
+        selected.append(quarter)
+
+    read_columns = None
+    if columns is not None:
+        # The time column is needed for range filtering even when not requested
+        read_columns = list(dict.fromkeys(list(columns) + ([TIME_COLUMN] if from_time or to_time else [])))
+    parts = [_read_partition(_partition_path(quarter, store_dir), read_columns) for quarter in selected]
+    parts = [part for part in parts if len(part)]
+    if not parts:
+        return typed_results(pd.DataFrame(columns=list(columns) if columns is not None else KEY_COLUMNS))
+    df = pd.concat(parts, ignore_index=True) if len(parts) > 1 else parts[0]
+    if from_time is not None or to_time is not None:
+        mask = np.ones(len(df), dtype=bool)
+        if from_time is not None:
+            mask &= (df[TIME_COLUMN] >= from_time).to_numpy(dtype=bool)
+        if to_time is not None:
+            mask &= (df[TIME_COLUMN] <= to_time).to_numpy(dtype=bool)
+        df = df[mask].reset_index(drop=True)
+    return df[list(columns)] if columns is not None else df
+
+
+def export_results(path: str, columns: Optional[Sequence[str]] = None, store_dir: Optional[str] = None,
+                   **filters) -> int:
+    """Writes the store (or a projection/time range of it) to .xlsx or .csv as a final step. Returns the row count."""
+    df = read_results(columns, store_dir=store_dir, **filters)
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    if path.lower().endswith('.xlsx'):
+        df.to_excel(path, index=False)
+    else:
+        df.to_csv(path, index=False)
+    return len(df)
+
+
+def load_table(path: str) -> pd.DataFrame:
+    """Reads an Excel or CSV results table, e.g. to import it with write_results."""
+    return pd.read_excel(path) if path.lower().endswith('.xlsx') else pd.read_csv(path)
+
+
+def partition_sizes(store_dir: Optional[str] = None) -> Dict[str, int]:
+    """Row count per quarter, from the Parquet footers."""
+    _require_pyarrow()
+    return {quarter: pq.ParquetFile(_partition_path(quarter, store_dir)).metadata.num_rows
+            for quarter in quarters(store_dir)}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Typed, quarter-partitioned Parquet store of announcement results.')
+    parser.add_argument('--store-dir', default=None, help=f'Store directory (default: {RESULTS_STORE_DIR})')
+    parser.add_argument('--import', dest='import_path', default=None, help='Upsert an .xlsx or .csv results table')
+    parser.add_argument('--append', action='store_true', help='With --import: only add new keys')
+    parser.add_argument('--export', dest='export_path', default=None, help='Write the store to .xlsx or .csv')
+    parser.add_argument('--columns', nargs='+', default=None, help='With --export: only these columns')
+    args = parser.parse_args()
+
+    if args.import_path:
+        written = write_results(load_table(args.import_path), 'append' if args.append else 'upsert', args.store_dir)
+        print(f"Wrote {written} rows from {args.import_path}.")
+    if args.export_path:
+        print(f"Exported {export_results(args.export_path, args.columns, args.store_dir)} rows to {args.export_path}.")
+    for quarter, rows in partition_sizes(args.store_dir).items():
+        print(f"{quarter}: {rows} rows")
@@ -0,0 +1,218 @@
+import argparse
+import os
+import re
+from datetime import date
+from typing import Dict, Iterable, Optional, Tuple
+import numpy as np
+import candle_store
+from candle_store import EPOCH_ORDINAL, IST_OFFSET_MINUTES, MINUTES_PER_DAY
+
+# Bar size in minutes per resolution; None is one bar per trading day
+RESOLUTIONS = {'5m': 5, '15m': 15, '1h': 60, '1d': None}
+# Intraday bars are aligned to the 9:15 IST session open, so 1h bars run 9:15-10:15, ...
+SESSION_OPEN_MINUTE = 9 * 60 + 15
+# Written next to the day partitions, in each instrument's candle store directory
+ROLLUP_FILE = 'rollups.npz'
+DAY_FILE_PATTERN = re.compile(r'^(\d{4}-\d{2}-\d{2})\.npz$')
+
+# 'minute' is the bar start as minutes since the Unix epoch. Notional is the sum of
+# typical price ((high + low + close) / 3) x volume over the bar's minute candles, so
+# vwap = notional / volume.
+ROLLUP_DTYPE = np.dtype([
+    ('minute', np.int64),
+    ('open', np.float32),
+    ('high', np.float32),
+    ('low', np.float32),
+    ('close', np.float32),
+    ('volume', np.int64),
+    ('notional', np.float64),
+    ('vwap', np.float64),
+])
+
+
+def _rollup_path(instrument_key: str, store_dir: Optional[str] = None) -> str:
+    safe_key = instrument_key.replace('|', '_')
+    return os.path.join(store_dir or candle_store.CANDLE_STORE_DIR, safe_key, ROLLUP_FILE)
+
+
+def empty_rollups() -> Dict[str, np.ndarray]:
+    rollups = {
+        'days': np.empty(0, dtype=np.int64),  # epoch days (IST) already rolled up
+        'minutes': np.empty(0, dtype=np.int64),
+        # Prefix sums over the minute candles: cum_volume[i] is the volume of minutes[:i]
+        'cum_volume': np.zeros(1, dtype=np.int64),
+        'cum_notional': np.zeros(1, dtype=np.float64),
+    }
+    rollups.update({resolution: np.empty(0, dtype=ROLLUP_DTYPE) for resolution in RESOLUTIONS})
+    return rollups
+
+
+def aggregate(arrays: np.ndarray, resolution: str) -> np.ndarray:
+    """Rolls minute-sorted CANDLE_DTYPE candles up into ROLLUP_DTYPE bars of one resolution."""
+    if len(arrays) == 0:
+        return np.empty(0, dtype=ROLLUP_DTYPE)
+    local = arrays['minute'] + IST_OFFSET_MINUTES
+    day = local // MINUTES_PER_DAY
+    size = RESOLUTIONS[resolution]
+    session_open = day * MINUTES_PER_DAY - IST_OFFSET_MINUTES + SESSION_OPEN_MINUTE
+    if size is None:
+        bar_start = session_open
+    else:
+        bar_start = session_open + (local % MINUTES_PER_DAY - SESSION_OPEN_MINUTE) // size * size
+    starts = np.flatnonzero(np.diff(bar_start, prepend=bar_start[0] - 1))
+    ends = np.append(starts[1:], len(arrays)) - 1
+
+    high, low, close = (arrays[name].astype(np.float64) for name in ('high', 'low', 'close'))
+    notional = (high + low + close) / 3 * arrays['volume']
+    bars = np.empty(len(starts), dtype=ROLLUP_DTYPE)
+    bars['minute'] = bar_start[starts]
+    bars['open'] = arrays['open'][starts]
+    bars['high'] = np.maximum.reduceat(arrays['high'], starts)
+    bars['low'] = np.minimum.reduceat(arrays['low'], starts)
+    bars['close'] = arrays['close'][ends]
+    bars['volume'] = np.add.reduceat(arrays['volume'], starts)
+    bars['notional'] = np.add.reduceat(notional, starts)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        bars['vwap'] = np.where(bars['volume'] > 0, bars['notional'] / bars['volume'], np.nan)
+    return bars
+
+
+def load_rollups(instrument_key: str, store_dir: Optional[str] = None) -> Dict[str, np.ndarray]:
+    """The instrument's rollups, or empty_rollups() if none were built yet."""
+    path = _rollup_path(instrument_key, store_dir)
+    if not os.path.exists(path):
+        return empty_rollups()
+    with np.load(path) as stored:
+        return {name: stored[name] for name in stored.files}
+
+
+def save_rollups(instrument_key: str, rollups: Dict[str, np.ndarray], store_dir: Optional[str] = None) -> str:
+    path = _rollup_path(instrument_key, store_dir)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with candle_store.atomic_tmp_file(path) as f:
+        np.savez(f, **rollups)
+    os.replace(f.name, path)
+    return path
+
+
+def add_days(rollups: Dict[str, np.ndarray], days: Dict[date, np.ndarray]) -> Dict[str, np.ndarray]:
+    """
+    Returns rollups extended with the candles of days not rolled up yet. Days newer than
+    everything already covered (the usual case) only append: their bars and prefix sums
+    continue from the last stored values. Older days are merged in and the prefix sums
+    rebuilt.
+    """
+    covered = set(rollups['days'].tolist())
+    new_days = {date_: arrays for date_, arrays in days.items()
+                if date_.toordinal() - EPOCH_ORDINAL not in covered}
+    if not new_days:
+        return rollups
+    ordered = sorted(new_days)
+    candles = np.concatenate([candle_store.as_candle_array(new_days[date_]) for date_ in ordered])
+    candles = candles[np.argsort(candles['minute'], kind='stable')]
+    high, low, close = (candles[name].astype(np.float64) for name in ('high', 'low', 'close'))
+    notional = (high + low + close) / 3 * candles['volume']
+
+    result = {'days': np.union1d(rollups['days'], [date_.toordinal() - EPOCH_ORDINAL for date_ in ordered])}
+    appending = not len(rollups['minutes']) or not len(candles) or candles['minute'][0] > rollups['minutes'][-1]
+    if appending:
+        result['minutes'] = np.concatenate([rollups['minutes'], candles['minute']])
+        result['cum_volume'] = np.concatenate([rollups['cum_volume'],
+                                               rollups['cum_volume'][-1] + np.cumsum(candles['volume'])])
+        result['cum_notional'] = np.concatenate([rollups['cum_notional'],
+                                                 rollups['cum_notional'][-1] + np.cumsum(notional)])
+    else:
+        minutes = np.concatenate([rollups['minutes'], candles['minute']])
+        order = np.argsort(minutes, kind='stable')
+        volume = np.concatenate([np.diff(rollups['cum_volume']), candles['volume']])[order]
+        notional = np.concatenate([np.diff(rollups['cum_notional']), notional])[order]
+        result['minutes'] = minutes[order]
+        result['cum_volume'] = np.concatenate([[0], np.cumsum(volume)])
+        result['cum_notional'] = np.concatenate([[0.0], np.cumsum(notional)])
+    for resolution in RESOLUTIONS:
+        bars = np.concatenate([rollups[resolution], aggregate(candles, resolution)])
+        result[resolution] = bars if appending else bars[np.argsort(bars['minute'], kind='stable')]
+    return result
+
+
+def stored_days(instrument_key: str, store_dir: Optional[str] = None) -> Iterable[date]:
+    """Days with a partition in the candle store for this instrument."""
+    directory = os.path.dirname(candle_store._partition_path(instrument_key, date(1970, 1, 1), store_dir))
+    if not os.path.isdir(directory):
+        return []
+    return sorted(date.fromisoformat(match.group(1))
+                  for match in map(DAY_FILE_PATTERN.match, os.listdir(directory)) if match)
+
+
+def update_rollups(instrument_key: str, store_dir: Optional[str] = None) -> Tuple[Dict[str, np.ndarray], int]:
+    """
+    Rolls up the instrument's immutable candle store days that are not covered yet and
+    saves the result. Days still trading are left for a later run.
+
+    Returns:
+        Tuple[Dict[str, np.ndarray], int]: The rollups and the number of days added.
+    """
+    rollups = load_rollups(instrument_key, store_dir)
+    covered = set(rollups['days'].tolist())
+    new_days = {}
+    for day in stored_days(instrument_key, store_dir):
+        if day.toordinal() - EPOCH_ORDINAL in covered:
+            continue
+        arrays = candle_store.load_day(instrument_key, day, store_dir)
+        if arrays is not None:
+            new_days[day] = arrays
+    if new_days:
+        rollups = add_days(rollups, new_days)
+        save_rollups(instrument_key, rollups, store_dir)
+    return rollups, len(new_days)
+
+
+def window_stats(rollups: Dict[str, np.ndarray], start_minutes, end_minutes) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Volume and VWAP of the minute candles in [start, end] (epoch minutes, inclusive) for
+    many windows at once. Each window costs two binary searches and two prefix-sum
+    differences, whatever its length.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: (volume, vwap) per window, vwap NaN without volume.
+    """
+    minutes = rollups['minutes']
+    lo = np.searchsorted(minutes, np.asarray(start_minutes, dtype=np.int64), side='left')
+    hi = np.searchsorted(minutes, np.asarray(end_minutes, dtype=np.int64), side='right')
+    hi = np.maximum(hi, lo)
+    volume = rollups['cum_volume'][hi] - rollups['cum_volume'][lo]
+    notional = rollups['cum_notional'][hi] - rollups['cum_notional'][lo]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        vwap = np.where(volume > 0, notional / volume, np.nan)
+    return volume, vwap
+
+
+def bars_between(rollups: Dict[str, np.ndarray], resolution: str, start_minute: int, end_minute: int) -> np.ndarray:
+    """Bars of a resolution starting within [start_minute, end_minute] (epoch minutes)."""
+    bars = rollups[resolution]
+    lo, hi = np.searchsorted(bars['minute'], [start_minute, end_minute + 1])
+    return bars[lo:hi]
+
+
+def instrument_keys(store_dir: Optional[str] = None) -> Iterable[str]:
+    """Instrument keys with a directory in the candle store."""
+    store_dir = store_dir or candle_store.CANDLE_STORE_DIR
+    if not os.path.isdir(store_dir):
+        return []
+    # Directory names are instrument keys with '|' replaced, e.g. NSE_EQ_INE825A01020
+    return sorted('|'.join(name.rsplit('_', 1)) for name in os.listdir(store_dir)
+                  if os.path.isdir(os.path.join(store_dir, name)))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Roll new candle store days up into 5m/15m/1h/daily bars.')
+    parser.add_argument('--store-dir', default=None, help='Candle store directory (default: candle_store.CANDLE_STORE_DIR)')
+    parser.add_argument('instrument_keys', nargs='*', help='Instrument keys to update (default: every stored instrument)')
+    args = parser.parse_args()
+
+    total = 0
+    keys = args.instrument_keys or instrument_keys(args.store_dir)
+    for instrument_key in keys:
+        _, added = update_rollups(instrument_key, args.store_dir)
+        total += added
+    print(f"Rolled up {total} new instrument-days across {len(keys)} instruments.")
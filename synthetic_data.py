@@ -0,0 +1,217 @@
+import json
+import os
+import shutil
+import tempfile
+import zlib
+from datetime import date, datetime, timedelta
+from typing import Callable, Dict, List, Optional, Sequence
+from unittest import mock
+import numpy as np
+import pandas as pd
+import candle_store
+import upstox
+from trading_calendar import IST, NSE_HOLIDAYS
+
+# Synthetic inputs for benchmark.py, shaped like the real files and API responses
+SUBJECTS = [
+    'Bagging/Receiving of orders/contracts',
+    'Outcome of Board Meeting',
+    'Updates',
+    'Press Release',
+    'Analysts/Institutional Investor Meet/Con. Call Updates',
+]
+# Fraction of synthetic announcements that are order wins (the subject process_announcements keeps)
+ORDER_WIN_SHARE = 0.3
+# Upstox 1-minute candles cover the whole market session, 9:15 to the 15:29 candle
+CANDLE_SESSION_START_MINUTE = 9 * 60 + 15
+CANDLES_PER_SESSION = 375
+
+
+def trading_symbol(i: int) -> str:
+    return f"SYM{i:06d}"
+
+
+def instrument_key(i: int) -> str:
+    return f"NSE_EQ|INE{i:06d}01Z"
+
+
+def write_nse_json(path: str, count: int, derivative_share: float = 0.25) -> List[str]:
+    """
+    Streams a synthetic NSE.json with `count` instruments to disk, a share of them NSE_FO
+    contracts so lookups have to skip other segments. Returns the NSE_EQ trading symbols.
+    """
+    symbols = []
+    every = int(round(1 / derivative_share)) if derivative_share else 0
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('[')
+        for i in range(count):
+            if every and i % every == every - 1:
+                instrument = {
+                    'segment': 'NSE_FO', 'name': f"SYNTHETIC {i}", 'exchange': 'NSE',
+                    'instrument_type': 'FUT', 'instrument_key': f"NSE_FO|{100000 + i}",
+                    'lot_size': 50, 'trading_symbol': f"{trading_symbol(i)} FUT", 'underlying_symbol': trading_symbol(i),
+                }
+            else:
+                symbols.append(trading_symbol(i))
+                instrument = {
+                    'segment': 'NSE_EQ', 'name': f"SYNTHETIC {i} LIMITED", 'exchange': 'NSE',
+                    'isin': instrument_key(i).split('|')[1], 'instrument_type': 'EQ',
+                    'instrument_key': instrument_key(i), 'lot_size': 1, 'exchange_token': str(i),
+                    'tick_size': 5.0, 'trading_symbol': trading_symbol(i), 'security_type': 'NORMAL',
+                }
+            f.write((',' if i else '') + json.dumps(instrument, separators=(',', ':')))
+        f.write(']')
+    return symbols
+
+
+def is_trading_day(day: date) -> bool:
+    return day.weekday() < 5 and day not in NSE_HOLIDAYS
+
+
+def trading_days(from_day: date, to_day: date) -> List[date]:
+    days = (from_day + timedelta(days=offset) for offset in range((to_day - from_day).days + 1))
+    return [day for day in days if is_trading_day(day)]
+
+
+def day_candles(key: str, day: date) -> List[list]:
+    """A deterministic random-walk session of 1-minute candles, newest first like the Upstox API."""
+    rng = np.random.default_rng(zlib.crc32(f"{key}|{day.isoformat()}".encode()))
+    base = 100 + zlib.crc32(key.encode()) % 2000
+    close = np.round(base * np.exp(np.cumsum(rng.normal(0, 0.001, CANDLES_PER_SESSION))), 2)
+    open_ = np.round(np.concatenate([[base], close[:-1]]), 2)
+    spread = np.round(np.abs(rng.normal(0, 0.0008, CANDLES_PER_SESSION)) * base, 2)
+    high = np.maximum(open_, close) + spread
+    low = np.minimum(open_, close) - spread
+    volume = rng.integers(100, 20000, CANDLES_PER_SESSION)
+    start = np.datetime64(day, 'm') + np.timedelta64(CANDLE_SESSION_START_MINUTE, 'm')
+    stamps = np.datetime_as_string(start + np.arange(CANDLES_PER_SESSION).astype('timedelta64[m]'), unit='m')
+    candles = [
+        [f"{stamp}:00+05:30", float(o), float(h), float(l), float(c), int(v), 0]
+        for stamp, o, h, l, c, v in zip(stamps, open_, high, low, close, volume)
+    ]
+    candles.reverse()
+    return candles
+
+
+def candle_payload(key: str, from_day: date, to_day: date) -> Dict:
+    """Historical Candle Data V3 response body for an inclusive range of days."""
+    candles = []
+    for day in reversed(trading_days(from_day, to_day)):
+        candles.extend(day_candles(key, day))
+    return {'status': 'success', 'data': {'candles': candles}}
+
+
+class StubResponse:
+    """The parts of requests.Response that upstox reads."""
+
+    def __init__(self, payload: Dict, status_code: int = 200):
+        self.payload = payload
+        self.status_code = status_code
+        self.text = json.dumps(payload)
+
+    def json(self) -> Dict:
+        return self.payload
+
+
+def fake_get(url: str, headers: Optional[Dict] = None, params: Optional[Dict] = None,
+             today: Optional[date] = None) -> StubResponse:
+    """
+    Stand-in for fetch_engine.http_get answering Historical Candle Data V3 requests
+    with candle_payload, for patching upstox.http_get in tests. Intraday requests get
+    the whole session of `today` (default: the current IST date).
+    """
+    key, *rest = url.split('/historical-candle/')[1].replace('intraday/', '').split('/')
+    last = rest[-1]
+    to_day = date.fromisoformat(last) if len(last) == 10 else today or datetime.now(IST).date()
+    from_day = date.fromisoformat(params['from_date']) if params and 'from_date' in params else to_day
+    return StubResponse(candle_payload(key, from_day, to_day))
+
+
+class TempCandleStore:
+    """
+    unittest.TestCase mixin for tests that read or write candles. use_temp_candle_store()
+    points the candle store at a temporary directory for the test, and can stand in for
+    the Upstox endpoint and for modules' get_instrument_key lookups.
+    """
+
+    def use_temp_candle_store(self, http_get: Optional[Callable] = None, instrument_keys: Optional[Dict] = None,
+                              lookup_modules: Sequence = (), subdir: Optional[str] = None) -> str:
+        """
+        Args:
+            http_get: Side effect for upstox.http_get (e.g. fake_get), patched as self.get.
+            instrument_keys (Dict): symbol -> instrument key for the lookup_modules'
+                                    get_instrument_key (unknown symbols give None).
+            subdir (str): Keep the store in this subdirectory of self.tmpdir.
+
+        Returns:
+            str: The store directory.
+        """
+        self.tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmpdir)
+        store_dir = os.path.join(self.tmpdir, subdir) if subdir else self.tmpdir
+        patchers = [mock.patch.object(candle_store, 'CANDLE_STORE_DIR', store_dir)]
+        if http_get is not None:
+            patchers.append(mock.patch.object(upstox, 'http_get', side_effect=http_get))
+        for module in lookup_modules:
+            patchers.append(mock.patch.object(module, 'get_instrument_key', side_effect=instrument_keys.get))
+        for patcher in patchers:
+            patched = patcher.start()
+            self.addCleanup(patcher.stop)
+            if patcher.attribute == 'http_get':
+                self.get = patched
+        return store_dir
+
+
+def random_session_times(rng: np.random.Generator, count: int, from_day: date, to_day: date,
+                         first_hour: int = 8, last_hour: int = 20) -> List[datetime]:
+    """Times on random trading days, spread over hours inside and outside the session."""
+    days = trading_days(from_day, to_day)
+    picked = rng.integers(0, len(days), count)
+    seconds = rng.integers(first_hour * 3600, last_hour * 3600, count)
+    return [datetime.combine(days[d], datetime.min.time()) + timedelta(seconds=int(s)) for d, s in zip(picked, seconds)]
+
+
+def write_announcements_csv(path: str, symbols: Sequence[str], count: int, from_day: date, to_day: date,
+                            seed: int = 0) -> int:
+    """
+    Writes a synthetic NSE announcements export. Returns the number of order-win rows,
+    i.e. the rows process_announcements will price.
+    """
+    rng = np.random.default_rng(seed)
+    picked = rng.integers(0, len(symbols), count)
+    subjects = np.where(rng.random(count) < ORDER_WIN_SHARE, SUBJECTS[0],
+                        np.array(SUBJECTS[1:])[rng.integers(0, len(SUBJECTS) - 1, count)])
+    times = random_session_times(rng, count, from_day, to_day)
+    dissemination = [dt.strftime('%d-%b-%Y %H:%M:%S') for dt in times]
+    df = pd.DataFrame({
+        'SYMBOL': [symbols[i] for i in picked],
+        'COMPANY NAME': [f"{symbols[i]} Limited" for i in picked],
+        'SUBJECT': subjects,
+        'DETAILS': [f"{symbols[i]} Limited has informed the Exchange about {subject}" for i, subject in zip(picked, subjects)],
+        'BROADCAST DATE/TIME': dissemination,
+        'RECEIPT': [dt.strftime('%Y-%m-%d %H:%M:%S') for dt in times],
+        'DISSEMINATION': dissemination,
+        'DIFFERENCE': '00:00:01',
+        'ATTACHMENT': [f"https://nsearchives.nseindia.com/corporate/{symbols[i]}.pdf" for i in picked],
+        'FILE SIZE': '120 KB',
+    })
+    df.to_csv(path, index=False)
+    return int((subjects == SUBJECTS[0]).sum())
+
+
+def board_meeting_results(symbols: Sequence[str], count: int, from_day: date, to_day: date,
+                          seed: int = 0, excel_path: Optional[str] = None) -> pd.DataFrame:
+    """A synthetic stock_analysis_results table (nse_id + exchdisstime), optionally written to Excel."""
+    rng = np.random.default_rng(seed)
+    picked = rng.integers(0, len(symbols), count)
+    times = random_session_times(rng, count, from_day, to_day)
+    df = pd.DataFrame({
+        'sc_id': [f"SC{i}" for i in picked],
+        'nse_id': [symbols[i] for i in picked],
+        'net_profit_actual': rng.integers(10, 5000, count),
+        'net_profit_estimated': rng.integers(10, 5000, count),
+        'exchdisstime': [dt.strftime('%d-%b-%Y %H:%M:%S') for dt in times],
+    })
+    if excel_path:
+        df.to_excel(excel_path, index=False)
+    return df
@@ -0,0 +1,54 @@
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+import pandas as pd
+import announcements_ingest
+from announcements_ingest import TIME_COLUMN, load_announcements, parquet_path_for, parse_dissemination
+
+CSV_TEXT = '''SYMBOL,SUBJECT,DISSEMINATION
+PIGL,Bagging/Receiving of orders/contracts,21-May-2025 13:52:15
+RPPL,Dividend,21-May-2025 08:28:27
+HAL,Bagging/Receiving of orders/contracts,2025-05-20 15:30:00
+BEL,Bagging/Receiving of orders/contracts,2025-05-20 15:30:01
+BAD,Bagging/Receiving of orders/contracts,yesterday
+'''
+
+class TestParseDissemination(unittest.TestCase):
+
+    def test_mixed_formats_in_one_chunk(self):
+        parsed = parse_dissemination(pd.Series(['21-May-2025 13:52:15', '2025-05-20 10:00:00', 'bad']))
+        self.assertEqual(list(parsed[:2]), [pd.Timestamp('2025-05-21 13:52:15'), pd.Timestamp('2025-05-20 10:00:00')])
+        self.assertTrue(pd.isnull(parsed[2]))
+
+class TestLoadAnnouncements(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.csv_path = os.path.join(self.tmpdir, 'announcements.csv')
+        with open(self.csv_path, 'w') as f:
+            f.write(CSV_TEXT)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_masks(self):
+        df = load_announcements(self.csv_path, subjects=['Bagging/Receiving of orders/contracts'], trading_hours_only=True)
+        self.assertEqual(list(df['SYMBOL']), ['PIGL', 'HAL'])
+        self.assertEqual(df[TIME_COLUMN].dtype.name, 'datetime64[s]')
+
+    def test_parquet_copy_is_reused_until_csv_changes(self):
+        first = load_announcements(self.csv_path)
+        self.assertTrue(os.path.exists(parquet_path_for(self.csv_path)))
+        with mock.patch.object(announcements_ingest.pd, 'read_csv') as read_csv:
+            second = load_announcements(self.csv_path)
+        read_csv.assert_not_called()
+        pd.testing.assert_frame_equal(first, second)
+
+        with open(self.csv_path, 'a') as f:
+            f.write('NEW,Dividend,2025-05-22 10:00:00\n')
+        self.assertEqual(list(load_announcements(self.csv_path)['SYMBOL'])[-1], 'NEW')
+
+if __name__ == '__main__':
+    unittest.main()
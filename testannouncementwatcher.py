@@ -0,0 +1,144 @@
+import asyncio
+import contextlib
+import hashlib
+import io
+import json
+import os
+import threading
+import time
+import unittest
+from datetime import datetime, timedelta
+from functools import partial
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from announcement_watcher import AnnouncementWatcher, FeedPoller, dissemination_time
+from synthetic_data import TempCandleStore, fake_get, instrument_key
+
+KEY = instrument_key(1)
+DISSEMINATED = datetime(2024, 5, 14, 10, 0, 0)
+OLD = {'seq_id': '1001', 'symbol': 'AAA', 'desc': 'Outcome of Board Meeting', 'exchdisstime': '13-May-2024 18:05:00'}
+NEW = {'seq_id': '1002', 'symbol': 'AAA', 'desc': 'Bagging/Receiving of orders/contracts',
+       'exchdisstime': '14-May-2024 10:00:00'}
+OTHER = {'seq_id': '1003', 'symbol': 'AAA', 'desc': 'Dividend', 'exchdisstime': '14-May-2024 10:00:00'}
+
+class StubFeedHandler(BaseHTTPRequestHandler):
+    """Serves the home page (setting a cookie) and the announcements feed with ETags."""
+    protocol_version = 'HTTP/1.1'
+    items = []
+    statuses = []
+
+    def _reply(self, status, body=b'', headers=()):
+        type(self).statuses.append(status)
+        self.send_response(status)
+        for name, value in headers:
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == '/':
+            self._reply(200, headers=[('Set-Cookie', 'nsit=stub; Path=/')])
+            return
+        if 'nsit=stub' not in self.headers.get('Cookie', ''):
+            self._reply(401)
+            return
+        body = json.dumps(type(self).items).encode()
+        etag = f'"{hashlib.sha1(body).hexdigest()}"'
+        if self.headers.get('If-None-Match') == etag:
+            self._reply(304, headers=[('ETag', etag)])
+            return
+        self._reply(200, body, [('ETag', etag), ('Content-Type', 'application/json')])
+
+    def log_message(self, format, *args):
+        pass
+
+class TestAnnouncementWatcher(TempCandleStore, unittest.TestCase):
+
+    def setUp(self):
+        StubFeedHandler.items = [OLD]
+        StubFeedHandler.statuses = []
+        server = ThreadingHTTPServer(('127.0.0.1', 0), StubFeedHandler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        self.base_url = f"http://127.0.0.1:{server.server_address[1]}"
+
+        # The watcher's clock starts half a second before the 10:01 candle closes, on the
+        # day NEW is disseminated, so that day's candles come from intraday requests
+        self.use_temp_candle_store(partial(fake_get, today=DISSEMINATED.date()))
+        start = DISSEMINATED + timedelta(minutes=2, seconds=-0.5)
+        self.clock = lambda: start + timedelta(seconds=time.monotonic() - self.started)
+        self.started = time.monotonic()
+        self.output = os.path.join(self.tmpdir, 'snapshots.jsonl')
+
+    def watcher(self, **kwargs):
+        return AnnouncementWatcher(FeedPoller(self.base_url), offsets_minutes=(0, 0.5, 1), poll_seconds=0.05,
+                                   snapshots_path=self.output, key_lookup={'AAA': KEY}.get, clock=self.clock,
+                                   **kwargs)
+
+    def test_new_announcements_are_snapshotted_once(self):
+        watcher = self.watcher()
+
+        async def scenario():
+            # The first poll only marks the backlog as seen
+            self.assertEqual(await watcher.poll_once(), [])
+            self.assertEqual(await watcher.poll_once(), [])
+            StubFeedHandler.items = [NEW, OTHER, OLD]
+            self.started = time.monotonic()
+            self.assertEqual(await watcher.poll_once(), [NEW])
+            self.assertEqual(await watcher.poll_once(), [])
+            await watcher.drain()
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            asyncio.run(scenario())
+        self.assertEqual(StubFeedHandler.statuses.count(304), 2)
+        self.assertEqual(watcher.poller.not_modified, 2)
+
+        with open(self.output) as f:
+            snapshots = [json.loads(line) for line in f]
+        # The 10:00 candle had closed on detection; the 10:01 one is captured once it closes
+        self.assertEqual([snapshot['offset_minutes'] for snapshot in snapshots], [0, 0.5, 1])
+        self.assertEqual([snapshot['candle']['timestamp'] for snapshot in snapshots],
+                         ['2024-05-14T10:00:00+05:30', '2024-05-14T10:00:00+05:30', '2024-05-14T10:01:00+05:30'])
+        # One intraday request per capture, not a day download per offset
+        urls = [call.args[0] for call in self.get.call_args_list]
+        self.assertEqual(len(urls), 2)
+        self.assertTrue(all('/intraday/' in url for url in urls))
+        for snapshot in snapshots:
+            self.assertEqual(snapshot['id'], '1002')
+            self.assertIsNone(snapshot['error'])
+            self.assertLess(snapshot['latency_seconds'], 1.0)
+
+    def test_catch_up_and_run_loop(self):
+        StubFeedHandler.items = [NEW, OLD]
+        watcher = self.watcher(catch_up=True)
+        with contextlib.redirect_stdout(io.StringIO()):
+            asyncio.run(watcher.run(max_polls=3))
+        # OLD was disseminated after the previous day's close: no candles, but every snapshot is recorded
+        self.assertEqual(sorted(snapshot['id'] for snapshot in watcher.snapshots), ['1001'] * 3 + ['1002'] * 3)
+        old = [snapshot for snapshot in watcher.snapshots if snapshot['id'] == '1001']
+        self.assertEqual([(snapshot['candle'], snapshot['error']) for snapshot in old], [(None, None)] * 3)
+
+    def test_failed_capture_is_recorded(self):
+        def broken(instrument_key, day, today):
+            raise ConnectionError('upstream down')
+
+        StubFeedHandler.items = [NEW]
+        watcher = self.watcher(catch_up=True, fetch_candles=broken)
+        with contextlib.redirect_stdout(io.StringIO()):
+            asyncio.run(watcher.run(max_polls=1))
+        with open(self.output) as f:
+            snapshots = [json.loads(line) for line in f]
+        self.assertEqual(len(snapshots), 3)
+        for snapshot in snapshots:
+            self.assertIsNone(snapshot['candle'])
+            self.assertEqual(snapshot['error'], 'ConnectionError: upstream down')
+
+    def test_dissemination_time_formats(self):
+        self.assertEqual(dissemination_time(NEW), DISSEMINATED)
+        self.assertEqual(dissemination_time({'sort_date': '2024-05-14 10:00:00'}), DISSEMINATED)
+        self.assertIsNone(dissemination_time({'exchdisstime': ''}))
+
+if __name__ == '__main__':
+    unittest.main()
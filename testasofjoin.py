@@ -0,0 +1,88 @@
+import contextlib
+import io
+import unittest
+from datetime import datetime
+import numpy as np
+import pandas as pd
+import upstox
+from candle_store import Candle
+from asof_join import asof_candles, attach_candles
+from historicaldata import PRICE_COLUMNS, get_price_windows
+from trading_calendar import IST
+from synthetic_data import TempCandleStore, fake_get, instrument_key
+
+KEYS = {'AAA': instrument_key(1), 'BBB': instrument_key(2)}
+
+def row_by_row_prices(df: pd.DataFrame) -> pd.DataFrame:
+    """The reference join: one fetch_historical_candle_v3 lookup per row and window edge."""
+    rows = []
+    for nse_id, start_time, end_time in zip(df['nse_id'], df['price_start_time'], df['price_end_time']):
+        values = []
+        for dt in (start_time, end_time):
+            candle = None
+            if KEYS.get(nse_id) and not pd.isnull(start_time) and not pd.isnull(end_time):
+                candle = upstox.fetch_historical_candle_v3(KEYS[nse_id], IST.localize(pd.Timestamp(dt).to_pydatetime()))
+            values += [getattr(candle, field) for field in Candle.FIELDS] if candle else [None] * len(Candle.FIELDS)
+        rows.append(values)
+    return pd.DataFrame(rows, columns=PRICE_COLUMNS, index=df.index)
+
+class TestAsofJoin(TempCandleStore, unittest.TestCase):
+
+    def setUp(self):
+        self.use_temp_candle_store(fake_get)
+
+    def join(self, symbols, times):
+        with contextlib.redirect_stdout(io.StringIO()):
+            return asof_candles(symbols, times, concurrency=2, key_lookup=KEYS.get)
+
+    def test_one_fetch_per_instrument_day(self):
+        times = [datetime(2024, 5, 14, 10, 0), datetime(2024, 5, 14, 11, 0), datetime(2024, 5, 15, 10, 0),
+                 datetime(2024, 5, 14, 10, 30)]
+        candles, found = self.join(['AAA', 'AAA', 'AAA', 'BBB'], times)
+        self.assertTrue(found.all())
+        # AAA's two consecutive days are one range request (see request_planner)
+        self.assertEqual(self.get.call_count, 2)
+        # Rows come back in input order, whatever the grouping
+        stamps = (candles['minute'] * 60 + 19800).astype('datetime64[s]').astype(datetime)
+        self.assertEqual(list(stamps), times)
+
+    def test_tolerance_and_missing_rows(self):
+        times = [datetime(2024, 5, 14, 9, 14, 30), datetime(2024, 5, 14, 9, 13), None,
+                 datetime(2024, 5, 14, 10, 0), datetime(2024, 5, 14, 15, 30)]
+        candles, found = self.join(['AAA', 'AAA', 'AAA', 'UNKNOWN', 'AAA'], times)
+        # 9:14:30 and 15:30 are within a minute of the first and last candles, 9:13 is not
+        self.assertEqual(list(found), [True, False, False, False, True])
+        session_open = np.datetime64('2024-05-14T09:15') - np.timedelta64(330, 'm')
+        self.assertEqual(candles['minute'][0], session_open.astype('datetime64[m]').astype(np.int64))
+
+    def test_empty_input(self):
+        candles, found = self.join([], [])
+        self.assertEqual((len(candles), len(found)), (0, 0))
+        joined = attach_candles(pd.DataFrame({'nse_id': []}), {'start': []}, key_lookup=KEYS.get)
+        self.assertEqual(len(joined), 0)
+        self.assertEqual(self.get.call_count, 0)
+
+    def test_matches_the_row_by_row_path(self):
+        board_times = pd.Series(pd.to_datetime([
+            '2024-05-14 10:07:00', '2024-05-14 18:30:00', '2024-05-15 15:10:00', '2024-05-18 11:00:00',
+            '2024-05-14 12:00:00', None, '2024-05-16 09:00:00',
+        ]))
+        df = pd.DataFrame({'nse_id': ['AAA', 'AAA', 'BBB', 'BBB', 'UNKNOWN', 'AAA', 'BBB'],
+                           'board_announcement_time': board_times})
+        df['price_start_time'], df['price_end_time'] = get_price_windows(df['board_announcement_time'])
+        with contextlib.redirect_stdout(io.StringIO()):
+            joined = attach_candles(df, {'start': df['price_start_time'], 'end': df['price_end_time']},
+                                    concurrency=2, key_lookup=KEYS.get)
+            expected = row_by_row_prices(df)
+        self.assertEqual(list(joined.columns), PRICE_COLUMNS)
+        for name in PRICE_COLUMNS:
+            actual, wanted = joined[name].tolist(), expected[name].tolist()
+            for a, w in zip(actual, wanted):
+                if pd.isna(w):
+                    self.assertTrue(pd.isna(a), name)
+                else:
+                    self.assertEqual(a, w, name)
+        self.assertTrue(joined['start_close'].notna().sum() >= 4)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,94 @@
+import contextlib
+import io
+import os
+import unittest
+from datetime import date
+from unittest import mock
+import backfill
+import candle_store
+from backfill import COMPLETED, EMPTY, FAILED, Progress, backfill as run_backfill, load_manifest, plan_units
+from synthetic_data import TempCandleStore, candle_payload
+
+LISTED = 'NSE_EQ|INE00000101Z'
+SUSPENDED = 'NSE_EQ|INE00000201Z'
+BROKEN = 'NSE_EQ|INE00000301Z'
+# Two range requests of at most 28 days per instrument
+FROM_DAY, TO_DAY = date(2024, 2, 1), date(2024, 3, 27)
+
+def fake_get(url, headers=None, params=None):
+    instrument_key = url.split('/historical-candle/')[1].split('/')[0]
+    if instrument_key == BROKEN:
+        return mock.Mock(status_code=500, text='Internal Server Error')
+    to_day = date.fromisoformat(url.rsplit('/', 1)[1])
+    from_day = date.fromisoformat(params['from_date'])
+    payload = candle_payload(instrument_key, from_day, to_day) if instrument_key == LISTED else {'data': {'candles': []}}
+    response = mock.Mock(status_code=200, text='')
+    response.json.return_value = payload
+    return response
+
+class TestBackfill(TempCandleStore, unittest.TestCase):
+
+    def setUp(self):
+        self.use_temp_candle_store(fake_get, subdir='store')
+        self.manifest = os.path.join(self.tmpdir, 'manifest.jsonl')
+
+    def run_backfill(self, keys=(LISTED, SUSPENDED, BROKEN), **kwargs):
+        with contextlib.redirect_stdout(io.StringIO()):
+            return run_backfill(list(keys), FROM_DAY, TO_DAY, concurrency=4, manifest_path=self.manifest, **kwargs)
+
+    def test_units_follow_the_trading_calendar(self):
+        units = plan_units([LISTED], FROM_DAY, TO_DAY)
+        self.assertEqual(units, [(LISTED, date(2024, 2, 1), date(2024, 2, 28)),
+                                 (LISTED, date(2024, 2, 29), date(2024, 3, 27))])
+
+    def test_manifest_records_every_outcome_and_resumes(self):
+        counts = self.run_backfill()
+        self.assertEqual(counts, {COMPLETED: 2, EMPTY: 2, FAILED: 2, 'planned': 6, 'pending': 6, 'gaps': 0})
+        statuses = {entry['unit']: entry['status'] for entry in load_manifest(self.manifest).values()}
+        self.assertEqual(statuses[f"{LISTED}|2024-02-01|2024-02-28"], COMPLETED)
+        self.assertEqual(statuses[f"{SUSPENDED}|2024-02-29|2024-03-27"], EMPTY)
+        self.assertEqual(statuses[f"{BROKEN}|2024-02-01|2024-02-28"], FAILED)
+        self.assertIsNotNone(candle_store.load_day(LISTED, date(2024, 3, 27)))
+
+        # Only the failed units run again
+        self.get.reset_mock()
+        counts = self.run_backfill()
+        self.assertEqual(counts['pending'], 2)
+        self.assertEqual({call.args[0].split('/')[5] for call in self.get.call_args_list}, {BROKEN})
+        self.assertEqual(self.run_backfill(retry_failed=False)['pending'], 0)
+
+    def test_gaps_in_completed_units_are_refilled(self):
+        self.run_backfill(keys=[LISTED])
+        os.remove(candle_store._partition_path(LISTED, date(2024, 3, 5)))
+        counts = self.run_backfill(keys=[LISTED])
+        self.assertEqual((counts['pending'], counts['gaps'], counts[COMPLETED]), (1, 1, 1))
+        self.assertTrue(os.path.exists(candle_store._partition_path(LISTED, date(2024, 3, 5))))
+        self.assertEqual(self.run_backfill(keys=[LISTED], check_gaps=True)['pending'], 0)
+
+    def test_truncated_manifest_line_is_redone(self):
+        self.run_backfill(keys=[LISTED])
+        with open(self.manifest, 'a') as f:
+            f.write('{"unit": "NSE_EQ|INE0000')
+        self.assertEqual(len(load_manifest(self.manifest)), 2)
+        # The next run's entries start on a fresh line instead of extending the broken one
+        self.assertEqual(self.run_backfill(keys=[LISTED, SUSPENDED])['pending'], 2)
+        self.assertEqual(len(load_manifest(self.manifest)), 4)
+
+    def test_limit_stops_early(self):
+        counts = self.run_backfill(keys=[LISTED], limit=1)
+        self.assertEqual(counts[COMPLETED], 1)
+        self.assertEqual(self.run_backfill(keys=[LISTED])['pending'], 1)
+
+class TestProgress(unittest.TestCase):
+
+    def test_throughput_and_eta(self):
+        progress = Progress(4, report_seconds=3600)
+        with mock.patch.object(backfill.time, 'perf_counter', return_value=progress.started + 10):
+            progress.update({'status': COMPLETED, 'candles': 3000})
+            progress.update({'status': EMPTY, 'candles': 0})
+            line = progress.line()
+        self.assertEqual(line, 'Backfill: 2/4 units (50.0%), 1 completed, 1 empty, 0 failed | '
+                               '0.20 units/s, 300 candles/s | ETA 0:00:10')
+
+if __name__ == '__main__':
+    unittest.main()
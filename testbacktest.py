@@ -0,0 +1,105 @@
+import unittest
+from unittest import mock
+import numpy as np
+import pandas as pd
+import event_study
+from backtest import backtest, offset_returns, rank, sweep, trading_hours_mask
+
+class TestSweep(unittest.TestCase):
+
+    def setUp(self):
+        # Five announcements in time order, one delay x one holding period
+        self.returns = np.array([2.0, -1.0, 3.0, np.nan, -4.0]).reshape(-1, 1, 1)
+        self.surprise = np.array([50.0, 40.0, 10.0, 60.0, 35.0])
+        self.volume = np.array([5000.0, 100.0, 8000.0, 9000.0, 3000.0])
+
+    def test_statistics_per_combination(self):
+        results = sweep(self.returns, self.surprise, self.volume, thresholds=[30], volume_filters=[0, 2000],
+                        cost_models={'none': 0.0, 'costly': 0.5})
+        self.assertEqual(len(results), 4)
+        row = results[(results['min_volume'] == 0) & (results['cost_model'] == 'none')].iloc[0]
+        # Trades 2, -1, -4: the NaN-priced announcement is skipped
+        self.assertEqual(row['trades'], 3)
+        self.assertAlmostEqual(row['hit_rate'], 1 / 3)
+        self.assertAlmostEqual(row['mean_return'], -1.0)
+        self.assertAlmostEqual(row['median_return'], -1.0)
+        self.assertAlmostEqual(row['total_return'], -3.0)
+        # Equity 2, 1, -3 after a peak of 2
+        self.assertAlmostEqual(row['max_drawdown'], 5.0)
+
+        filtered = results[(results['min_volume'] == 2000) & (results['cost_model'] == 'costly')].iloc[0]
+        self.assertEqual(filtered['trades'], 2)
+        self.assertAlmostEqual(filtered['mean_return'], -1.5)
+        self.assertAlmostEqual(filtered['max_drawdown'], 4.5)
+
+    def test_eligibility_and_empty_combinations(self):
+        eligible = np.array([False, True, True, True, True])
+        results = sweep(self.returns, self.surprise, self.volume, thresholds=[30, 90], volume_filters=[0],
+                        cost_models={'none': 0.0}, eligible=eligible)
+        self.assertEqual(list(results['trades']), [2, 0])
+        self.assertTrue(np.isnan(results['hit_rate'].iloc[1]))
+        self.assertEqual(results['max_drawdown'].iloc[1], 0.0)
+
+    def test_no_announcements(self):
+        results = sweep(np.empty((0, 2, 3)), np.empty(0), np.empty(0), thresholds=[0], volume_filters=[0],
+                        cost_models={'none': 0.0})
+        self.assertEqual(len(results), 6)
+        self.assertTrue((results['trades'] == 0).all())
+
+    def test_matches_a_loop_over_combinations(self):
+        rng = np.random.default_rng(3)
+        returns = rng.normal(0, 2, (60, 2, 3))
+        returns[rng.random(returns.shape) < 0.1] = np.nan
+        surprise, volume = rng.normal(10, 30, 60), rng.integers(0, 10000, 60).astype(float)
+        costs = {'none': 0.0, 'fees': 0.2}
+        results = sweep(returns, surprise, volume, thresholds=[0, 20], volume_filters=[0, 5000], cost_models=costs,
+                        delays=[0, 5], holding=[15, 40, 60])
+        for row in results.itertuples():
+            d, h = [0, 5].index(row.entry_delay), [15, 40, 60].index(row.holding)
+            pnl = returns[:, d, h] - costs[row.cost_model]
+            taken = (surprise > row.threshold) & (volume >= row.min_volume) & ~np.isnan(pnl)
+            self.assertEqual(row.trades, taken.sum())
+            self.assertAlmostEqual(row.mean_return, pnl[taken].mean())
+            self.assertAlmostEqual(row.median_return, np.median(pnl[taken]))
+            equity = np.cumsum(pnl[taken])
+            self.assertAlmostEqual(row.max_drawdown, (np.maximum.accumulate(np.maximum(equity, 0)) - equity).max())
+
+    def test_rank_puts_thin_combinations_last(self):
+        results = pd.DataFrame({'trades': [1, 10, 10], 'mean_return': [9.0, 1.0, 2.0],
+                                'hit_rate': [1.0, 0.5, 0.5], 'max_drawdown': [0.0, 1.0, 1.0]})
+        self.assertEqual(list(rank(results, min_trades=5)['mean_return']), [2.0, 1.0, 9.0])
+
+class TestBacktestInputs(unittest.TestCase):
+
+    def test_trading_hours_mask(self):
+        df = pd.DataFrame({
+            'board_announcement_time': ['2025-05-14 10:00:00', '2025-05-14 16:17:05', '2025-05-14 11:00:00', None],
+            'start_timestamp': ['2025-05-14T10:00:00+05:30', '2025-05-14T15:29:00+05:30',
+                                '2025-05-14T11:00:00+05:30', '2025-05-14T11:00:00+05:30'],
+            'end_timestamp': ['2025-05-14T10:40:00+05:30', '2025-05-15T09:30:00+05:30',
+                              '2025-05-15T09:20:00+05:30', '2025-05-14T11:40:00+05:30'],
+        })
+        self.assertEqual(list(trading_hours_mask(df)), [True, False, False, False])
+
+    def test_offset_returns_compose_event_study_horizons(self):
+        df = pd.DataFrame({'nse_id': ['A', 'B']})
+        columns = pd.MultiIndex.from_product([['return'], ['5m', '15m', '20m']], names=['metric', 'horizon'])
+        study = pd.DataFrame([[10.0, 21.0, 32.0], [0.0, -50.0, np.nan]], columns=columns)
+        with mock.patch.object(event_study, 'run_event_study', return_value=study) as run:
+            returns = offset_returns(df, delays=[0, 5], holding=[15])
+        self.assertEqual(run.call_args[0][1], ['5m', '15m', '20m'])
+        np.testing.assert_allclose(returns[:, :, 0], [[21.0, 20.0], [-50.0, np.nan]])
+
+    def test_backtest_orders_by_announcement_time(self):
+        df = pd.DataFrame({
+            'board_announcement_time': ['2025-05-15 10:00:00', '2025-05-14 10:00:00'],
+            'net_profit_actual': ['1,500', '2,000'], 'net_profit_estimated': ['1,000', '1,000'],
+            'start_volume': [5000, 5000],
+        })
+        # Losing trade first in time, then the winner: a drawdown of 3 from the 0 start
+        returns = np.array([5.0, -3.0]).reshape(-1, 1, 1)
+        results = backtest(df, returns, thresholds=[0], volume_filters=[0], cost_models={'none': 0.0})
+        self.assertEqual(results['max_drawdown'].iloc[0], 3.0)
+
+if __name__ == '__main__':
+    unittest.main()
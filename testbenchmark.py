@@ -0,0 +1,60 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from datetime import date
+import benchmark
+import upstox
+from synthetic_data import candle_payload, write_announcements_csv, write_nse_json
+from upstox_stub import UpstoxStub
+
+class TestSyntheticData(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_nse_json_mixes_segments(self):
+        path = os.path.join(self.tmpdir, 'NSE.json')
+        symbols = write_nse_json(path, 8)
+        with open(path) as f:
+            instruments = json.load(f)
+        self.assertEqual(len(instruments), 8)
+        self.assertEqual(len(symbols), 6)
+        self.assertEqual({instrument['segment'] for instrument in instruments}, {'NSE_EQ', 'NSE_FO'})
+
+    def test_candle_payload_skips_weekends_and_is_newest_first(self):
+        candles = candle_payload('NSE_EQ|INE00000101Z', date(2025, 1, 3), date(2025, 1, 6))['data']['candles']
+        self.assertEqual(len(candles), 2 * 375)
+        self.assertEqual(candles[0][0], '2025-01-06T15:29:00+05:30')
+        self.assertEqual(candles[-1][0], '2025-01-03T09:15:00+05:30')
+
+    def test_announcements_csv_counts_order_wins(self):
+        path = os.path.join(self.tmpdir, 'announcements.csv')
+        order_wins = write_announcements_csv(path, ['AAA', 'BBB'], 100, date(2025, 1, 1), date(2025, 1, 31))
+        with open(path) as f:
+            lines = f.read().splitlines()
+        self.assertEqual(len(lines), 101)
+        self.assertEqual(sum('Bagging/Receiving of orders/contracts' in line for line in lines[1:]), order_wins)
+
+class TestBenchmarkAgainstStub(unittest.TestCase):
+
+    def test_candle_lookup_through_stub(self):
+        tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmpdir)
+        nse_json = os.path.join(tmpdir, 'NSE.json')
+        symbols = write_nse_json(nse_json, 20)
+        with UpstoxStub() as stub, benchmark.bench_environment(tmpdir, nse_json, stub, rate_limit=False):
+            results = benchmark.bench_fetch_historical_candle(symbols, stub, calls=3, trace_memory=True)
+        cold, warm = results
+        self.assertEqual(cold['requests'], 3)
+        self.assertEqual(warm['requests'], 0)
+        self.assertEqual(warm['store_hits'], 3)
+        self.assertGreater(cold['peak_memory_mb'], 0)
+        self.assertEqual(upstox.UPSTOX_BASE_URL, 'https://api.upstox.com')
+
+if __name__ == '__main__':
+    unittest.main()
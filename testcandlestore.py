@@ -0,0 +1,135 @@
+import os
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime
+from unittest import mock
+import numpy as np
+import candle_store
+import upstox
+from upstox import IST, fetch_historical_candle_v3
+from synthetic_data import TempCandleStore
+
+INSTRUMENT_KEY = 'NSE_EQ|INE962Y01021'
+
+# Upstox returns candles newest first
+CANDLES = [
+    ['2024-05-14T10:01:00+05:30', 101.05, 101.5, 100.9, 101.2, 1500, 0],
+    ['2024-05-14T10:00:00+05:30', 100.0, 101.1, 99.95, 101.05, 2500, 0],
+    ['2024-05-14T09:58:00+05:30', 99.5, 100.2, 99.4, 100.0, 1200, 0],
+]
+
+def candle_response(candles, status_code=200):
+    response = mock.Mock(status_code=status_code, text='')
+    response.json.return_value = {'status': 'success', 'data': {'candles': candles}}
+    return response
+
+class TestCandleStore(TempCandleStore, unittest.TestCase):
+
+    def setUp(self):
+        self.use_temp_candle_store()
+        candle_store.STATS.update(hits=0, misses=0)
+
+    def test_round_trip_sorts_candles_by_minute(self):
+        arrays = candle_store.candles_to_arrays(CANDLES)
+        candle_store.save_day(INSTRUMENT_KEY, date(2024, 5, 14), arrays, immutable=True)
+        loaded = candle_store.load_day(INSTRUMENT_KEY, date(2024, 5, 14))
+        self.assertEqual(list(loaded['minute'] - loaded['minute'][0]), [0, 2, 3])
+        self.assertEqual(loaded['close'].dtype.name, 'float32')
+        self.assertEqual(loaded['volume'].dtype.name, 'int64')
+        self.assertEqual(candle_store.STATS, {'hits': 1, 'misses': 0})
+
+    def test_concurrent_writers_of_one_day(self):
+        arrays = candle_store.candles_to_arrays(CANDLES)
+        day = date(2024, 5, 14)
+
+        def write_and_read(_):
+            candle_store.save_day(INSTRUMENT_KEY, day, arrays, immutable=True)
+            return candle_store.load_day(INSTRUMENT_KEY, day)
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            loaded = list(executor.map(write_and_read, range(200)))
+        self.assertTrue(all(len(arrays_) == 3 for arrays_ in loaded))
+        self.assertEqual(candle_store.STATS, {'hits': 200, 'misses': 0})
+        # No temporary files are left behind
+        self.assertEqual(os.listdir(os.path.dirname(candle_store._partition_path(INSTRUMENT_KEY, day))),
+                         ['2024-05-14.npz'])
+
+    def test_mutable_partition_is_a_miss(self):
+        candle_store.save_day(INSTRUMENT_KEY, date(2024, 5, 14), candle_store.candles_to_arrays(CANDLES), immutable=False)
+        self.assertIsNone(candle_store.load_day(INSTRUMENT_KEY, date(2024, 5, 14)))
+        self.assertEqual(candle_store.STATS, {'hits': 0, 'misses': 1})
+
+    def test_past_day_is_downloaded_once(self):
+        target = IST.localize(datetime(2024, 5, 14, 10, 0))
+        with mock.patch.object(upstox, 'http_get', return_value=candle_response(CANDLES)) as get:
+            first = fetch_historical_candle_v3(INSTRUMENT_KEY, target)
+            second = fetch_historical_candle_v3(INSTRUMENT_KEY, target)
+        self.assertEqual(get.call_count, 1)
+        self.assertEqual(first, second)
+        self.assertEqual(first, {
+            'timestamp': '2024-05-14T10:00:00+05:30',
+            'open': 100.0, 'high': 101.1, 'low': 99.95, 'close': 101.05, 'volume': 2500,
+        })
+
+    def test_failed_request_is_not_cached(self):
+        target = IST.localize(datetime(2024, 5, 14, 10, 0))
+        with mock.patch.object(upstox, 'http_get', return_value=candle_response([], status_code=500)) as get:
+            self.assertIsNone(fetch_historical_candle_v3(INSTRUMENT_KEY, target))
+            self.assertIsNone(fetch_historical_candle_v3(INSTRUMENT_KEY, target))
+        self.assertEqual(get.call_count, 2)
+
+    def test_nearest_candle_within_one_minute(self):
+        with mock.patch.object(upstox, 'http_get', return_value=candle_response(CANDLES)):
+            near = fetch_historical_candle_v3(INSTRUMENT_KEY, IST.localize(datetime(2024, 5, 14, 9, 59, 30)))
+            missing = fetch_historical_candle_v3(INSTRUMENT_KEY, IST.localize(datetime(2024, 5, 14, 9, 55)))
+        self.assertEqual(near['timestamp'], '2024-05-14T10:00:00+05:30')
+        self.assertIsNone(missing)
+
+    def test_memory_cache_serves_immutable_days_without_disk(self):
+        candle_store.enable_memory_cache(1)
+        self.addCleanup(candle_store.enable_memory_cache, 0)
+        arrays = candle_store.candles_to_arrays(CANDLES)
+        path = candle_store.save_day(INSTRUMENT_KEY, date(2024, 5, 14), arrays, immutable=True)
+        os.remove(path)
+        loaded = candle_store.load_day(INSTRUMENT_KEY, date(2024, 5, 14))
+        np.testing.assert_array_equal(loaded, arrays)
+        self.assertFalse(loaded.flags.writeable)
+        # Least recently used day is evicted
+        candle_store.save_day(INSTRUMENT_KEY, date(2024, 5, 15), arrays, immutable=True)
+        self.assertIsNone(candle_store.load_day(INSTRUMENT_KEY, date(2024, 5, 14)))
+
+class TestCandleRepresentation(unittest.TestCase):
+
+    def test_decode_timestamps_matches_fromisoformat(self):
+        timestamps = ['2024-05-14T10:01:00+05:30', '1999-12-31T23:59:59+05:30', '2024-02-29T00:00:00-04:00',
+                      '2024-03-01T09:15:00+00:00']
+        expected = [int(datetime.fromisoformat(ts).timestamp()) // 60 for ts in timestamps]
+        self.assertEqual(candle_store.decode_timestamps(timestamps).tolist(), expected)
+
+    def test_decode_timestamps_falls_back_for_other_layouts(self):
+        timestamps = ['2024-05-14T10:01:00.500+05:30', '2024-05-14T10:02:00Z']
+        expected = [int(datetime.fromisoformat(ts).timestamp()) // 60 for ts in timestamps]
+        self.assertEqual(candle_store.decode_timestamps(timestamps).tolist(), expected)
+
+    def test_candles_are_one_structured_array(self):
+        arrays = candle_store.candles_to_arrays(CANDLES + [['2024-05-15T09:15:00+05:30', 1, 2, 0.5, 1.5, 10]])
+        self.assertEqual(arrays.dtype, candle_store.CANDLE_DTYPE)
+        self.assertEqual(arrays['oi'][-1], 0)
+        by_day = candle_store.split_arrays_by_day(arrays)
+        self.assertEqual({day: len(day_arrays) for day, day_arrays in by_day.items()},
+                         {date(2024, 5, 14): 3, date(2024, 5, 15): 1})
+
+    def test_candle_reads_like_a_dict(self):
+        candle = upstox.candle_at(candle_store.candles_to_arrays(CANDLES), 1)
+        self.assertEqual(candle['close'], 101.05)
+        self.assertEqual(candle.get('volume'), 2500)
+        self.assertIsNone(candle.get('oi'))
+        self.assertEqual(candle['timestamp'], '2024-05-14T10:00:00+05:30')
+        self.assertEqual(dict(candle.items()), candle.to_dict())
+        with self.assertRaises(KeyError):
+            candle['minute']
+        with self.assertRaises(AttributeError):
+            candle.extra = 1
+
+if __name__ == '__main__':
+    unittest.main()
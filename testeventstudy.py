@@ -0,0 +1,62 @@
+import unittest
+from datetime import date, datetime
+import numpy as np
+import pandas as pd
+import candle_store
+import event_study
+from event_study import horizon_end_times, run_event_study
+from synthetic_data import TempCandleStore
+
+INSTRUMENT_KEY = 'NSE_EQ|INE000000001'
+
+def day_arrays(day, closes, volumes, first_minute=(9, 30)):
+    """One candle per minute from first_minute, with high/low 1 above/below close."""
+    start = int(pd.Timestamp(datetime(day.year, day.month, day.day, *first_minute), tz='Asia/Kolkata').timestamp()) // 60
+    closes = np.asarray(closes, dtype=np.float32)
+    return {
+        'minute': np.arange(start, start + len(closes), dtype=np.int64),
+        'open': closes, 'high': closes + 1, 'low': closes - 1, 'close': closes,
+        'volume': np.asarray(volumes, dtype=np.int64), 'oi': np.zeros(len(closes), dtype=np.int64),
+    }
+
+class TestHorizonEndTimes(unittest.TestCase):
+
+    def test_horizons(self):
+        starts = np.array(['2024-05-14T15:00', '2024-05-14T15:30'], dtype='datetime64[s]')
+        np.testing.assert_array_equal(horizon_end_times(starts, '40m'),
+                                      np.array(['2024-05-15T09:40', '2024-05-15T10:10'], dtype='datetime64[s]'))
+        np.testing.assert_array_equal(horizon_end_times(starts, 'EOD'),
+                                      np.array(['2024-05-14T15:30', '2024-05-15T15:30'], dtype='datetime64[s]'))
+        np.testing.assert_array_equal(horizon_end_times(starts, 'next-open'),
+                                      np.array(['2024-05-15T09:30', '2024-05-15T09:30'], dtype='datetime64[s]'))
+
+    def test_unknown_horizon(self):
+        with self.assertRaises(ValueError):
+            horizon_end_times(np.array(['2024-05-14T15:00'], dtype='datetime64[s]'), '2w')
+
+class TestRunEventStudy(TempCandleStore, unittest.TestCase):
+
+    def setUp(self):
+        self.use_temp_candle_store(instrument_keys={'ABC': INSTRUMENT_KEY}, lookup_modules=[event_study])
+        # 2024-05-14: close rises 100, 101, ... every minute from 9:30; volume 10 per candle
+        candle_store.save_day(INSTRUMENT_KEY, date(2024, 5, 14), day_arrays(date(2024, 5, 14), 100 + np.arange(361), [10] * 361), immutable=True)
+        candle_store.save_day(INSTRUMENT_KEY, date(2024, 5, 15), day_arrays(date(2024, 5, 15), [200] * 361, [20] * 361), immutable=True)
+
+    def test_matrix(self):
+        announcements = pd.DataFrame({
+            'nse_id': ['ABC', 'ABC', 'MISSING'],
+            'board_announcement_time': [datetime(2024, 5, 14, 10, 0), datetime(2024, 5, 14, 18, 0), datetime(2024, 5, 14, 10, 0)],
+        })
+        study = run_event_study(announcements, ['5m', 'next-open'])
+        # 10:00 close is 130; five minutes later 135
+        self.assertAlmostEqual(study.loc[0, ('return', '5m')], (135 / 130 - 1) * 100, places=4)
+        self.assertAlmostEqual(study.loc[0, ('mfe', '5m')], (136 / 130 - 1) * 100, places=4)
+        self.assertAlmostEqual(study.loc[0, ('mae', '5m')], (130 / 130 - 1) * 100, places=4)
+        self.assertAlmostEqual(study.loc[0, ('volume_ratio', '5m')], 1.0)
+        # After-hours announcement starts at the 15:30 close (460) and ends at next day's open (200)
+        self.assertAlmostEqual(study.loc[1, ('return', 'next-open')], (200 / 460 - 1) * 100, places=4)
+        self.assertAlmostEqual(study.loc[1, ('volume_ratio', 'next-open')], 2.0)
+        self.assertTrue(study.loc[2].isna().all())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,56 @@
+import time
+import unittest
+from unittest import mock
+import fetch_engine
+from fetch_engine import RateLimiter, fetch_all, http_get
+
+def response(status_code, headers=None):
+    return mock.Mock(status_code=status_code, headers=headers or {})
+
+class TestHttpGet(unittest.TestCase):
+
+    def setUp(self):
+        self.session = mock.Mock()
+        patcher = mock.patch.object(fetch_engine, 'get_session', return_value=self.session)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        patcher = mock.patch.object(fetch_engine.time, 'sleep')
+        self.sleep = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_retries_rate_limited_and_server_errors(self):
+        self.session.get.side_effect = [response(429, {'Retry-After': '2'}), response(503), response(200)]
+        result = http_get('https://api.upstox.com/v3/historical-candle/x')
+        self.assertEqual(result.status_code, 200)
+        self.assertEqual(self.session.get.call_count, 3)
+        self.assertEqual(self.sleep.call_args_list[0], mock.call(2.0))
+
+    def test_client_errors_are_not_retried(self):
+        self.session.get.return_value = response(401)
+        self.assertEqual(http_get('https://api.upstox.com/v3/historical-candle/x').status_code, 401)
+        self.assertEqual(self.session.get.call_count, 1)
+
+    def test_gives_up_after_max_retries(self):
+        self.session.get.return_value = response(500)
+        self.assertEqual(http_get('https://api.upstox.com/v3/historical-candle/x').status_code, 500)
+        self.assertEqual(self.session.get.call_count, fetch_engine.MAX_RETRIES + 1)
+
+class TestFetchAll(unittest.TestCase):
+
+    def test_results_keep_input_order(self):
+        def slow_square(n):
+            time.sleep(0.01 * (5 - n))
+            return n * n
+        self.assertEqual(fetch_all(slow_square, range(5), concurrency=5), [0, 1, 4, 9, 16])
+
+class TestRateLimiter(unittest.TestCase):
+
+    def test_blocks_once_burst_is_spent(self):
+        limiter = RateLimiter([(5, 0.1)])
+        started = time.monotonic()
+        for _ in range(10):
+            limiter.acquire()
+        self.assertGreaterEqual(time.monotonic() - started, 0.08)
+
+if __name__ == '__main__':
+    unittest.main()
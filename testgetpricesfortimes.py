@@ -0,0 +1,56 @@
+import unittest
+from unittest import mock
+import numpy as np
+import get_prices_for_times
+import upstox
+from get_prices_for_times import get_prices_for_pairs
+from upstox import resolve_candle_indices
+from synthetic_data import TempCandleStore
+from testcandlestore import CANDLES, INSTRUMENT_KEY, candle_response
+
+class TestResolveCandleIndices(unittest.TestCase):
+
+    def setUp(self):
+        # 10:00, 10:01, 10:02, 10:04 on 2024-05-14 IST
+        base = 1715661000 // 60
+        self.minutes = np.array([base, base + 1, base + 2, base + 4], dtype=np.int64)
+        self.base_seconds = base * 60
+
+    def resolve(self, *offsets):
+        return list(resolve_candle_indices(self.minutes, np.array(offsets, dtype=np.float64) + self.base_seconds))
+
+    def test_exact_minute_match(self):
+        self.assertEqual(self.resolve(0, 59, 60, 240), [0, 0, 1, 3])
+
+    def test_nearest_within_one_minute(self):
+        # 10:03:30 -> 10:04 (30s away); 10:03:00 ties 10:02 and 10:04 -> later candle
+        self.assertEqual(self.resolve(210, 180), [3, 3])
+
+    def test_outside_tolerance(self):
+        self.assertEqual(self.resolve(-61, 400), [-1, -1])
+
+    def test_empty_day(self):
+        self.assertEqual(list(resolve_candle_indices(np.empty(0, dtype=np.int64), np.array([0.0]))), [-1])
+
+class TestGetPricesForPairs(TempCandleStore, unittest.TestCase):
+
+    def setUp(self):
+        self.use_temp_candle_store(instrument_keys={'IRCON': INSTRUMENT_KEY}, lookup_modules=[get_prices_for_times])
+
+    def test_same_day_targets_share_one_fetch(self):
+        pairs = [
+            ('IRCON', '2024-05-14 10:01:00'),
+            ('UNKNOWN', '2024-05-14 10:00:00'),
+            ('IRCON', '2024-05-14 09:58:00'),
+            ('IRCON', '2024-05-14 12:00:00'),
+        ]
+        with mock.patch.object(upstox, 'http_get', return_value=candle_response(CANDLES)) as get:
+            prices = get_prices_for_pairs(pairs)
+        self.assertEqual(get.call_count, 1)
+        self.assertEqual(prices[0]['close'], 101.2)
+        self.assertIsNone(prices[1])
+        self.assertEqual(prices[2]['close'], 100.0)
+        self.assertIsNone(prices[3])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,26 +1,42 @@
+import contextlib
+import io
+import shutil
+import tempfile
 import unittest
 from datetime import datetime, time, timedelta
+from unittest import mock
+import numpy as np
+import pandas as pd
+import historicaldata
+import results_store
 from historicaldata import get_price_start_time, get_price_end_time
 
 class TestGetPriceStartTime(unittest.TestCase):
 
     def test_within_trading_hours(self):
         # Test a time within trading hours
-        board_time = datetime(2023, 10, 1, 10, 0)  # 10:00 AM
+        board_time = datetime(2023, 10, 3, 10, 0)  # 10:00 AM
         result = get_price_start_time(board_time)
         self.assertEqual(result, board_time)
 
     def test_before_trading_hours(self):
         # Test a time before trading hours
-        board_time = datetime(2023, 10, 1, 8, 0)  # 8:00 AM
-        expected_result = datetime(2023, 9, 30, 15, 30)  # Previous day trading end time
+        board_time = datetime(2023, 10, 3, 8, 0)  # 8:00 AM, the day after the Gandhi Jayanti holiday
+        expected_result = datetime(2023, 9, 29, 15, 30)  # Previous trading day (Friday) end time
         result = get_price_start_time(board_time)
         self.assertEqual(result, expected_result)
 
     def test_after_trading_hours(self):
         # Test a time after trading hours
-        board_time = datetime(2023, 10, 1, 16, 0)  # 4:00 PM
-        expected_result = datetime(2023, 10, 1, 15, 30)  # Current day trading end time
+        board_time = datetime(2023, 10, 3, 16, 0)  # 4:00 PM
+        expected_result = datetime(2023, 10, 3, 15, 30)  # Current day trading end time
+        result = get_price_start_time(board_time)
+        self.assertEqual(result, expected_result)
+
+    def test_weekend(self):
+        # Test a time on a weekend
+        board_time = datetime(2023, 10, 1, 10, 0)  # Sunday 10:00 AM
+        expected_result = datetime(2023, 9, 29, 15, 30)  # Friday trading end time
         result = get_price_start_time(board_time)
         self.assertEqual(result, expected_result)
 
@@ -54,5 +70,50 @@ class TestGetPriceEndTime(unittest.TestCase):
         result = get_price_end_time(start_time)
         self.assertEqual(result, expected_end_time)
 
+    def test_start_time_before_holiday(self):
+        # Test a start time after trading hours on the day before a holiday
+        start_time = datetime(2024, 8, 14, 16, 0)  # 4:00 PM; 15 Aug 2024 is Independence Day
+        expected_end_time = datetime(2024, 8, 16, 9, 30)  # Friday's 9:30 AM
+        result = get_price_end_time(start_time)
+        self.assertEqual(result, expected_end_time)
+
+class TestMain(unittest.TestCase):
+
+    def test_prices_are_upserted_into_the_results_store(self):
+        store = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, store)
+        results_store.write_results(pd.DataFrame({
+            'nse_id': ['HAL', 'EICHERMOT'], 'net_profit_actual': ['3,977', '1,362'],
+            'exchdisstime': ['14-May-2024 13:14:38', '14-May-2024 16:17:05'],
+        }), store_dir=store)
+
+        def prices(df, concurrency):
+            self.assertEqual(list(df.columns[:2]), results_store.KEY_COLUMNS)
+            columns = {name: np.nan for name in historicaldata.PRICE_COLUMNS}
+            return pd.DataFrame(dict(columns, start_close=[4719.39, 5447.0]), index=df.index)
+
+        with mock.patch.object(results_store, 'RESULTS_STORE_DIR', store), \
+                mock.patch.object(historicaldata, 'price_window_columns', side_effect=prices), \
+                contextlib.redirect_stdout(io.StringIO()):
+            historicaldata.main()
+        stored = results_store.read_results(store_dir=store)
+        self.assertEqual(list(stored['start_close']), [4719.39, 5447.0])
+        self.assertEqual(list(stored['net_profit_actual']), [3977.0, 1362.0])
+        self.assertEqual(stored['price_end_time'][1], pd.Timestamp(2024, 5, 15, 9, 30))
+
+    def test_rows_without_a_price_window_are_reported(self):
+        df = pd.DataFrame({'nse_id': ['HAL', 'OLDCO', 'NODATE'],
+                           'board_announcement_time': [pd.Timestamp(2024, 5, 14, 13, 14), pd.Timestamp(2019, 5, 14, 10),
+                                                       pd.NaT]})
+        output = io.StringIO()
+        with mock.patch.object(historicaldata, 'read_results', return_value=df), \
+                mock.patch.object(historicaldata, 'price_window_columns',
+                                  side_effect=lambda df, concurrency: pd.DataFrame(index=df.index,
+                                                                                   columns=historicaldata.PRICE_COLUMNS)), \
+                mock.patch.object(historicaldata, 'write_results'), contextlib.redirect_stdout(output):
+            historicaldata.main()
+        self.assertIn("Skipping 1 rows with an invalid board_announcement_time and 1 outside the trading calendar: "
+                      "OLDCO, NODATE", output.getvalue())
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,78 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+import instrumentation
+from instrumentation import add_rows, record_http, span, summary, to_prometheus, write_reports
+
+class TestInstrumentation(unittest.TestCase):
+
+    def setUp(self):
+        self.was_enabled = instrumentation.is_enabled()
+        instrumentation.enable()
+        instrumentation.reset()
+
+    def tearDown(self):
+        instrumentation.enable(self.was_enabled)
+        instrumentation.reset()
+
+    def test_spans_accumulate(self):
+        for _ in range(3):
+            with span('candle_scan'):
+                pass
+        entry = summary()['spans']['candle_scan']
+        self.assertEqual(entry['calls'], 3)
+        self.assertGreaterEqual(entry['seconds'], entry['max_seconds'])
+
+    def test_http_histogram_status_and_bytes(self):
+        record_http(0.004, 200, 1000)
+        record_http(0.3, 200, 500)
+        record_http(0.3, 429)
+        record_http(45.0, 'error')
+        http = summary()['http']
+        self.assertEqual(http['requests'], 4)
+        self.assertEqual(http['bytes_received'], 1500)
+        self.assertEqual(http['status_counts'], {'200': 2, '429': 1, 'error': 1})
+        buckets = http['latency_seconds']['buckets']
+        self.assertEqual(buckets['0.005'], 1)
+        self.assertEqual(buckets['0.25'], 1)
+        self.assertEqual(buckets['0.5'], 3)
+        self.assertEqual(buckets['30.0'], 3)
+        self.assertEqual(buckets['+Inf'], 4)
+
+    def test_prometheus_text(self):
+        with span('prefetch'):
+            pass
+        record_http(0.02, 200, 10)
+        add_rows('announcements', 5)
+        text = to_prometheus(summary('test'))
+        self.assertIn('stockanalysis_span_calls_total{span="prefetch"} 1\n', text)
+        self.assertIn('stockanalysis_http_request_duration_seconds_bucket{le="+Inf"} 1\n', text)
+        self.assertIn('stockanalysis_http_responses_total{status="200"} 1\n', text)
+        self.assertIn('stockanalysis_rows_total{stage="announcements"} 5\n', text)
+        self.assertIn('# TYPE stockanalysis_http_request_duration_seconds histogram\n', text)
+
+    def test_write_reports(self):
+        tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmpdir)
+        add_rows('announcements', 2)
+        json_path, prom_path = write_reports('run', tmpdir)
+        with open(json_path) as f:
+            self.assertEqual(json.load(f)['rows']['announcements']['rows'], 2)
+        self.assertTrue(os.path.exists(prom_path))
+
+    def test_disabled_is_a_no_op(self):
+        instrumentation.enable(False)
+        self.assertIs(span('a'), span('b'))
+        with span('a'):
+            record_http(0.1, 200, 10)
+            add_rows('announcements', 1)
+        metrics = summary()
+        self.assertEqual(metrics['spans'], {})
+        self.assertEqual(metrics['http']['requests'], 0)
+        self.assertEqual(metrics['rows'], {})
+        self.assertIsNone(write_reports('run', tempfile.gettempdir()))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,65 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+import instrument_index
+from instrument_index import build_index, load_index
+
+class TestInstrumentIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.nse_path = os.path.join(self.tmpdir, 'NSE.json')
+        self.mis_path = os.path.join(self.tmpdir, 'NSE_MIS.json')
+        self.index_path = os.path.join(self.tmpdir, 'instrument_index.sqlite')
+        self.write_json(self.nse_path, [
+            {'segment': 'NSE_EQ', 'trading_symbol': 'IRCON', 'instrument_key': 'NSE_EQ|INE962Y01021'},
+            {'segment': 'NSE_FO', 'trading_symbol': 'IRCON', 'instrument_key': 'NSE_FO|12345'},
+        ])
+        self.write_json(self.mis_path, [
+            {'segment': 'NSE_EQ', 'trading_symbol': 'VTL', 'instrument_key': 'NSE_EQ|INE825A01020'},
+            {'segment': 'NSE_EQ', 'trading_symbol': 'IRCON', 'instrument_key': 'NSE_EQ|SHADOWED'},
+        ])
+        self.sources = [self.nse_path, self.mis_path]
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def write_json(self, path, instruments):
+        with open(path, 'w') as f:
+            json.dump(instruments, f)
+
+    def test_lookup_by_segment_and_symbol(self):
+        index = load_index(self.sources, self.index_path)
+        self.assertEqual(index[('NSE_EQ', 'IRCON')], 'NSE_EQ|INE962Y01021')
+        self.assertEqual(index[('NSE_FO', 'IRCON')], 'NSE_FO|12345')
+        self.assertEqual(index[('NSE_EQ', 'VTL')], 'NSE_EQ|INE825A01020')
+        self.assertNotIn(('NSE_EQ', 'MISSING'), index)
+
+    def test_index_is_reused_when_sources_unchanged(self):
+        load_index(self.sources, self.index_path)
+        with mock.patch.object(instrument_index, 'build_index') as build:
+            load_index(self.sources, self.index_path)
+        build.assert_not_called()
+
+    def test_index_is_rebuilt_when_source_changes(self):
+        load_index(self.sources, self.index_path)
+        self.write_json(self.mis_path, [
+            {'segment': 'NSE_EQ', 'trading_symbol': 'NEWCO', 'instrument_key': 'NSE_EQ|INE000000001'},
+        ])
+        os.utime(self.mis_path, ns=(0, 1))
+        index = load_index(self.sources, self.index_path)
+        self.assertEqual(index[('NSE_EQ', 'NEWCO')], 'NSE_EQ|INE000000001')
+        self.assertNotIn(('NSE_EQ', 'VTL'), index)
+
+    def test_touched_source_with_same_content_is_not_rebuilt(self):
+        build_index(self.sources, self.index_path)
+        os.utime(self.nse_path, ns=(0, 1))
+        with mock.patch.object(instrument_index, 'build_index') as build:
+            load_index(self.sources, self.index_path)
+        build.assert_not_called()
+
+if __name__ == '__main__':
+    unittest.main()
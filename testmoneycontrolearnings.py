@@ -0,0 +1,141 @@
+import json
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+import numpy as np
+import pandas as pd
+from moneycontrol_earnings import clean_numeric, ingest_earnings, rows_to_frame
+
+NSE_IDS = {'HAL': 'HAL', 'EM': 'EICHERMOT', 'TPC': 'TATAPOWER', 'BSE1': None}
+
+
+def result_row(sc_id, name, mtgdate, net_profit=('1,000', '900'), revenue=('10,000', '9,500')):
+    quarter_data = [['Net Profit', *net_profit], ['Revenue', *revenue]]
+    return [sc_id, name, '', '100.5', '1.2', mtgdate, '', '', '', quarter_data]
+
+
+class StubMoneycontrolHandler(BaseHTTPRequestHandler):
+    """Serves `rows` two per page (latest first) and the pricefeed lookup."""
+    rows = []
+    requests_seen = []
+    failing_pages = set()
+
+    def do_GET(self):
+        parsed = urlparse(self.path)
+        type(self).requests_seen.append(self.path)
+        if parsed.path.startswith('/pricefeed/'):
+            sc_id = parsed.path.rsplit('/', 1)[1]
+            body = {'data': {'NSEID': NSE_IDS.get(sc_id)}}
+        else:
+            query = parse_qs(parsed.query)
+            page, limit = int(query['page'][0]), int(query['limit'][0])
+            if page in type(self).failing_pages:
+                self.send_error(500)
+                return
+            body = {'data': {'list': type(self).rows[(page - 1) * limit:page * limit]}}
+        payload = json.dumps(body).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+class TestIngestEarnings(unittest.TestCase):
+
+    def setUp(self):
+        StubMoneycontrolHandler.rows = [
+            result_row('HAL', 'Hindustan Aeron', 'May 14, 2025', ('3,977', '2,665')),
+            result_row('EM', 'Eicher Motors', 'May 14, 2025'),
+            result_row('TPC', 'Tata Power', 'May 13, 2025', ('1,028', '-')),
+        ]
+        StubMoneycontrolHandler.requests_seen = []
+        StubMoneycontrolHandler.failing_pages = set()
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), StubMoneycontrolHandler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        base_url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self.dir = tempfile.mkdtemp()
+        self.paths = {
+            'output_csv': os.path.join(self.dir, 'earnings.csv'),
+            'state_path': os.path.join(self.dir, 'state.json'),
+            'cache_path': os.path.join(self.dir, 'nse_ids.json'),
+            'earnings_url': f"{base_url}/earnings",
+            'pricefeed_url': f"{base_url}/pricefeed",
+        }
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        shutil.rmtree(self.dir)
+
+    def ingest(self, **kwargs):
+        return ingest_earnings(concurrency=2, pacing=(0, 0), limit=2, **self.paths, **kwargs)
+
+    def pricefeed_requests(self):
+        return [path for path in StubMoneycontrolHandler.requests_seen if path.startswith('/pricefeed/')]
+
+    def test_fetches_every_page_and_resolves_nse_ids(self):
+        df = self.ingest()
+        self.assertEqual(list(df['sc_id']), ['HAL', 'EM', 'TPC'])
+        self.assertEqual(list(df['nse_id']), ['HAL', 'EICHERMOT', 'TATAPOWER'])
+        self.assertEqual(df['net_profit_actual'].tolist(), [3977.0, 1000.0, 1028.0])
+        self.assertTrue(np.isnan(df.loc[2, 'net_profit_estimated']))
+        self.assertEqual(df['revenue_estimated'].dtype, np.float64)
+        with open(self.paths['state_path']) as f:
+            self.assertEqual(json.load(f), {'latest_mtgdate': '2025-05-14'})
+
+    def test_later_runs_only_pull_new_results_and_reuse_the_mapping(self):
+        self.ingest()
+        StubMoneycontrolHandler.rows = [
+            result_row('BSE1', 'Listed On BSE', 'May 15, 2025'),
+            result_row('HAL', 'Hindustan Aeron', 'May 14, 2025', ('3,977', '2,665')),
+        ] + StubMoneycontrolHandler.rows[1:]
+        StubMoneycontrolHandler.requests_seen = []
+        df = self.ingest()
+        self.assertEqual(set(df['sc_id']), {'BSE1', 'HAL', 'EM'})
+        self.assertEqual(self.pricefeed_requests(), ['/pricefeed/BSE1'])
+        self.assertNotIn('/earnings?page=3&limit=2', StubMoneycontrolHandler.requests_seen)
+        stored = pd.read_csv(self.paths['output_csv'])
+        self.assertEqual(sorted(stored['sc_id']), ['BSE1', 'EM', 'HAL', 'TPC'])
+
+        StubMoneycontrolHandler.requests_seen = []
+        self.ingest()
+        self.assertEqual(self.pricefeed_requests(), [])
+
+    def test_failed_page_does_not_advance_the_state(self):
+        StubMoneycontrolHandler.failing_pages = {2}
+        df = self.ingest()
+        self.assertEqual(list(df['sc_id']), ['HAL', 'EM'])
+        self.assertFalse(os.path.exists(self.paths['state_path']))
+
+        StubMoneycontrolHandler.failing_pages = set()
+        df = self.ingest()
+        self.assertIn('TPC', set(df['sc_id']))
+        stored = pd.read_csv(self.paths['output_csv'])
+        self.assertEqual(sorted(stored['sc_id']), ['EM', 'HAL', 'TPC'])
+        with open(self.paths['state_path']) as f:
+            self.assertEqual(json.load(f), {'latest_mtgdate': '2025-05-14'})
+
+class TestRowsToFrame(unittest.TestCase):
+
+    def test_every_metric_becomes_numeric_columns(self):
+        rows = [['X', 'X Ltd', '', '', '', 'May 14, 2025', '', '', '', [['EPS', '1.5', '1.2'], ['Net Profit', '2,000', '']]],
+                ['Y', 'Y Ltd', '', '', '', 'May 14, 2025', '', '', '', []]]
+        df = rows_to_frame(rows)
+        self.assertEqual(list(df.columns), ['sc_id', 'stock_name', 'mtgdate', 'eps_actual', 'eps_estimated',
+                                            'net_profit_actual', 'net_profit_estimated'])
+        self.assertEqual(df.loc[0, 'net_profit_actual'], 2000.0)
+        self.assertTrue(df.loc[1, ['eps_actual', 'net_profit_actual']].isna().all())
+
+    def test_clean_numeric(self):
+        values = clean_numeric(pd.Series(['3,977', '₹ 1,028', '-', None, '-12.5']))
+        np.testing.assert_array_equal(values.to_numpy(), [3977.0, 1028.0, np.nan, np.nan, -12.5])
+
+if __name__ == '__main__':
+    unittest.main()
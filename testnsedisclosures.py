@@ -0,0 +1,84 @@
+import json
+import shutil
+import tempfile
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+from nse_disclosures import board_meeting_time, fetch_board_meeting_times
+
+DISCLOSURES = {
+    'JYOTHYLAB': [
+        {'symbol': 'JYOTHYLAB', 'desc': 'Dividend', 'exchdisstime': '12-May-2025 14:17:24'},
+        {'symbol': 'JYOTHYLAB', 'desc': 'Outcome of Board Meeting', 'exchdisstime': '12-May-2025 14:10:51'},
+        {'symbol': 'JYOTHYLAB', 'desc': 'Outcome of Board Meeting', 'exchdisstime': '12-May-2025 14:12:00'},
+    ],
+    'M&M': [{'symbol': 'M&M', 'desc': 'Outcome of Board Meeting', 'exchdisstime': '05-May-2025 15:01:02'}],
+}
+
+class StubNseHandler(BaseHTTPRequestHandler):
+    """Serves the home page (setting a cookie) and the disclosure API (requiring it)."""
+    requests_seen = []
+
+    def do_GET(self):
+        parsed = urlparse(self.path)
+        type(self).requests_seen.append(parsed.path)
+        if parsed.path == '/':
+            self.send_response(200)
+            self.send_header('Set-Cookie', 'nsit=stub; Path=/')
+            self.end_headers()
+            return
+        if 'nsit=stub' not in self.headers.get('Cookie', ''):
+            self.send_response(401)
+            self.end_headers()
+            return
+        symbol = parse_qs(parsed.query)['symbol'][0]
+        body = json.dumps(DISCLOSURES.get(symbol, [])).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+class TestFetchBoardMeetingTimes(unittest.TestCase):
+
+    def setUp(self):
+        StubNseHandler.requests_seen = []
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), StubNseHandler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.base_url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self.cache_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        shutil.rmtree(self.cache_dir)
+
+    def fetch(self, symbols):
+        return fetch_board_meeting_times(symbols, '01-05-2025', '14-05-2025', concurrency=3,
+                                         base_url=self.base_url, pacing=(0, 0), cache_dir=self.cache_dir)
+
+    def test_last_board_meeting_per_symbol(self):
+        times = self.fetch(['JYOTHYLAB', 'M&M', 'NOFILING'])
+        self.assertEqual(times, {
+            'JYOTHYLAB': '12-May-2025 14:12:00',
+            'M&M': '05-May-2025 15:01:02',
+            'NOFILING': None,
+        })
+        self.assertEqual(StubNseHandler.requests_seen.count('/'), 1)
+
+    def test_past_ranges_are_served_from_cache(self):
+        self.fetch(['JYOTHYLAB', 'M&M'])
+        StubNseHandler.requests_seen = []
+        self.assertEqual(self.fetch(['JYOTHYLAB', 'M&M'])['M&M'], '05-May-2025 15:01:02')
+        self.assertEqual(StubNseHandler.requests_seen, [])
+
+    def test_board_meeting_time_without_match(self):
+        self.assertIsNone(board_meeting_time([{'desc': 'Dividend', 'exchdisstime': 'x'}]))
+        self.assertIsNone(board_meeting_time(None))
+
+if __name__ == '__main__':
+    unittest.main()
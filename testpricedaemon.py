@@ -0,0 +1,63 @@
+import contextlib
+import io
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+from unittest import mock
+import price_daemon
+from candle_store import Candle
+from price_client import query_daemon, run_client
+
+CANDLE = Candle(28594350, 100.0, 101.1, 99.95, 101.05, 2500)
+
+
+def fake_prices(pairs, concurrency):
+    return [CANDLE if symbol == 'IRCON' else None for symbol, _ in pairs]
+
+class TestPriceDaemon(unittest.TestCase):
+
+    def start(self, address):
+        patcher = mock.patch.object(price_daemon, 'get_prices_for_pairs', side_effect=fake_prices)
+        self.get_prices = patcher.start()
+        self.addCleanup(patcher.stop)
+        server = price_daemon.create_server(address)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        return server
+
+    def test_batch_over_http(self):
+        server = self.start('http://127.0.0.1:0')
+        address = f"http://127.0.0.1:{server.server_address[1]}"
+        prices = query_daemon([('IRCON', '2024-05-14 10:00:00'), ('NOPE', '2024-05-14 10:00:00')], address)
+        self.assertEqual(prices, [CANDLE.to_dict(), None])
+        self.assertEqual(prices[0]['timestamp'], '2024-05-14T10:00:00+05:30')
+        # The whole batch is one lookup
+        self.assertEqual(self.get_prices.call_count, 1)
+
+    def test_batch_over_unix_socket(self):
+        tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmpdir)
+        address = f"unix://{os.path.join(tmpdir, 'prices.sock')}"
+        self.start(address)
+        self.assertEqual(query_daemon([('IRCON', '2024-05-14 10:00:00')], address), [CANDLE.to_dict()])
+
+    def test_cli_client_mode(self):
+        server = self.start('http://127.0.0.1:0')
+        output = io.StringIO()
+        with mock.patch.dict(os.environ, {'STOCKANALYSIS_PRICE_DAEMON': f"http://127.0.0.1:{server.server_address[1]}"}), \
+                contextlib.redirect_stdout(output):
+            self.assertTrue(run_client(['IRCON', '2024-05-14 10:00:00']))
+        self.assertEqual(output.getvalue(), f"2024-05-14 10:00:00: {CANDLE.to_dict()}\n")
+
+    def test_no_daemon_running(self):
+        tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmpdir)
+        self.assertIsNone(query_daemon([('IRCON', '2024-05-14 10:00:00')], f"unix://{tmpdir}/missing.sock"))
+        with mock.patch.dict(os.environ, {'STOCKANALYSIS_PRICE_DAEMON': f"unix://{tmpdir}/missing.sock"}):
+            self.assertFalse(run_client(['IRCON', '2024-05-14 10:00:00']))
+
+if __name__ == '__main__':
+    unittest.main()
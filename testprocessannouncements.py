@@ -0,0 +1,113 @@
+import csv
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+import process_announcements
+
+FIELDNAMES = ['SYMBOL', 'COMPANY NAME', 'SUBJECT', 'DISSEMINATION']
+ORDER_WIN = 'Bagging/Receiving of orders/contracts'
+
+def fake_prices(pairs, concurrency):
+    return [{'close': 100.0 if i % 2 == 0 else 110.0} for i in range(len(pairs))]
+
+class TestProcessAnnouncements(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.input_csv = os.path.join(self.tmpdir, 'announcements.csv')
+        self.output_csv = os.path.join(self.tmpdir, 'output.csv')
+        self.manifest = os.path.join(self.tmpdir, 'manifest.jsonl')
+        for name, value in [('ANNOUNCEMENTS_CSV', self.input_csv), ('OUTPUT_CSV', self.output_csv),
+                            ('MANIFEST_PATH', self.manifest)]:
+            patcher = mock.patch.object(process_announcements, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        patcher = mock.patch.object(process_announcements, 'report_stats')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.rows = [
+            {'SYMBOL': 'PIGL', 'COMPANY NAME': 'PIGL Ltd', 'SUBJECT': ORDER_WIN, 'DISSEMINATION': '21-May-2025 13:52:15'},
+            {'SYMBOL': 'RPPL', 'COMPANY NAME': 'RPPL Ltd', 'SUBJECT': 'Dividend', 'DISSEMINATION': '21-May-2025 12:28:27'},
+            {'SYMBOL': 'RPPL', 'COMPANY NAME': 'RPPL Ltd', 'SUBJECT': ORDER_WIN, 'DISSEMINATION': 'not a date'},
+            {'SYMBOL': 'HAL', 'COMPANY NAME': 'HAL Ltd', 'SUBJECT': ORDER_WIN, 'DISSEMINATION': '2025-05-20 10:00:00'},
+        ]
+        self.write_input(self.rows)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def write_input(self, rows):
+        with open(self.input_csv, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.DictWriter(f, fieldnames=FIELDNAMES)
+            writer.writeheader()
+            writer.writerows(rows)
+
+    def read_output(self):
+        with open(self.output_csv, newline='', encoding='utf-8') as f:
+            return list(csv.DictReader(f))
+
+    def test_windows_and_pct_diff(self):
+        with mock.patch.object(process_announcements, 'get_prices_for_pairs', side_effect=fake_prices):
+            process_announcements.main(batch_size=1)
+        output = self.read_output()
+        self.assertEqual([row['SYMBOL'] for row in output], ['PIGL', 'HAL'])
+        self.assertEqual(output[0]['start_time'], '2025-05-21 13:53:15')
+        self.assertEqual(output[0]['end_time'], '2025-05-21 14:52:15')
+        self.assertAlmostEqual(float(output[0]['pct_diff']), 10.0)
+
+    def test_rerun_only_processes_new_rows(self):
+        with mock.patch.object(process_announcements, 'get_prices_for_pairs', side_effect=fake_prices):
+            process_announcements.main()
+        self.write_input(self.rows + [
+            {'SYMBOL': 'BEL', 'COMPANY NAME': 'BEL Ltd', 'SUBJECT': ORDER_WIN, 'DISSEMINATION': '2025-05-22 11:00:00'},
+        ])
+        with mock.patch.object(process_announcements, 'get_prices_for_pairs', side_effect=fake_prices) as prices:
+            process_announcements.main()
+        self.assertEqual(prices.call_count, 1)
+        self.assertEqual(prices.call_args.args[0], [('BEL', '2025-05-22 11:01:00'), ('BEL', '2025-05-22 12:00:00')])
+        self.assertEqual([row['SYMBOL'] for row in self.read_output()], ['PIGL', 'HAL', 'BEL'])
+
+    def test_resume_after_crash(self):
+        calls = []
+        def crash_on_second_batch(pairs, concurrency):
+            calls.append(pairs)
+            if len(calls) == 2:
+                raise ConnectionError('network down')
+            return fake_prices(pairs, concurrency)
+        with mock.patch.object(process_announcements, 'get_prices_for_pairs', side_effect=crash_on_second_batch):
+            with self.assertRaises(ConnectionError):
+                process_announcements.main(batch_size=1)
+        self.assertEqual([row['SYMBOL'] for row in self.read_output()], ['PIGL'])
+        with mock.patch.object(process_announcements, 'get_prices_for_pairs', side_effect=fake_prices) as prices:
+            process_announcements.main(batch_size=1)
+        self.assertEqual([call.args[0][0][0] for call in prices.call_args_list], ['HAL'])
+        self.assertEqual([row['SYMBOL'] for row in self.read_output()], ['PIGL', 'HAL'])
+
+    def test_crash_between_output_and_manifest(self):
+        with mock.patch.object(process_announcements, 'get_prices_for_pairs', side_effect=fake_prices):
+            process_announcements.main(batch_size=1)
+        # HAL's row reached the output but its manifest line was cut off, and a later row
+        # was only partly written
+        with open(self.manifest, encoding='utf-8') as f:
+            lines = f.readlines()
+        with open(self.manifest, 'w', encoding='utf-8') as f:
+            f.writelines(lines[:-1])
+            f.write(lines[-1][:10])
+        with open(self.output_csv, 'a', encoding='utf-8') as f:
+            f.write('BEL,"BEL Ltd\nDefence",Bagging')
+        self.write_input(self.rows + [
+            {'SYMBOL': 'BEL', 'COMPANY NAME': 'BEL Ltd', 'SUBJECT': ORDER_WIN, 'DISSEMINATION': '2025-05-22 11:00:00'},
+        ])
+        with mock.patch.object(process_announcements, 'get_prices_for_pairs', side_effect=fake_prices) as prices:
+            process_announcements.main(batch_size=1)
+        self.assertEqual([call.args[0][0][0] for call in prices.call_args_list], ['BEL'])
+        self.assertEqual([row['SYMBOL'] for row in self.read_output()], ['PIGL', 'HAL', 'BEL'])
+        with open(self.manifest, encoding='utf-8') as f:
+            entries = [json.loads(line) for line in f if line.startswith('{"SYMBOL": "BEL"')]
+        self.assertEqual(len(entries), 1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,102 @@
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+import numpy as np
+import pandas as pd
+import profit_analysis
+from profit_analysis import build_feature_matrix, evaluate_grid, grid_points, time_splits
+
+GRID = {'decision_tree': {'max_depth': [1, 2], 'random_state': [42]}, 'ridge': {'alpha': [1.0]}}
+
+def results_table(rows=40):
+    rng = np.random.default_rng(7)
+    surprise = rng.normal(0, 20, rows)
+    estimated = rng.uniform(100, 2000, rows)
+    actual = estimated * (1 + surprise / 100)
+    start_close = rng.uniform(100, 1000, rows)
+    return pd.DataFrame({
+        'nse_id': [f"SYM{i}" for i in range(rows)],
+        'net_profit_actual': [f"{value:,.0f}" for value in actual],
+        'net_profit_estimated': [f"₹ {value:,.0f}" for value in estimated],
+        'revenue_actual': rng.uniform(1000, 5000, rows),
+        'revenue_estimated': rng.uniform(1000, 5000, rows),
+        # Shuffled so the walk-forward order differs from the row order
+        'board_announcement_time': pd.Series(pd.date_range('2025-04-01 10:00', periods=rows, freq='6h'))
+                                   .sample(frac=1, random_state=1).dt.strftime('%Y-%m-%d %H:%M:%S').to_numpy(),
+        'start_close': start_close,
+        'end_close': start_close * (1 + surprise / 1000),
+        'start_volume': rng.integers(0, 50000, rows).astype(float),
+    })
+
+class TestFeatureMatrix(unittest.TestCase):
+
+    def test_features_cover_every_metric(self):
+        df = results_table(4)
+        df.loc[0, 'net_profit_actual'] = '-'
+        features, targets = build_feature_matrix(df)
+        self.assertEqual(list(features.columns), [
+            'net_profit_actual', 'net_profit_estimated', 'net_profit_surprise_pct',
+            'revenue_actual', 'revenue_estimated', 'revenue_surprise_pct', 'minute_of_day', 'log_start_volume',
+        ])
+        self.assertTrue(np.isnan(features.loc[0, 'net_profit_surprise_pct']))
+        self.assertTrue((features.dtypes == 'float64').all())
+        expected = (df['end_close'] / df['start_close'] - 1) * 100
+        np.testing.assert_allclose(targets['return_window'], expected)
+
+    def test_surprise_against_a_loss_estimate(self):
+        df = pd.DataFrame({'eps_actual': ['-2', '3,000', '5'], 'eps_estimated': ['-4', '2,000', '0']})
+        features, _ = build_feature_matrix(df)
+        np.testing.assert_allclose(features['eps_surprise_pct'], [50.0, 50.0, np.nan])
+
+    def test_event_study_horizons_become_targets(self):
+        df = results_table(3)
+        columns = pd.MultiIndex.from_product([['return', 'mfe'], ['15m', 'EOD']], names=['metric', 'horizon'])
+        study = pd.DataFrame(np.arange(12, dtype=float).reshape(3, 4), index=df.index, columns=columns)
+        _, targets = build_feature_matrix(df, study)
+        self.assertEqual(list(targets.columns), ['return_window', 'return_15m', 'return_EOD'])
+        self.assertEqual(list(targets['return_EOD']), [1.0, 5.0, 9.0])
+
+class TestEvaluateGrid(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmpdir)
+        self.df = results_table()
+        self.features, self.targets = build_feature_matrix(self.df)
+
+    def test_splits_walk_forward_in_time(self):
+        times = pd.to_datetime(self.df['board_announcement_time'])
+        for train, test in time_splits(self.df['board_announcement_time'], 4):
+            self.assertLess(times.iloc[train].max(), times.iloc[test].min())
+
+    def test_grid_is_scored_and_cached(self):
+        evaluation = evaluate_grid(self.features, self.targets, self.df['board_announcement_time'], GRID,
+                                   n_splits=3, workers=1, cache_dir=self.tmpdir)
+        self.assertEqual(len(evaluation), len(grid_points(GRID)))
+        self.assertTrue((evaluation['folds'] == 3).all())
+        self.assertTrue(evaluation['mae'].is_monotonic_increasing)
+        self.assertEqual(len(os.listdir(self.tmpdir)), 1)
+
+        with mock.patch.object(profit_analysis, '_evaluate_point') as evaluate:
+            cached = evaluate_grid(self.features, self.targets, self.df['board_announcement_time'], GRID,
+                                   n_splits=3, workers=1, cache_dir=self.tmpdir)
+        evaluate.assert_not_called()
+        pd.testing.assert_frame_equal(cached, evaluation)
+
+        # Only the new grid point is fitted
+        wider = dict(GRID, ridge={'alpha': [1.0, 10.0]})
+        with mock.patch.object(profit_analysis, '_evaluate_point', wraps=profit_analysis._evaluate_point) as evaluate:
+            evaluate_grid(self.features, self.targets, self.df['board_announcement_time'], wider,
+                          n_splits=3, workers=1, cache_dir=self.tmpdir)
+        self.assertEqual(evaluate.call_count, 1)
+
+    def test_process_pool_matches_in_process(self):
+        args = (self.features, self.targets, self.df['board_announcement_time'], GRID)
+        in_process = evaluate_grid(*args, n_splits=3, workers=1, cache_dir=None)
+        pooled = evaluate_grid(*args, n_splits=3, workers=2, cache_dir=None)
+        pd.testing.assert_frame_equal(pooled, in_process)
+
+if __name__ == '__main__':
+    unittest.main()
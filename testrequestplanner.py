@@ -0,0 +1,59 @@
+import shutil
+import tempfile
+import unittest
+from datetime import date
+from unittest import mock
+import candle_store
+import upstox
+from request_planner import plan_range_requests
+from upstox import prefetch_day_candles
+from testcandlestore import candle_response
+
+class TestPlanRangeRequests(unittest.TestCase):
+
+    def test_days_within_a_month_share_one_request(self):
+        days = [('A', date(2024, 5, 2)), ('A', date(2024, 5, 14)), ('A', date(2024, 5, 2)), ('A', date(2024, 5, 29))]
+        self.assertEqual(plan_range_requests(days), [('A', date(2024, 5, 2), date(2024, 5, 29))])
+
+    def test_ranges_never_exceed_the_limit(self):
+        days = [('A', date(2024, 1, 1)), ('A', date(2024, 1, 28)), ('A', date(2024, 1, 29)), ('A', date(2024, 3, 1))]
+        self.assertEqual(plan_range_requests(days), [
+            ('A', date(2024, 1, 1), date(2024, 1, 28)),
+            ('A', date(2024, 1, 29), date(2024, 1, 29)),
+            ('A', date(2024, 3, 1), date(2024, 3, 1)),
+        ])
+
+    def test_instruments_are_planned_separately(self):
+        days = [('A', date(2024, 5, 2)), ('B', date(2024, 5, 3))]
+        self.assertEqual(sorted(plan_range_requests(days)), [
+            ('A', date(2024, 5, 2), date(2024, 5, 2)),
+            ('B', date(2024, 5, 3), date(2024, 5, 3)),
+        ])
+
+class TestPrefetchDayCandles(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        patcher = mock.patch.object(candle_store, 'CANDLE_STORE_DIR', self.tmpdir)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_range_response_is_split_into_day_partitions(self):
+        candles = [
+            ['2024-05-15T09:31:00+05:30', 11, 11, 11, 11, 100, 0],
+            ['2024-05-13T15:29:00+05:30', 10, 10, 10, 10, 200, 0],
+        ]
+        days = [('A', date(2024, 5, 15)), ('A', date(2024, 5, 13))]
+        with mock.patch.object(upstox, 'http_get', return_value=candle_response(candles)) as get:
+            prefetched = prefetch_day_candles(days)
+            again = prefetch_day_candles(days + [('A', date(2024, 5, 14))])
+        self.assertEqual(get.call_count, 1)
+        self.assertEqual(get.call_args.kwargs['params'], {'from_date': '2024-05-13'})
+        self.assertEqual([float(arrays['close'][0]) for arrays in prefetched], [11.0, 10.0])
+        self.assertEqual([len(arrays['minute']) for arrays in again], [1, 1, 0])
+
+if __name__ == '__main__':
+    unittest.main()
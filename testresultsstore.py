@@ -0,0 +1,92 @@
+import contextlib
+import io
+import os
+import shutil
+import tempfile
+import unittest
+from datetime import datetime
+import pandas as pd
+import results_store
+from results_store import export_results, quarters, read_results, typed_results, write_results
+
+RAW = pd.DataFrame({
+    'sc_id': ['HAL', 'EM', 'TCS'],
+    'nse_id': ['HAL', 'EICHERMOT', 'TCS'],
+    'net_profit_actual': ['3,977', '1,362', '-'],
+    'net_profit_estimated': ['2,665', '1,238', '11,162'],
+    'exchdisstime': ['14-May-2025 13:14:38', '14-May-2025 16:17:05', '09-Jan-2025 17:40:00'],
+    'start_timestamp': ['2025-05-14T13:14:00+05:30', None, '2025-01-09T07:59:00Z'],
+    'start_close': [4719.39, None, 4050.0],
+})
+
+class TestResultsStore(unittest.TestCase):
+
+    def setUp(self):
+        self.store = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.store)
+
+    def test_columns_are_typed(self):
+        typed = typed_results(RAW)
+        self.assertEqual(list(typed['net_profit_actual'][:2]), [3977.0, 1362.0])
+        self.assertTrue(pd.isna(typed['net_profit_actual'][2]))
+        self.assertEqual(typed['net_profit_estimated'][2], 11162.0)
+        self.assertEqual(typed['board_announcement_time'][0], pd.Timestamp(2025, 5, 14, 13, 14, 38))
+        # Offsets are converted to naive IST
+        self.assertEqual(list(typed['start_timestamp']),
+                         [pd.Timestamp(2025, 5, 14, 13, 14), pd.NaT, pd.Timestamp(2025, 1, 9, 13, 29)])
+        self.assertEqual(str(typed['start_timestamp'].dtype), 'datetime64[s]')
+
+    def test_partitioned_by_quarter_and_round_trips(self):
+        self.assertEqual(write_results(RAW, store_dir=self.store), 3)
+        self.assertEqual(quarters(self.store), ['2025Q1', '2025Q2'])
+        self.assertTrue(os.path.exists(os.path.join(self.store, 'quarter=2025Q2', results_store.PARTITION_FILE)))
+        stored = read_results(store_dir=self.store)
+        self.assertEqual(list(stored['nse_id']), ['TCS', 'HAL', 'EICHERMOT'])
+        pd.testing.assert_series_equal(stored['net_profit_estimated'],
+                                       pd.Series([11162.0, 2665.0, 1238.0], name='net_profit_estimated'))
+        self.assertEqual(str(stored['board_announcement_time'].dtype), 'datetime64[s]')
+
+    def test_upsert_and_append(self):
+        write_results(RAW, store_dir=self.store)
+        prices = pd.DataFrame({'nse_id': ['HAL'], 'board_announcement_time': [datetime(2025, 5, 14, 13, 14, 38)],
+                               'start_close': [4800.0], 'end_close': [4753.0]})
+        self.assertEqual(write_results(prices, store_dir=self.store), 1)
+        stored = read_results(store_dir=self.store).set_index('nse_id')
+        # Given columns are replaced, the others keep their stored values
+        self.assertEqual(stored.loc['HAL', 'start_close'], 4800.0)
+        self.assertEqual(stored.loc['HAL', 'end_close'], 4753.0)
+        self.assertEqual(stored.loc['HAL', 'net_profit_actual'], 3977.0)
+        self.assertTrue(pd.isna(stored.loc['EICHERMOT', 'end_close']))
+        self.assertEqual(len(stored), 3)
+
+        changed = RAW.assign(net_profit_actual=['1', '2', '3'])
+        new_row = pd.DataFrame({'nse_id': ['INFY'], 'exchdisstime': ['17-Apr-2025 16:00:00']})
+        self.assertEqual(write_results(pd.concat([changed, new_row]), mode='append', store_dir=self.store), 1)
+        stored = read_results(store_dir=self.store).set_index('nse_id')
+        self.assertEqual(stored.loc['HAL', 'net_profit_actual'], 3977.0)
+        self.assertEqual(len(stored), 4)
+
+    def test_projected_and_time_range_reads(self):
+        write_results(RAW, store_dir=self.store)
+        df = read_results(['nse_id', 'start_close', 'not_stored'], from_time='2025-04-01', store_dir=self.store)
+        self.assertEqual(list(df.columns), ['nse_id', 'start_close', 'not_stored'])
+        self.assertEqual(list(df['nse_id']), ['HAL', 'EICHERMOT'])
+        self.assertTrue(df['not_stored'].isna().all())
+        empty = read_results(['nse_id'], to_time='2024-12-31', store_dir=self.store)
+        self.assertEqual((list(empty.columns), len(empty)), (['nse_id'], 0))
+
+    def test_rows_without_key_are_skipped(self):
+        raw = pd.concat([RAW, pd.DataFrame({'nse_id': ['ZEEL'], 'exchdisstime': ['']})])
+        with contextlib.redirect_stdout(io.StringIO()) as out:
+            self.assertEqual(write_results(raw, store_dir=self.store), 3)
+        self.assertIn('Skipping 1 rows', out.getvalue())
+
+    def test_export_is_optional_final_step(self):
+        write_results(RAW, store_dir=self.store)
+        path = os.path.join(self.store, 'export', 'results.csv')
+        self.assertEqual(export_results(path, ['nse_id', 'net_profit_actual'], store_dir=self.store), 3)
+        exported = pd.read_csv(path)
+        self.assertEqual(list(exported.columns), ['nse_id', 'net_profit_actual'])
+
+if __name__ == '__main__':
+    unittest.main()
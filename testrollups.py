@@ -0,0 +1,97 @@
+import os
+import unittest
+from datetime import date
+from unittest import mock
+import numpy as np
+import candle_store
+import rollups
+from candle_store import candles_to_arrays
+from rollups import aggregate, load_rollups, update_rollups, window_stats
+from synthetic_data import TempCandleStore, day_candles
+
+INSTRUMENT_KEY = 'NSE_EQ|INE962Y01021'
+DAYS = [date(2024, 5, 13), date(2024, 5, 14), date(2024, 5, 15)]
+
+def session(day):
+    return candles_to_arrays(day_candles(INSTRUMENT_KEY, day))
+
+def typical_notional(arrays):
+    return ((arrays['high'].astype(float) + arrays['low'] + arrays['close']) / 3 * arrays['volume']).sum()
+
+class TestAggregate(unittest.TestCase):
+
+    def test_bars_are_aligned_to_the_session_open(self):
+        arrays = session(DAYS[0])
+        hourly = aggregate(arrays, '1h')
+        # 9:15-15:29 is six full hours and a 15 minute 15:15 bar
+        self.assertEqual(len(hourly), 7)
+        self.assertEqual(list(np.diff(hourly['minute'])), [60] * 6)
+        self.assertEqual(hourly['minute'][0], arrays['minute'][0])
+        first = arrays[:60]
+        self.assertEqual(hourly['open'][0], first['open'][0])
+        self.assertEqual(hourly['high'][0], first['high'].max())
+        self.assertEqual(hourly['low'][0], first['low'].min())
+        self.assertEqual(hourly['close'][0], first['close'][-1])
+        self.assertEqual(hourly['volume'][0], first['volume'].sum())
+        self.assertAlmostEqual(hourly['vwap'][0], typical_notional(first) / first['volume'].sum())
+        self.assertEqual(len(aggregate(arrays, '5m')), 75)
+        self.assertEqual(len(aggregate(arrays, '15m')), 25)
+        daily = aggregate(arrays, '1d')
+        self.assertEqual(len(daily), 1)
+        self.assertEqual(daily['volume'][0], arrays['volume'].sum())
+
+class TestRollupStore(TempCandleStore, unittest.TestCase):
+
+    def setUp(self):
+        self.use_temp_candle_store()
+
+    def save(self, day, immutable=True):
+        candle_store.save_day(INSTRUMENT_KEY, day, session(day), immutable=immutable)
+
+    def test_rollups_are_stored_next_to_the_minute_data(self):
+        self.save(DAYS[0])
+        self.save(DAYS[1], immutable=False)
+        stored, added = update_rollups(INSTRUMENT_KEY)
+        self.assertEqual(added, 1)
+        self.assertTrue(os.path.exists(os.path.join(self.tmpdir, 'NSE_EQ_INE962Y01021', rollups.ROLLUP_FILE)))
+        self.assertEqual(len(stored['1d']), 1)
+        self.assertEqual(rollups.instrument_keys(), [INSTRUMENT_KEY])
+
+    def test_new_days_are_added_incrementally(self):
+        self.save(DAYS[1])
+        update_rollups(INSTRUMENT_KEY)
+        self.save(DAYS[2])
+        self.save(DAYS[0])
+        with mock.patch.object(candle_store, 'load_day', wraps=candle_store.load_day) as load:
+            stored, added = update_rollups(INSTRUMENT_KEY)
+        # Only the two new days are read
+        self.assertEqual(added, 2)
+        self.assertEqual(load.call_count, 2)
+        self.assertEqual(update_rollups(INSTRUMENT_KEY)[1], 0)
+
+        # Same result as rolling everything up at once
+        everything = np.concatenate([session(day) for day in DAYS])
+        for resolution in rollups.RESOLUTIONS:
+            np.testing.assert_array_equal(stored[resolution], aggregate(everything, resolution))
+        np.testing.assert_array_equal(stored['minutes'], everything['minute'])
+        self.assertEqual(stored['cum_volume'][-1], everything['volume'].sum())
+        np.testing.assert_array_equal(load_rollups(INSTRUMENT_KEY)['1h'], stored['1h'])
+
+    def test_window_volume_and_vwap(self):
+        for day in DAYS:
+            self.save(day)
+        stored, _ = update_rollups(INSTRUMENT_KEY)
+        everything = np.concatenate([session(day) for day in DAYS])
+        # A 40 minute window, one spanning the overnight gap, and one with no candles
+        starts = np.array([everything['minute'][10], everything['minute'][370], everything['minute'][-1] + 1])
+        ends = np.array([everything['minute'][49], everything['minute'][400], everything['minute'][-1] + 60])
+        volume, vwap = window_stats(stored, starts, ends)
+        for i, (lo, hi) in enumerate([(10, 50), (370, 401)]):
+            window = everything[lo:hi]
+            self.assertEqual(volume[i], window['volume'].sum())
+            self.assertAlmostEqual(vwap[i], typical_notional(window) / window['volume'].sum())
+        self.assertEqual(volume[2], 0)
+        self.assertTrue(np.isnan(vwap[2]))
+
+if __name__ == '__main__':
+    unittest.main()
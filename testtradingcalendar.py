@@ -0,0 +1,90 @@
+import unittest
+import warnings
+from datetime import date, datetime
+import numpy as np
+from trading_calendar import (IST, add_minutes_within_session, add_trading_minutes, is_trading_time, next_session_time,
+                              previous_session_time, snap_to_next, snap_to_previous, trading_days)
+
+def dt64(*values):
+    return np.array(values, dtype='datetime64[s]')
+
+class TestSnap(unittest.TestCase):
+
+    def test_snap_to_previous(self):
+        result = snap_to_previous([
+            datetime(2024, 5, 14, 10, 0),    # inside the session
+            datetime(2024, 5, 14, 8, 0),     # before open -> previous close
+            datetime(2024, 5, 14, 15, 45),   # after close -> same day close
+            datetime(2024, 5, 13, 8, 0),     # Monday before open -> Friday close
+            datetime(2024, 5, 21, 9, 0),     # after the 20 May holiday -> Saturday special session
+        ])
+        np.testing.assert_array_equal(result, dt64(
+            '2024-05-14T10:00', '2024-05-13T15:30', '2024-05-14T15:30',
+            '2024-05-10T15:30', '2024-05-18T12:30',
+        ))
+
+    def test_snap_to_next(self):
+        result = snap_to_next([
+            datetime(2024, 5, 14, 10, 0),
+            datetime(2024, 5, 14, 8, 0),
+            datetime(2024, 5, 17, 15, 45),   # Friday evening -> Saturday special session
+            datetime(2024, 5, 18, 13, 0),    # after the special session -> Tuesday (Monday is a holiday)
+        ])
+        np.testing.assert_array_equal(result, dt64(
+            '2024-05-14T10:00', '2024-05-14T09:30', '2024-05-18T09:15', '2024-05-21T09:30',
+        ))
+
+    def test_missing_values_stay_missing(self):
+        result = snap_to_previous(np.array(['NaT', '2024-05-14T10:00'], dtype='datetime64[s]'))
+        self.assertTrue(np.isnat(result[0]))
+
+    def test_before_the_listed_holiday_years(self):
+        times = [datetime(2019, 10, 2, 10, 0), datetime(2021, 12, 31, 20, 0)]
+        self.assertTrue(np.isnat(snap_to_previous(times)).all())
+        self.assertTrue(np.isnat(snap_to_next(times)).all())
+        self.assertTrue(np.isnat(add_minutes_within_session(times, 40)).all())
+
+    def test_past_the_listed_holiday_years_falls_back_to_weekdays(self):
+        times = [datetime(2026, 12, 31, 20, 0), datetime(2027, 1, 2, 10, 0), datetime(2040, 1, 2, 10, 0)]
+        with self.assertWarnsRegex(UserWarning, 'not extended past 2026-12-31'):
+            result = snap_to_next(times)
+        # Friday 1 Jan 2027 counts as a session, the weekend does not, 2040 is past the fallback
+        np.testing.assert_array_equal(result, dt64('2027-01-01T09:30', '2027-01-04T09:30', 'NaT'))
+        with self.assertWarns(UserWarning):
+            days = trading_days(date(2027, 1, 1), date(2027, 1, 6))
+        self.assertEqual(days, [date(2027, 1, 1), date(2027, 1, 4), date(2027, 1, 5), date(2027, 1, 6)])
+
+    def test_no_warning_inside_the_listed_holiday_years(self):
+        with warnings.catch_warnings():
+            warnings.simplefilter('error')
+            snap_to_previous([datetime(2026, 12, 31, 10, 0)])
+            trading_days(date(2026, 12, 1), date(2026, 12, 31))
+
+    def test_muhurat_session(self):
+        self.assertTrue(is_trading_time([datetime(2024, 11, 1, 18, 30)])[0])
+        self.assertFalse(is_trading_time([datetime(2024, 11, 1, 10, 0)])[0])
+
+class TestAddTradingMinutes(unittest.TestCase):
+
+    def test_rolls_into_next_session(self):
+        result = add_trading_minutes([datetime(2024, 5, 14, 15, 20), datetime(2024, 5, 14, 15, 0)], 30)
+        np.testing.assert_array_equal(result, dt64('2024-05-15T09:50', '2024-05-14T15:30'))
+
+    def test_negative_minutes(self):
+        result = add_trading_minutes([datetime(2024, 5, 14, 9, 40)], -20)
+        np.testing.assert_array_equal(result, dt64('2024-05-13T15:20'))
+
+class TestScalarHelpers(unittest.TestCase):
+
+    def test_timezone_is_preserved(self):
+        result = previous_session_time(IST.localize(datetime(2024, 5, 14, 8, 0)))
+        self.assertEqual(result, IST.localize(datetime(2024, 5, 13, 15, 30)))
+        self.assertEqual(next_session_time(datetime(2024, 5, 14, 8, 0)), datetime(2024, 5, 14, 9, 30))
+
+    def test_trading_days(self):
+        # Saturday 18 May 2024 had a special session; Monday 20 May was a holiday
+        self.assertEqual(trading_days(date(2024, 5, 17), date(2024, 5, 21)),
+                         [date(2024, 5, 17), date(2024, 5, 18), date(2024, 5, 21)])
+
+if __name__ == '__main__':
+    unittest.main()
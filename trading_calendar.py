@@ -0,0 +1,213 @@
+import warnings
+from datetime import date, datetime, time
+from typing import Iterable, List, Optional, Tuple
+import numpy as np
+import pytz
+
+IST = pytz.timezone('Asia/Kolkata')
+TRADING_START = time(9, 30)
+TRADING_END = time(15, 30)
+# Holidays are listed below for CALENDAR_START-CALENDAR_END; times before it are NaT. Extend
+# NSE_HOLIDAYS and CALENDAR_END together each year: past CALENDAR_END the session table
+# falls back to one regular session per weekday for FALLBACK_YEARS, with a warning.
+CALENDAR_START = date(2022, 1, 1)
+CALENDAR_END = date(2026, 12, 31)
+FALLBACK_YEARS = 5
+SESSION_TABLE_END = date(CALENDAR_END.year + FALLBACK_YEARS, 12, 31)
+
+# NSE equity trading holidays that fall on weekdays
+NSE_HOLIDAYS = [
+    # 2022
+    date(2022, 1, 26), date(2022, 3, 1), date(2022, 3, 18), date(2022, 4, 14), date(2022, 4, 15),
+    date(2022, 5, 3), date(2022, 8, 9), date(2022, 8, 15), date(2022, 8, 31), date(2022, 10, 5),
+    date(2022, 10, 24), date(2022, 10, 26), date(2022, 11, 8),
+    # 2023
+    date(2023, 1, 26), date(2023, 3, 7), date(2023, 3, 30), date(2023, 4, 4), date(2023, 4, 7),
+    date(2023, 4, 14), date(2023, 5, 1), date(2023, 6, 28), date(2023, 8, 15), date(2023, 9, 19),
+    date(2023, 10, 2), date(2023, 10, 24), date(2023, 11, 14), date(2023, 11, 27), date(2023, 12, 25),
+    # 2024
+    date(2024, 1, 22), date(2024, 1, 26), date(2024, 3, 8), date(2024, 3, 25), date(2024, 3, 29),
+    date(2024, 4, 11), date(2024, 4, 17), date(2024, 5, 1), date(2024, 5, 20), date(2024, 6, 17),
+    date(2024, 7, 17), date(2024, 8, 15), date(2024, 10, 2), date(2024, 11, 1), date(2024, 11, 15),
+    date(2024, 11, 20), date(2024, 12, 25),
+    # 2025
+    date(2025, 2, 26), date(2025, 3, 14), date(2025, 3, 31), date(2025, 4, 10), date(2025, 4, 14),
+    date(2025, 4, 18), date(2025, 5, 1), date(2025, 8, 15), date(2025, 8, 27), date(2025, 10, 2),
+    date(2025, 10, 21), date(2025, 10, 22), date(2025, 11, 5), date(2025, 12, 25),
+    # 2026
+    date(2026, 1, 26), date(2026, 3, 3), date(2026, 3, 26), date(2026, 3, 31), date(2026, 4, 3),
+    date(2026, 4, 14), date(2026, 5, 1), date(2026, 5, 28), date(2026, 6, 26), date(2026, 9, 14),
+    date(2026, 10, 2), date(2026, 10, 20), date(2026, 11, 10), date(2026, 11, 24), date(2026, 12, 25),
+]
+
+# Extra sessions on weekends/holidays: Muhurat trading, special Saturday sessions and the
+# disaster-recovery live sessions (which run as two short sessions on the same day)
+SPECIAL_SESSIONS = [
+    (date(2022, 10, 24), time(18, 15), time(19, 15)),
+    (date(2023, 11, 12), time(18, 15), time(19, 15)),
+    (date(2024, 1, 20), TRADING_START, TRADING_END),
+    (date(2024, 3, 2), time(9, 15), time(10, 0)),
+    (date(2024, 3, 2), time(11, 30), time(12, 30)),
+    (date(2024, 5, 18), time(9, 15), time(10, 0)),
+    (date(2024, 5, 18), time(11, 30), time(12, 30)),
+    (date(2024, 11, 1), time(18, 0), time(19, 0)),
+    (date(2025, 2, 1), TRADING_START, TRADING_END),
+    (date(2025, 10, 21), time(13, 45), time(14, 45)),
+]
+
+
+def build_session_table(start: date = CALENDAR_START, end: date = CALENDAR_END,
+                        holidays: Iterable[date] = NSE_HOLIDAYS,
+                        special_sessions: Iterable[Tuple[date, time, time]] = SPECIAL_SESSIONS
+                        ) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Builds the sorted session table as two datetime64[s] arrays of IST wall-clock
+    session opens and closes: one regular session per weekday that is not a holiday,
+    plus any special sessions.
+    """
+    days = np.arange(np.datetime64(start, 'D'), np.datetime64(end, 'D') + 1)
+    holidays = np.array(sorted(holidays), dtype='datetime64[D]')
+    trading_days = days[np.is_busday(days) & ~np.isin(days, holidays)]
+    opens = [trading_days + _time_offset(TRADING_START)]
+    closes = [trading_days + _time_offset(TRADING_END)]
+    for day, open_time, close_time in special_sessions:
+        opens.append(np.array([np.datetime64(day, 'D') + _time_offset(open_time)]))
+        closes.append(np.array([np.datetime64(day, 'D') + _time_offset(close_time)]))
+    opens = np.concatenate(opens).astype('datetime64[s]')
+    closes = np.concatenate(closes).astype('datetime64[s]')
+    order = np.argsort(opens, kind='stable')
+    return opens[order], closes[order]
+
+
+def _time_offset(t: time) -> np.timedelta64:
+    return np.timedelta64(t.hour * 3600 + t.minute * 60 + t.second, 's')
+
+
+SESSION_OPENS, SESSION_CLOSES = build_session_table(end=SESSION_TABLE_END)
+# Trading seconds elapsed before each session opens, for trading-time arithmetic
+_SESSION_SECONDS = (SESSION_CLOSES - SESSION_OPENS).astype(np.int64)
+_ELAPSED_BEFORE = np.concatenate([[0], np.cumsum(_SESSION_SECONDS)[:-1]])
+
+
+def _as_datetime64(values) -> np.ndarray:
+    """Converts naive IST datetimes (scalar, list, Series or array) to a datetime64[s] array."""
+    if hasattr(values, 'to_numpy'):
+        values = values.to_numpy()
+    return np.asarray(values, dtype='datetime64[s]').reshape(-1)
+
+
+def _warn_past_calendar_end(latest: np.datetime64) -> None:
+    if latest >= np.datetime64(CALENDAR_END, 'D') + 1:
+        warnings.warn(f"Trading calendar not extended past {CALENDAR_END}: later NSE holidays are unknown, so "
+                      f"every weekday up to {SESSION_TABLE_END} counts as a session and later times are NaT. "
+                      f"Add the new NSE_HOLIDAYS and move CALENDAR_END.", stacklevel=3)
+
+
+def _in_calendar(ts: np.ndarray) -> np.ndarray:
+    start = np.datetime64(CALENDAR_START, 's')
+    end = np.datetime64(SESSION_TABLE_END, 'D') + 1
+    if len(ts) and not np.isnat(ts).all():
+        _warn_past_calendar_end(np.nanmax(ts))
+    return (ts >= start) & (ts < end)
+
+
+def snap_to_previous(values) -> np.ndarray:
+    """
+    Snaps naive IST timestamps to the trading timeline looking backwards: times inside a
+    session are kept, anything else moves to the close of the latest earlier session.
+    Times before CALENDAR_START or after SESSION_TABLE_END are NaT.
+    """
+    ts = _as_datetime64(values)
+    idx = np.searchsorted(SESSION_OPENS, ts, side='right') - 1
+    valid = (idx >= 0) & _in_calendar(ts)
+    closes = SESSION_CLOSES[np.maximum(idx, 0)]
+    result = np.where(ts <= closes, ts, closes)
+    return np.where(valid & ~np.isnat(ts), result, np.datetime64('NaT'))
+
+
+def snap_to_next(values) -> np.ndarray:
+    """
+    Snaps naive IST timestamps to the trading timeline looking forwards: times inside a
+    session are kept, anything else moves to the open of the next session.
+    Times before CALENDAR_START or after SESSION_TABLE_END are NaT.
+    """
+    ts = _as_datetime64(values)
+    idx = np.searchsorted(SESSION_CLOSES, ts, side='left')
+    valid = (idx < len(SESSION_CLOSES)) & _in_calendar(ts)
+    opens = SESSION_OPENS[np.minimum(idx, len(SESSION_OPENS) - 1)]
+    result = np.where(ts >= opens, ts, opens)
+    return np.where(valid & ~np.isnat(ts), result, np.datetime64('NaT'))
+
+
+def add_trading_minutes(values, minutes: int) -> np.ndarray:
+    """
+    Moves naive IST timestamps forward (or backward, for negative minutes) by a number of
+    trading minutes, skipping the time between sessions. Timestamps outside a session
+    start from the next session open.
+    """
+    ts = snap_to_next(values)
+    valid = ~np.isnat(ts)
+    idx = np.searchsorted(SESSION_CLOSES, ts[valid], side='left')
+    elapsed = _ELAPSED_BEFORE[idx] + (ts[valid] - SESSION_OPENS[idx]).astype(np.int64)
+    target = elapsed + minutes * 60
+    in_range = (target >= 0) & (target <= _ELAPSED_BEFORE[-1] + _SESSION_SECONDS[-1])
+    # A target exactly on a session boundary resolves to the earlier session's close
+    target_idx = np.clip(np.searchsorted(_ELAPSED_BEFORE + _SESSION_SECONDS, target, side='left'),
+                         0, len(SESSION_OPENS) - 1)
+    moved = SESSION_OPENS[target_idx] + (target - _ELAPSED_BEFORE[target_idx]).astype('timedelta64[s]')
+    result = np.full(len(ts), np.datetime64('NaT'), dtype='datetime64[s]')
+    result[valid] = np.where(in_range, moved, np.datetime64('NaT'))
+    return result
+
+
+def add_minutes_within_session(values, minutes: int) -> np.ndarray:
+    """
+    Adds wall-clock minutes to naive IST timestamps without leaving their session: results
+    are capped at the session close, and timestamps outside a session move to the next
+    session open instead.
+    """
+    ts = _as_datetime64(values)
+    idx = np.searchsorted(SESSION_OPENS, ts, side='right') - 1
+    closes = SESSION_CLOSES[np.maximum(idx, 0)]
+    in_session = (idx >= 0) & (ts <= closes)
+    capped = np.minimum(ts + np.timedelta64(minutes * 60, 's'), closes)
+    return np.where(in_session, capped, snap_to_next(ts))
+
+
+def is_trading_time(values) -> np.ndarray:
+    ts = _as_datetime64(values)
+    return ~np.isnat(ts) & (snap_to_previous(ts) == ts)
+
+
+def _to_naive_ist(dt: datetime) -> datetime:
+    return dt.astimezone(IST).replace(tzinfo=None) if dt.tzinfo else dt
+
+
+def _from_datetime64(value: np.datetime64, like: datetime) -> Optional[datetime]:
+    if np.isnat(value):
+        return None
+    dt = value.astype('datetime64[us]').astype(datetime)
+    return IST.localize(dt) if like.tzinfo else dt
+
+
+def previous_session_time(dt: datetime) -> Optional[datetime]:
+    """Scalar snap_to_previous; tz-aware inputs come back localized to IST."""
+    return _from_datetime64(snap_to_previous(_to_naive_ist(dt))[0], dt)
+
+
+def next_session_time(dt: datetime) -> Optional[datetime]:
+    """Scalar snap_to_next; tz-aware inputs come back localized to IST."""
+    return _from_datetime64(snap_to_next(_to_naive_ist(dt))[0], dt)
+
+
+def to_datetimes(values: np.ndarray) -> List[Optional[datetime]]:
+    """Converts a datetime64 array back to naive datetimes (None for NaT)."""
+    return [None if np.isnat(value) else value.astype('datetime64[us]').astype(datetime) for value in values]
+
+
+def trading_days(from_day: date, to_day: date) -> List[date]:
+    """Days (inclusive range) with at least one session in the session table."""
+    _warn_past_calendar_end(np.datetime64(to_day, 'D'))
+    days = np.unique(SESSION_OPENS.astype('datetime64[D]'))
+    lo, hi = np.searchsorted(days, [np.datetime64(from_day, 'D'), np.datetime64(to_day, 'D') + 1])
+    return days[lo:hi].astype(object).tolist()
@@ -1,21 +1,18 @@
 import json
-import requests
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
+import numpy as np
 import pytz
-from typing import Optional, Dict
-
-# Use ijson for large file streaming
-try:
-    import ijson
-except ImportError:
-    import sys
-    import subprocess
-    subprocess.check_call([sys.executable, '-m', 'pip', 'install', 'ijson'])
-    import ijson
-
-NSE_JSON_PATH = 'stockanalysis/NSE.json'
+from typing import Iterable, List, Optional, Dict, Tuple
+import candle_store
+from candle_store import Candle
+from instrumentation import span
+from fetch_engine import DEFAULT_CONCURRENCY, fetch_all, get_session, http_get
+from instrument_index import lookup_instrument_key
+from request_planner import days_in_range, plan_range_requests
+
 UPSTOX_API_KEY = 'YOUR_UPSTOX_API_KEY'  # Replace with your Upstox API key
 UPSTOX_ACCESS_TOKEN = 'YOUR_UPSTOX_ACCESS_TOKEN'  # Replace with your Upstox access token
+UPSTOX_BASE_URL = 'https://api.upstox.com'
 
 # Hardcoded share name and datetime
 TRADING_SYMBOL = 'IRCON'
@@ -25,109 +22,217 @@ TARGET_DATETIME_STR = '2024-05-14 10:00:00'  # Example: A valid past date and ti
 IST = pytz.timezone('Asia/Kolkata')
 
 def get_instrument_key(trading_symbol):
-    with open(NSE_JSON_PATH, 'rb') as f:
-        for instrument in ijson.items(f, 'item'):
-            if instrument.get('segment') == 'NSE_EQ' and instrument.get('trading_symbol') == trading_symbol:
-                return instrument['instrument_key']
-    return None
+    # O(1) lookup in the compiled instrument index (see instrument_index.py)
+    with span('instrument_lookup'):
+        return lookup_instrument_key(trading_symbol, 'NSE_EQ')
 
-def fetch_historical_candle_v3(instrument_key: str, target_dt_ist: datetime) -> Optional[Dict[str, float]]:
+def fetch_range_candles(instrument_key: str, from_day: date, to_day: date) -> Optional[Dict[date, np.ndarray]]:
     """
-    Fetches historical candle data using Upstox Historical Candle Data V3 API.
-    Tries to find the candle matching the hour and minute of target_dt_ist.
-    If no exact match is found, it retrieves the nearest candle within a 1-minute gap.
+    Downloads 1-minute candles for an inclusive range of days in one Upstox Historical
+    Candle Data V3 request and writes one candle store partition per day. Days in the range
+    without candles (weekends, holidays, suspensions) are stored as empty partitions.
 
     Args:
         instrument_key (str): The unique identifier for the financial instrument.
-        target_dt_ist (datetime): The target datetime in IST for which to fetch the candle data.
+        from_day (date): First trading day (IST) of the range.
+        to_day (date): Last trading day (IST) of the range, at most one month after from_day.
 
     Returns:
-        Optional[Dict[str, float]]: A dictionary containing the candle data (open, high, low, close, volume)
-                                     or None if no data is found.
+        Optional[Dict[date, np.ndarray]]: Candles (CANDLE_DTYPE) for every day of the range,
+                                          or None if the API request failed.
     """
     unit = 'minutes'  # As per your previous correction and docs
     interval_value = '1'  # For 1-minute candles
-    
-    # Format the date part of target_dt_ist as YYYY-MM-DD for API parameters
-    date_str = target_dt_ist.strftime('%Y-%m-%d')
+
+    # Format the range ends as YYYY-MM-DD for API parameters
+    to_date_str = to_day.strftime('%Y-%m-%d')
+    from_date_str = from_day.strftime('%Y-%m-%d')
 
     # Endpoint: /historical-candle/{instrument_key}/{unit}/{interval}/{to_date}
-    url = f"https://api.upstox.com/v3/historical-candle/{instrument_key}/{unit}/{interval_value}/{date_str}"
-    
+    url = f"{UPSTOX_BASE_URL}/v3/historical-candle/{instrument_key}/{unit}/{interval_value}/{to_date_str}"
+
     headers = {
         'Accept': 'application/json',
-        'Api-Version': '3.0', 
+        'Api-Version': '3.0',
     }
     params = {
-        'from_date': date_str  # Fetching for a single day
+        'from_date': from_date_str
     }
 
     # print(f"Requesting URL: {url} with params: {params}")
-    response = requests.get(url, headers=headers, params=params)
+    response = http_get(url, headers=headers, params=params)
 
     if response.status_code != 200:
         print(f'Error fetching data from {url}: {response.status_code} {response.text}')
         return None
-    
-    data = response.json()
+
+    with span('json_decode'):
+        data = response.json()
     candles = data.get('data', {}).get('candles', [])
+    with span('candle_decode'):
+        by_day = candle_store.split_arrays_by_day(candle_store.candles_to_arrays(candles))
+    today = datetime.now(IST).date()
+    result = {}
+    with span('store_write'):
+        for day in days_in_range(from_day, to_day):
+            arrays = by_day.get(day, candle_store.empty_arrays())
+            if day <= today:
+                candle_store.save_day(instrument_key, day, arrays)
+            result[day] = arrays
+    return result
+
+
+def fetch_day_candles(instrument_key: str, day: date) -> Optional[np.ndarray]:
+    """
+    Returns the 1-minute candles for one instrument-day as a CANDLE_DTYPE array (see candle_store),
+    reading through the local candle store before calling the Upstox Historical Candle Data V3 API.
+
+    Args:
+        instrument_key (str): The unique identifier for the financial instrument.
+        day (date): The trading day (IST).
+
+    Returns:
+        Optional[np.ndarray]: The day's candles (possibly empty on a holiday),
+                              or None if the API request failed.
+    """
+    with span('store_read'):
+        cached = candle_store.load_day(instrument_key, day)
+    if cached is not None:
+        return cached
+    by_day = fetch_range_candles(instrument_key, day, day)
+    return by_day[day] if by_day is not None else None
+
+
+def fetch_intraday_candles(instrument_key: str) -> Optional[np.ndarray]:
+    """
+    The current trading day's 1-minute candles so far, from the Upstox Intraday Candle
+    Data V3 API, in one request. The latest candle may still be forming. The day is not
+    final, so nothing is written to the candle store.
+
+    Returns:
+        Optional[np.ndarray]: CANDLE_DTYPE candles, or None if the API request failed.
+    """
+    url = f"{UPSTOX_BASE_URL}/v3/historical-candle/intraday/{instrument_key}/minutes/1"
+    response = http_get(url, headers={'Accept': 'application/json', 'Api-Version': '3.0'})
+    if response.status_code != 200:
+        print(f'Error fetching data from {url}: {response.status_code} {response.text}')
+        return None
+    with span('json_decode'):
+        data = response.json()
+    with span('candle_decode'):
+        return candle_store.candles_to_arrays(data.get('data', {}).get('candles', []))
+
 
-    if not candles:
+def prefetch_day_candles(instrument_days: Iterable[Tuple[str, date]],
+                         concurrency: int = DEFAULT_CONCURRENCY) -> List[Optional[np.ndarray]]:
+    """
+    Fetches many instrument-days with up to `concurrency` requests in flight, filling
+    the candle store. Duplicate instrument-days are fetched once, and the days missing
+    from the store are coalesced into month-range requests (see request_planner).
+
+    Returns:
+        List[Optional[np.ndarray]]: Candles for each unique instrument-day, in first-seen input order.
+    """
+    unique_days = list(dict.fromkeys(instrument_days))
+    with span('store_read'):
+        results = {instrument_day: candle_store.load_day(*instrument_day) for instrument_day in unique_days}
+    missing = [instrument_day for instrument_day, arrays in results.items() if arrays is None]
+    if missing:
+        ranges = plan_range_requests(missing)
+        print(f"Fetching {len(missing)} instrument-days in {len(ranges)} range requests.")
+        get_session(concurrency)  # One pooled connection per worker
+        with span('candle_download'):
+            downloaded = fetch_all(lambda planned: fetch_range_candles(*planned), ranges, concurrency)
+        for (instrument_key, _, _), by_day in zip(ranges, downloaded):
+            if by_day is None:
+                continue
+            for day, arrays in by_day.items():
+                if (instrument_key, day) in results and results[(instrument_key, day)] is None:
+                    results[(instrument_key, day)] = arrays
+    return [results[instrument_day] for instrument_day in unique_days]
+
+
+def candle_at(arrays: np.ndarray, index: int) -> Candle:
+    """Builds the single-candle record returned to callers from row `index` of a day's candles."""
+    minute, open_, high, low, close, volume, _ = arrays[index].tolist()
+    return Candle(minute, round(open_, 2), round(high, 2), round(low, 2), round(close, 2), volume)
+
+
+def resolve_candle_indices(minutes: np.ndarray, target_seconds: np.ndarray) -> np.ndarray:
+    """
+    Resolves many target times against one day's sorted epoch-minute array in a single
+    vectorized pass.
+
+    A candle starting in the target's minute is an exact match. Otherwise the nearest
+    neighbouring candle within a 1-minute gap is used, preferring the later candle on a tie.
+
+    Args:
+        minutes (np.ndarray): Sorted candle start times in minutes since the epoch.
+        target_seconds (np.ndarray): Target times in seconds since the epoch.
+
+    Returns:
+        np.ndarray: Index into `minutes` for each target, or -1 where no candle qualifies.
+    """
+    target_seconds = np.asarray(target_seconds, dtype=np.float64)
+    count = len(minutes)
+    if count == 0:
+        return np.full(len(target_seconds), -1, dtype=np.int64)
+    # Missing (NaN) targets never match
+    finite = np.isfinite(target_seconds)
+    target_seconds = np.where(finite, target_seconds, 0.0)
+    target_minutes = np.floor(target_seconds / 60).astype(np.int64)
+    pos = np.searchsorted(minutes, target_minutes, side='left')
+    clipped = np.minimum(pos, count - 1)
+    exact = (pos < count) & (minutes[clipped] == target_minutes)
+
+    # Nearest candles on either side when there is no exact match
+    prev_index = pos - 1
+    next_index = np.where(exact, pos + 1, pos)
+    prev_diff = np.where(
+        prev_index >= 0, (target_seconds - minutes[np.maximum(prev_index, 0)] * 60) / 60, np.inf
+    )
+    next_diff = np.where(
+        next_index < count, (minutes[np.minimum(next_index, count - 1)] * 60 - target_seconds) / 60, np.inf
+    )
+    nearest = np.where(next_diff <= prev_diff, next_index, prev_index)
+    nearest_diff = np.minimum(prev_diff, next_diff)
+    resolved = np.where(exact, pos, np.where(nearest_diff <= 1, nearest, -1))
+    return np.where(finite, resolved, -1).astype(np.int64)
+
+
+def fetch_historical_candle_v3(instrument_key: str, target_dt_ist: datetime) -> Optional[Candle]:
+    """
+    Fetches historical candle data using Upstox Historical Candle Data V3 API.
+    Tries to find the candle matching the hour and minute of target_dt_ist.
+    If no exact match is found, it retrieves the nearest candle within a 1-minute gap.
+
+    Args:
+        instrument_key (str): The unique identifier for the financial instrument.
+        target_dt_ist (datetime): The target datetime in IST for which to fetch the candle data.
+
+    Returns:
+        Optional[Candle]: The candle (timestamp, open, high, low, close, volume, readable like a dict)
+                          or None if no data is found.
+    """
+    date_str = target_dt_ist.strftime('%Y-%m-%d')
+    arrays = fetch_day_candles(instrument_key, target_dt_ist.date())
+    if arrays is None:
+        return None
+
+    if len(arrays['minute']) == 0:
         print(f"No candles received from API for {date_str}.")
         return None
 
-    # Target time (hour and minute) from the original target_dt_ist
-    target_hour = target_dt_ist.hour
-    target_minute = target_dt_ist.minute
-
-    # Initialize variables to track the closest candle
-    closest_candle = None
-    closest_time_diff = float('inf')
-
-    for candle_data in candles:
-        # candle_data: [timestamp_str, open, high, low, close, volume, oi]
-        try:
-            candle_timestamp_str = candle_data[0]
-            # Parse the timestamp string from API (which includes timezone offset)
-            candle_dt = datetime.fromisoformat(candle_timestamp_str)
-
-            # Calculate the time difference in minutes
-            time_diff = abs((candle_dt - target_dt_ist).total_seconds() / 60)
-
-            # Check for an exact match first
-            if (candle_dt.hour == target_hour and candle_dt.minute == target_minute):
-                return {
-                    'timestamp': candle_timestamp_str,
-                    'open': candle_data[1],
-                    'high': candle_data[2],
-                    'low': candle_data[3],
-                    'close': candle_data[4],
-                    'volume': candle_data[5],
-                }
-            # If no exact match, check if it's within 1 minute
-            elif time_diff <= 1 and time_diff < closest_time_diff:
-                closest_candle = {
-                    'timestamp': candle_timestamp_str,
-                    'open': candle_data[1],
-                    'high': candle_data[2],
-                    'low': candle_data[3],
-                    'close': candle_data[4],
-                    'volume': candle_data[5],
-                }
-                closest_time_diff = time_diff
-
-        except (IndexError, ValueError) as e:
-            print(f"Error parsing candle data {candle_data}: {e}")
-            continue
-            
-    if closest_candle:
-        print(f"Using closest candle data for {target_dt_ist.strftime('%H:%M')} on {date_str}.")
-        return closest_candle
+    with span('candle_scan'):
+        index = int(resolve_candle_indices(arrays['minute'], np.array([target_dt_ist.timestamp()]))[0])
+    if index >= 0:
+        if int(arrays['minute'][index]) != int(target_dt_ist.timestamp() // 60):
+            print(f"Using closest candle data for {target_dt_ist.strftime('%H:%M')} on {date_str}.")
+        return candle_at(arrays, index)
 
     print(f"No candle found for {target_dt_ist.strftime('%H:%M')} on {date_str} in the returned data.")
     return None
 
-
 if __name__ == '__main__':
     instrument_key = get_instrument_key(TRADING_SYMBOL)
     print(f'Instrument key for {TRADING_SYMBOL}: {instrument_key}')
@@ -0,0 +1,112 @@
+import json
+import multiprocessing
+import re
+import time
+from datetime import date
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+from urllib.parse import parse_qs, unquote, urlparse
+from synthetic_data import candle_payload
+
+CANDLE_PATH = re.compile(r'^/v3/historical-candle/(?P<key>[^/]+)/minutes/1/(?P<to_date>\d{4}-\d{2}-\d{2})$')
+
+
+@lru_cache(maxsize=4096)
+def _payload_bytes(key: str, from_day: date, to_day: date) -> bytes:
+    return json.dumps(candle_payload(key, from_day, to_day)).encode()
+
+
+class UpstoxStubHandler(BaseHTTPRequestHandler):
+    """Serves synthetic 1-minute candles for the Historical Candle Data V3 endpoint."""
+    protocol_version = 'HTTP/1.1'  # keep-alive, like the real API
+    latency = 0.0
+    requests_count = None
+    bytes_sent = None
+
+    def do_GET(self):
+        parsed = urlparse(self.path)
+        match = CANDLE_PATH.match(parsed.path)
+        if not match:
+            self.send_response(404)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        to_day = date.fromisoformat(match.group('to_date'))
+        from_values = parse_qs(parsed.query).get('from_date')
+        from_day = date.fromisoformat(from_values[0]) if from_values else to_day
+        body = _payload_bytes(unquote(match.group('key')), from_day, to_day)
+        if self.latency:
+            time.sleep(self.latency)
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+        with self.requests_count.get_lock():
+            self.requests_count.value += 1
+        with self.bytes_sent.get_lock():
+            self.bytes_sent.value += len(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def _serve(port_queue, latency, requests_count, bytes_sent):
+    UpstoxStubHandler.latency = latency
+    UpstoxStubHandler.requests_count = requests_count
+    UpstoxStubHandler.bytes_sent = bytes_sent
+    server = ThreadingHTTPServer(('127.0.0.1', 0), UpstoxStubHandler)
+    server.daemon_threads = True
+    port_queue.put(server.server_address[1])
+    server.serve_forever()
+
+
+class UpstoxStub:
+    """
+    Local stand-in for the Upstox V3 candle endpoint with a fixed per-request latency.
+
+    The server runs in its own process so generating and encoding responses does not
+    compete with the code under measurement for the GIL. Use as a context manager and
+    point upstox.UPSTOX_BASE_URL at `base_url`.
+    """
+
+    def __init__(self, latency_ms: float = 0.0):
+        self.latency = latency_ms / 1000
+        self._requests = multiprocessing.Value('l', 0)
+        self._bytes = multiprocessing.Value('q', 0)
+        self._process: Optional[multiprocessing.Process] = None
+        self.base_url = None
+
+    @property
+    def requests(self) -> int:
+        return self._requests.value
+
+    @property
+    def bytes_sent(self) -> int:
+        return self._bytes.value
+
+    def reset_counters(self) -> None:
+        self._requests.value = 0
+        self._bytes.value = 0
+
+    def start(self) -> 'UpstoxStub':
+        port_queue = multiprocessing.Queue()
+        self._process = multiprocessing.Process(
+            target=_serve, args=(port_queue, self.latency, self._requests, self._bytes), daemon=True
+        )
+        self._process.start()
+        self.base_url = f"http://127.0.0.1:{port_queue.get(timeout=30)}"
+        return self
+
+    def stop(self) -> None:
+        if self._process is not None:
+            self._process.terminate()
+            self._process.join()
+            self._process = None
+
+    def __enter__(self) -> 'UpstoxStub':
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()